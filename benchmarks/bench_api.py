@@ -0,0 +1,105 @@
+"""Requests per second and latency of the JSON API on warm caches.
+
+Usage: python benchmarks/bench_api.py [--clients 8] [--seconds 5] [--port 8611]
+
+Starts ``python -m dashboard.api`` in a subprocess and drives it from
+keep-alive client threads over a mix of series, top-N and continent
+requests, once with plain GETs and once revalidating with If-None-Match.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = [
+    "/series/Kenya?from=1980&to=2020",
+    "/series/India",
+    "/series/World?series=log",
+    "/top?year=2022",
+    "/top?year=2000&by=growth&n=5",
+    "/continents?year=2022",
+    "/countries",
+]
+
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/countries")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+def client(port, seconds, conditional, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    etags = {}
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        etags[path] = response.getheader("ETag")
+
+
+def run(port, clients, seconds, conditional):
+    per_client = [[] for _ in range(clients)]
+    threads = [
+        threading.Thread(target=client, args=(port, seconds, conditional, latencies))
+        for latencies in per_client
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies = np.concatenate([np.array(l) for l in per_client]) * 1000
+    return len(latencies) / seconds, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8611)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DASHBOARD_RELOAD_INTERVAL="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "dashboard.api", "--port", str(args.port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(args.port)
+        # Warm the memoized responses
+        run(args.port, 1, 0.5, False)
+        print(f"{'mode':12} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for mode, conditional in (("GET", False), ("conditional", True)):
+            rate, p50, p99 = run(args.port, args.clients, args.seconds, conditional)
+            print(f"{mode:12} {rate:9,.0f} {p50:8.2f} {p99:8.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
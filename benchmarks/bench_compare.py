@@ -0,0 +1,82 @@
+"""Compare page with hundreds of countries selected, against a time budget.
+
+Usage: python benchmarks/bench_compare.py [--countries 300] [--budget-ms 1500]
+
+Generates a synthetic annual dataset, selects every country on the Compare
+page and reports the first (uncached) and warm rerun times along with the
+chart payload sent to the browser. Exits with status 1 when the first run
+exceeds the budget.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def run_worker(repeat):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "pages/2_Compare_Countries.py"), default_timeout=600).run()
+    at.sidebar.multiselect[0].set_value(at.sidebar.multiselect[0].options)
+
+    timings = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    payload = sum(r["payload_bytes"] for r in at.session_state["_profile_records"])
+    print(f"countries selected:    {len(at.sidebar.multiselect[0].value):,}")
+    print(f"first run:             {timings[0] * 1000:8.1f} ms")
+    print(f"warm rerun:            {min(timings[1:]) * 1000:8.1f} ms")
+    print(f"payload:               {payload / 1024:8.1f} KB")
+    print(f"FIRST_MS {timings[0] * 1000}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=300)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeat)
+        return
+
+    from generate import generate
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries)
+        env = dict(
+            os.environ, DASHBOARD_DATA_PATH=str(csv_path),
+            DASHBOARD_SNAPSHOT_DIR=str(workdir / "snapshots"), DASHBOARD_PROFILE="1",
+        )
+        out = subprocess.run(
+            [sys.executable, __file__, "--worker", "--repeat", str(args.repeat)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    lines = out.strip().splitlines()
+    first_ms = float(lines[-1].split()[1])
+    print("\n".join(lines[:-1]))
+    print(f"budget:                {args.budget_ms:8.1f} ms "
+          f"({'ok' if first_ms <= args.budget_ms else 'EXCEEDED'})")
+    sys.exit(0 if first_ms <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""End-to-end timings of the data layer and every page, emitted as JSON.
+
+Usage: python benchmarks/bench_e2e.py [--countries 200,2000] [--years 1950:2100]
+           [--step 1] [--continents 6] [--repeat 3] [--bundled] [--out FILE]
+
+For each size a synthetic CSV is generated with generate.py and a fresh
+subprocess, pointed at it through DASHBOARD_DATA_PATH, times load_data,
+transform_data and ingest_csv, then runs each page headlessly with AppTest
+under its default widgets and a worst-case setting. Page timings report the
+first run with the scenario's widgets (cold caches) and the best of --repeat
+reruns.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def worst_overview(at):
+    # The World series takes the joined path through the index
+    country = next(box for box in at.sidebar.selectbox if box.label == "Select Primary Country")
+    country.set_value("World")
+
+
+def worst_compare(at):
+    at.sidebar.multiselect[0].set_value(at.sidebar.multiselect[0].options)
+    at.sidebar.slider[0].set_range(at.sidebar.slider[0].min, at.sidebar.slider[0].max)
+    if at.checkbox:
+        at.checkbox[0].check()
+
+
+def worst_global(at):
+    at.slider[0].set_value(at.slider[0].min)
+
+
+# (page, scenario, widget setup); "default" leaves the widgets untouched
+SCENARIOS = [
+    ("pages/1_Country_Overview.py", "default", None),
+    ("pages/1_Country_Overview.py", "world_full_range", worst_overview),
+    ("pages/2_Compare_Countries.py", "default", None),
+    ("pages/2_Compare_Countries.py", "all_countries_full_range", worst_compare),
+    ("pages/3_Global_Statistics.py", "default", None),
+    ("pages/3_Global_Statistics.py", "first_year", worst_global),
+]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_page(page, setup, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=600)
+    if setup is not None:
+        at.run()
+        setup(at)
+
+    def rerun():
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+
+    # The first run with the scenario's widgets pays for every cache miss
+    first = best_of(rerun, 1)
+    return {"first_run_s": first, "rerun_s": best_of(rerun, repeat)}
+
+
+def run_worker(repeat):
+    from dashboard import data, ingest
+
+    df_original = data.load_data()
+    result = {
+        "source_rows": len(df_original),
+        "long_rows": len(data.transform_data(df_original)[0]),
+        "data": {
+            "load_data_s": best_of(data.load_data, repeat),
+            "transform_data_s": best_of(lambda: data.transform_data(df_original), repeat),
+            "ingest_csv_s": best_of(ingest.ingest_csv, repeat),
+        },
+        "pages": [],
+    }
+    for page, scenario, setup in SCENARIOS:
+        timings = time_page(page, setup, repeat)
+        result["pages"].append({"page": page, "scenario": scenario, **timings})
+    print(json.dumps(result))
+
+
+def bench_dataset(name, csv_path, snapshot_dir, repeat):
+    env = dict(os.environ, DASHBOARD_DATA_PATH=str(csv_path), DASHBOARD_SNAPSHOT_DIR=str(snapshot_dir))
+    out = subprocess.run(
+        [sys.executable, __file__, "--worker", "--repeat", str(repeat)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    return {"name": name, "csv_mb": Path(csv_path).stat().st_size / 1e6, **result}
+
+
+def environment():
+    import pandas as pd
+    import streamlit
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "streamlit": streamlit.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", default="200,2000")
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--continents", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bundled", action="store_true", help="also time world_population.csv")
+    parser.add_argument("--out", help="write the JSON here instead of stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeat)
+        return
+
+    from generate import generate, parse_years
+
+    years = parse_years(args.years, args.step)
+    report = {"environment": environment(), "repeat": args.repeat, "datasets": []}
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        if args.bundled:
+            from dashboard.data import DATA_PATH
+            report["datasets"].append(
+                bench_dataset("bundled", DATA_PATH, workdir / "snapshots-bundled", args.repeat)
+            )
+        for countries in (int(n) for n in args.countries.split(",")):
+            name = f"synthetic-{countries}x{len(years)}x{args.continents}"
+            csv_path = workdir / f"{name}.csv"
+            generate(csv_path, countries, years, args.continents)
+            result = bench_dataset(name, csv_path, workdir / f"snapshots-{name}", args.repeat)
+            report["datasets"].append({
+                **result, "countries": countries, "years": len(years), "continents": args.continents,
+            })
+            print(f"{name}: done", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-interaction server time and payload: full rerun vs fragment rerun.
+
+Usage: python benchmarks/bench_fragments.py [--repeat R]
+
+Each page is run headlessly with profiling enabled. A widget inside a
+fragment only re-executes that fragment's sections, so its cost is the sum
+of those sections; before fragments the same widget re-executed them all.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+os.environ["DASHBOARD_PROFILE"] = "1"
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# (page, widget moved by the user, fragment it lives in, setup before sampling)
+INTERACTIONS = [
+    ("pages/1_Country_Overview.py", "export format", "export", None),
+    ("pages/2_Compare_Countries.py", "ratio toggle", "ratio",
+     lambda at: at.checkbox[0].check()),
+    ("pages/3_Global_Statistics.py", "year slider", "year", None),
+]
+
+
+def sample(page, setup, repeat):
+    at = AppTest.from_file(str(ROOT / page), default_timeout=120).run()
+    if setup is not None:
+        setup(at)
+    runs = []
+    for _ in range(repeat):
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        runs.append(list(at.session_state["_profile_records"]))
+    return runs
+
+
+def totals(records, fragment=None):
+    chosen = [r for r in records if fragment is None or r["fragment"] == fragment]
+    return sum(r["seconds"] for r in chosen), sum(r["payload_bytes"] for r in chosen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'interaction':16} {'full ms':>8} {'full KB':>8} {'frag ms':>8} {'frag KB':>8}")
+    for page, widget, fragment, setup in INTERACTIONS:
+        runs = sample(page, setup, args.repeat)
+        full = min(totals(r) for r in runs)
+        frag = min(totals(r, fragment) for r in runs)
+        print(f"{widget:16} {full[0] * 1000:8.1f} {full[1] / 1024:8.1f} "
+              f"{frag[0] * 1000:8.1f} {frag[1] / 1024:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Aggregating custom groupings: a merge + groupby per grouping vs one sparse product.
+
+Usage: python benchmarks/bench_groupings.py [--countries 3000] [--years 1950:2100]
+           [--groups 40] [--memberships 3] [--repeat 3]
+
+Each synthetic grouping puts every country in --memberships random groups
+out of --groups, so groups overlap. The groupby path joins a long
+(Country, Group) membership table onto the long frame and sums by (Year,
+Group), as a per-widget groupby would. The matrix path lays out the Country
+x Year matrix once per dataset version (timed separately) and then costs
+one sparse product per grouping in dashboard.groupings.aggregate().
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, groupings  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+
+
+def random_grouping(countries, groups, memberships, seed):
+    rng = np.random.default_rng(seed)
+    definition = {f"Group {g}": [] for g in range(groups)}
+    for country in countries:
+        for g in rng.choice(groups, size=min(memberships, groups), replace=False):
+            definition[f"Group {g}"].append(country)
+    return definition
+
+
+def groupby_totals(df_long, definition):
+    members = pd.DataFrame(
+        [(country, group) for group, countries in definition.items() for country in countries],
+        columns=["Country", "Group"],
+    )
+    plain = df_long.astype({"Country": str})
+    return plain.merge(members, on="Country").groupby(["Year", "Group"]).agg(
+        Population=("Population", "sum"), Countries=("Country", "size")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=3000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--memberships", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1))
+        df_long, df_world = data.transform_data(data.load_data(csv_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    index = build_index(df_long, df_world)
+
+    countries = list(index.country_slices)
+    definition = random_grouping(countries, args.groups, args.memberships, 0)
+    matrix_time = best_of(lambda: groupings.build_matrix(index), args.repeat)
+    matrix = groupings.build_matrix(index)
+    groupby_time = best_of(lambda: groupby_totals(df_long, definition), args.repeat)
+    product_time = best_of(
+        lambda: groupings.aggregate(matrix, groupings.membership(matrix, "bench", definition)),
+        args.repeat,
+    )
+
+    # Both paths must agree on every group and year
+    expected = groupby_totals(df_long, definition)["Population"].astype("float64")
+    result = groupings.aggregate(matrix, groupings.membership(matrix, "bench", definition)).frame()
+    actual = result.set_index(["Year", "Country"])["Population"].astype("float64")
+    assert np.allclose(np.sort(expected.to_numpy()), np.sort(actual.to_numpy()))
+
+    print(f"matrix:             {len(countries):,} countries x {len(matrix.years)} years, "
+          f"{args.groups} groups, {args.memberships} per country")
+    print(f"population matrix:  {matrix_time * 1000:8.1f} ms (once per dataset version)")
+    print(f"per grouping:       groupby {groupby_time * 1000:8.1f} ms   "
+          f"sparse product {product_time * 1000:8.1f} ms ({groupby_time / product_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
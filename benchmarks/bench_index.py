@@ -0,0 +1,77 @@
+"""Micro-benchmarks: mask-based filtering vs the positional LongIndex.
+
+Usage: python benchmarks/bench_index.py [--scale N] [--number K]
+
+Each case mirrors a filter one of the pages runs on every rerun.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import scaled_csv  # noqa: E402
+from dashboard import ingest  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+from dashboard.memory import legacy_frames  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "world_population.csv"
+        scaled_csv(csv_path, args.scale)
+        df_long, df_world = ingest.ingest_csv(csv_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Masks run against the frame the pages used to filter
+    df = legacy_frames(df_long, df_world)["df_long_with_world"]
+    index = build_index(df_long, df_world)
+    country = "Kenya 0"
+    countries = [f"Kenya {i}" for i in range(0, args.scale, max(1, args.scale // 20))] + ["World"]
+    year_range = (1980, 2020)
+    year = 2020
+
+    cases = {
+        "country series (Overview)": (
+            lambda: df[
+                (df["Country"] == country)
+                & (df["Year"] >= year_range[0])
+                & (df["Year"] <= year_range[1])
+            ].sort_values("Year"),
+            lambda: index.country(country, year_range),
+        ),
+        f"{len(countries)} countries (Compare)": (
+            lambda: df[
+                df["Country"].isin(countries)
+                & (df["Year"] >= year_range[0])
+                & (df["Year"] <= year_range[1])
+            ].sort_values("Year"),
+            lambda: index.countries_frame(countries, year_range),
+        ),
+        "year cross-section (Global)": (
+            lambda: df[df["Year"] == year].copy(),
+            lambda: index.year(year),
+        ),
+    }
+
+    build = timeit.timeit(lambda: build_index(df_long, df_world), number=3) / 3
+    print(f"rows: {len(df):,}   index build: {build * 1000:.1f} ms")
+    print(f"{'case':32} {'mask (us)':>10} {'index (us)':>11} {'speedup':>8}")
+    for name, (mask, indexed) in cases.items():
+        t_mask = timeit.timeit(mask, number=args.number) / args.number * 1e6
+        t_index = timeit.timeit(indexed, number=args.number) / args.number * 1e6
+        print(f"{name:32} {t_mask:10.1f} {t_index:11.1f} {t_mask / t_index:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
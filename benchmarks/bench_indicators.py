@@ -0,0 +1,85 @@
+"""Loading K metrics: a melt per metric vs one pass into the indicator store.
+
+Usage: python benchmarks/bench_indicators.py [--countries 2000] [--years 1950:2100]
+           [--metrics 1,3,6] [--repeat 3]
+
+For each metric count a synthetic CSV with that many metrics besides
+Population is generated and read once. The per-metric path melts the wide
+frame once per metric, as extending transform_data() metric by metric
+would; the store path melts every metric in one pass
+(dashboard.indicators.build_indicators). Also reports the bytes of the
+long table, the time to build one metric's Country x Year matrix and a
+derived metric from it, which pages pay only on first request, and the
+peak memory traced while building the store from the whole CSV read at
+once vs from chunks of it (dashboard.indicators.ingest_indicators).
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from bench_stats import peak_kb  # noqa: E402
+from dashboard import data, indicators  # noqa: E402
+from dashboard.memory import frame_bytes  # noqa: E402
+
+
+def melt_per_metric(df_original):
+    frames = []
+    for metric, pairs in data.metric_columns(df_original.columns).items():
+        columns = [col for _, col in pairs]
+        df = pd.melt(
+            df_original[["Country", "Continent"] + columns],
+            id_vars=["Country", "Continent"], value_vars=columns, var_name="Year", value_name="Value",
+        )
+        df["Year"] = df["Year"].str.extract(r"(\d{4})", expand=False).astype("int16")
+        df["Value"] = pd.to_numeric(df["Value"], errors="coerce")
+        frames.append(df.dropna(subset=["Value"]).assign(Metric=metric))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=2000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--metrics", default="1,3,6")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    print(f"{'metrics':>7} {'per-metric melt':>16} {'one pass':>10} {'long table':>11} "
+          f"{'matrix':>9} {'derived':>9} {'whole-file peak':>16} {'chunked peak':>13}")
+    for extra in (int(part) for part in args.metrics.split(",")):
+        workdir = Path(tempfile.mkdtemp())
+        try:
+            csv_path = workdir / "population.csv"
+            generate(csv_path, args.countries, years=range(first, last + 1), metrics=extra)
+            df_original = data.load_data(csv_path)
+            whole_kb = peak_kb(lambda: indicators.build_indicators(data.load_data(csv_path)))
+            chunked_kb = peak_kb(lambda: indicators.ingest_indicators(csv_path))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        melt_time = best_of(lambda: melt_per_metric(df_original), args.repeat)
+        store_time = best_of(lambda: indicators.build_indicators(df_original), args.repeat)
+        store = indicators.build_indicators(df_original)
+        assert len(store.frame) == len(melt_per_metric(df_original))
+
+        matrix_time = best_of(lambda: store.matrix(data.POPULATION), args.repeat)
+        population = store.matrix(data.POPULATION)
+        derived_time = best_of(lambda: store.derive(indicators.DENSITY, [population]), args.repeat)
+
+        print(f"{len(store.metrics):7} {melt_time * 1000:13.1f} ms {store_time * 1000:7.1f} ms "
+              f"{frame_bytes(store.frame) / 1e6:8.1f} MB {matrix_time * 1000:6.1f} ms "
+              f"{derived_time * 1000:6.1f} ms {whole_kb / 1024:13.1f} MB {chunked_kb / 1024:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
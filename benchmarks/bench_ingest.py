@@ -0,0 +1,73 @@
+"""Peak RSS and throughput: whole-file read + melt vs chunked ingestion.
+
+Usage: python benchmarks/bench_ingest.py [--target-mb 120] [--chunksize N]
+
+Generates an annual 1950-2100 file of roughly --target-mb and ingests it
+once per method, each in a fresh subprocess so peak RSS is not shared.
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def run_method(method, path, chunksize):
+    from dashboard import data, ingest
+
+    start = time.perf_counter()
+    if method == "full":
+        df_long, _ = data.transform_data(data.load_data(path))
+    else:
+        df_long, _ = ingest.ingest_csv(path, chunksize=chunksize)
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": seconds,
+        "rows": len(df_long),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-mb", type=float, default=120)
+    parser.add_argument("--chunksize", type=int, default=5_000)
+    parser.add_argument("--worker", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_method(*args.worker, args.chunksize)
+        return
+
+    from generate import countries_for_size, generate
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        path = workdir / "population.csv"
+        years = range(1950, 2101)
+        generate(path, countries_for_size(args.target_mb, years), years)
+        size_mb = path.stat().st_size / 1e6
+        print(f"file: {size_mb:.1f} MB, chunksize {args.chunksize:,} rows")
+        print(f"{'method':8} {'seconds':>8} {'MB/s':>7} {'rows/s':>11} {'peak RSS MB':>12}")
+        for method in ("full", "chunked"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", method, str(path),
+                 "--chunksize", str(args.chunksize)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{method:8} {result['seconds']:8.2f} {size_mb / result['seconds']:7.1f} "
+                  f"{result['rows'] / result['seconds']:11,.0f} {result['peak_rss_mb']:12.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Annual interpolation: per-country loop vs one pass over the matrix.
+
+Usage: python benchmarks/bench_interpolate.py [--scale N] [--repeat R]
+
+The loop is the straightforward implementation: group df_long by country
+and np.interp each group's log-population onto the annual grid.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of, scaled_csv  # noqa: E402
+from dashboard import ingest, interpolate  # noqa: E402
+
+
+def loop_annual(df_long):
+    years = np.arange(df_long["Year"].min(), df_long["Year"].max() + 1)
+    parts = []
+    for country, group in df_long.groupby("Country", observed=True):
+        group = group.drop_duplicates("Year")
+        known = group["Year"].to_numpy()
+        grid = years[(years >= known[0]) & (years <= known[-1])]
+        values = np.exp(np.interp(grid, known, np.log(group["Population"].to_numpy(dtype="float64"))))
+        parts.append(pd.DataFrame({
+            "Country": country, "Year": grid, "Population": values,
+            "Growth_Rate": pd.Series(values).pct_change().to_numpy() * 100,
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "world_population.csv"
+        scaled_csv(csv_path, args.scale)
+        df_long, df_world = ingest.ingest_csv(csv_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    loop_time = best_of(lambda: loop_annual(df_long), args.repeat)
+    print(f"countries:             {df_long['Country'].nunique():,}")
+    print(f"per-country loop:      {loop_time * 1000:8.1f} ms")
+    for method in interpolate.METHODS:
+        vec_time = best_of(lambda: interpolate.annual_frames(df_long, df_world, method), args.repeat)
+        print(f"matrix ({method:6}):       {vec_time * 1000:8.1f} ms  ({loop_time / vec_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
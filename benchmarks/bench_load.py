@@ -0,0 +1,313 @@
+"""Concurrent-session load test of a local dashboard server.
+
+Usage: python benchmarks/bench_load.py [--sessions 1,4,16] [--seconds 10]
+           [--think-ms 0] [--countries N] [--p95-budget-ms 500] [--seed 0]
+           [--by-action]
+
+Starts ``python -m dashboard.serve`` (prewarmed, hot reload off) on a free
+local port and, for each concurrency level, connects that many simulated
+browser tabs to its websocket. Each tab opens the home page and then
+loops: switch page now and then, toggle the theme with the app.py button
+now and then, and otherwise move a random widget on the current page
+(continent, country, series, projection, year sliders, country selection,
+grouping, ranking controls). Widgets inside a fragment trigger a fragment rerun, as
+the browser would; auto-rerun timers (the export status poll) are not
+simulated. With --think-ms 0 every tab sends its next interaction as soon
+as the last rerun finishes, so a level measures saturation.
+
+Per level it reports reruns per second, p50/p95/p99 rerun latency (send to
+script_finished), bytes received per rerun and the server's resident
+memory growth per connected session. A last in-process pass opens every
+page with AppTest in two sessions and reports how many dataset-sized
+DataFrames the second one holds on top of those the first one shares,
+which the shared store should keep at zero.
+
+AppTest cannot drive concurrent sessions itself (each run swaps the
+process-wide Runtime singleton), which is why the load goes over the
+websocket instead.
+"""
+import argparse
+import asyncio
+import http.client
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WIDGETS = ("selectbox", "slider", "multiselect", "button", "radio", "checkbox")
+_RERUN = ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN
+
+# Page name -> labels of the widgets a simulated user moves on it
+ACTIONS = {
+    "Country Overview": [
+        "Filter by Continent (optional)", "Select Primary Country", "Select Year Range",
+        "Series", "Projection",
+    ],
+    "Compare Countries": ["Select Countries to Compare", "Select Year Range", "Series", "Compare"],
+    "Global Statistics": ["Select Year", "Countries shown", "Frames", "Group by"],
+}
+PAGE_SWITCH = 0.2
+THEME_TOGGLE = 0.05
+
+
+@dataclass
+class Widget:
+    kind: str
+    proto: object
+    fragment_id: str
+
+
+@dataclass
+class Session:
+    """One simulated browser tab"""
+    url: str
+    rng: random.Random
+    samples: list = field(default_factory=list)
+    errors: int = 0
+    pages: dict = field(default_factory=dict)
+    widgets: dict = field(default_factory=dict)
+    # Values this tab has set, sent back on every rerun like the browser does
+    states: dict = field(default_factory=dict)
+    page: str = ""
+
+    async def rerun(self, ws, label, page_hash=None, fragment_id="", trigger=None):
+        msg = BackMsg()
+        client = msg.rerun_script
+        if page_hash is not None:
+            client.page_script_hash = page_hash
+            self.states.clear()
+        else:
+            client.page_script_hash = self.pages.get(self.page, "")
+        if fragment_id:
+            client.fragment_id = fragment_id
+        live = {wid for wid in self.states if wid in self.widgets}
+        client.widget_states.widgets.extend(self.states[wid] for wid in live)
+        if trigger is not None:
+            client.widget_states.widgets.append(trigger)
+
+        start = time.perf_counter()
+        await ws.send(msg.SerializeToString())
+        received, seen = 0, {}
+        while True:
+            data = await ws.recv()
+            received += len(data)
+            fmsg = ForwardMsg()
+            fmsg.ParseFromString(data)
+            kind = fmsg.WhichOneof("type")
+            if kind == "navigation":
+                self.pages = {p.page_name: p.page_script_hash for p in fmsg.navigation.app_pages}
+            elif kind == "delta" and fmsg.delta.WhichOneof("type") == "new_element":
+                element = fmsg.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind == "exception":
+                    self.errors += 1
+                elif element_kind in WIDGETS:
+                    proto = getattr(element, element_kind)
+                    seen[proto.id] = Widget(element_kind, proto, fmsg.delta.fragment_id)
+            elif kind == "script_finished" and fmsg.script_finished != _RERUN:
+                break
+        self.samples.append((label, time.perf_counter() - start, received))
+
+        if fragment_id:
+            self.widgets = {wid: w for wid, w in self.widgets.items() if w.fragment_id != fragment_id}
+            self.widgets.update(seen)
+        else:
+            self.widgets = seen
+
+    def _find(self, label):
+        return next((w for w in self.widgets.values() if w.proto.label == label), None)
+
+    def _random_state(self, widget):
+        proto, state = widget.proto, WidgetState(id=widget.proto.id)
+        if widget.kind in ("selectbox", "radio"):
+            state.string_value = self.rng.choice(list(proto.options))
+        elif widget.kind == "multiselect":
+            options = list(proto.options)
+            state.string_array_value.data[:] = self.rng.sample(options, self.rng.randint(1, min(6, len(options))))
+        elif widget.kind == "slider":
+            values = np.arange(proto.min, proto.max + proto.step / 2, proto.step)
+            picked = sorted(self.rng.sample(list(values), len(proto.default)))
+            state.double_array_value.data[:] = [float(v) for v in picked]
+        else:
+            return None
+        return state
+
+    async def step(self, ws):
+        if self.page and self.rng.random() < THEME_TOGGLE:
+            await self.rerun(ws, "home", page_hash=self.pages["app"])
+            self.page = "app"
+            button = next(w for w in self.widgets.values() if w.kind == "button")
+            await self.rerun(ws, "theme toggle", trigger=WidgetState(id=button.proto.id, trigger_value=True))
+            return
+        if self.page not in ACTIONS or self.rng.random() < PAGE_SWITCH:
+            self.page = self.rng.choice(list(ACTIONS))
+            await self.rerun(ws, f"{self.page}: open", page_hash=self.pages[self.page])
+            return
+        label = self.rng.choice(ACTIONS[self.page])
+        widget = self._find(label)
+        state = self._random_state(widget) if widget is not None else None
+        if state is None:
+            return
+        self.states[state.id] = state
+        await self.rerun(ws, f"{self.page}: {label}", fragment_id=widget.fragment_id)
+
+
+async def drive(session, deadline, think, connected, release):
+    async with websockets.connect(session.url, subprotocols=["streamlit"], max_size=None) as ws:
+        await session.rerun(ws, "home")
+        session.page = "app"
+        while time.monotonic() < deadline:
+            await session.step(ws)
+            if think:
+                await asyncio.sleep(session.rng.expovariate(1 / think))
+        # Stay connected until memory has been sampled
+        connected.release()
+        await release.wait()
+
+
+async def run_level(url, sessions, seconds, think, seed, sample_memory):
+    tabs = [Session(url, random.Random(seed * 1000 + i)) for i in range(sessions)]
+    connected, release = asyncio.Semaphore(0), asyncio.Event()
+    start = time.monotonic()
+    tasks = [asyncio.create_task(drive(tab, start + seconds, think, connected, release)) for tab in tabs]
+    for _ in tabs:
+        await connected.acquire()
+    elapsed = time.monotonic() - start
+    memory = sample_memory()
+    release.set()
+    await asyncio.gather(*tasks)
+    return tabs, elapsed, memory
+
+
+def rss_bytes(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_healthy(port, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/_stcore/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become healthy")
+
+
+def print_actions(samples):
+    by_label = {}
+    for label, seconds, _ in samples:
+        by_label.setdefault(label, []).append(seconds * 1000)
+    for label, latency in sorted(by_label.items()):
+        p50, p95 = np.percentile(latency, [50, 95])
+        print(f"    {label:50} n={len(latency):<5d} p50 {p50:8.1f} ms  p95 {p95:8.1f} ms")
+
+
+def session_frame_copies():
+    """DataFrames as long as the dataset's long frame that a second AppTest
+    session keeps on top of those the first one shares"""
+    import gc
+
+    from bench_sessions import long_frames, open_session
+    from dashboard import data, store
+
+    sessions = [open_session()]
+    gc.collect()
+    rows = len(store._publisher(data.DATA_PATH).dataset.df_long)
+    shared = long_frames(rows)
+    sessions.append(open_session())
+    gc.collect()
+    return sum(1 for key in long_frames(rows) if key not in shared)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,4,16")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--countries", type=int, default=0, help="synthetic dataset size; 0 uses the bundled CSV")
+    parser.add_argument("--p95-budget-ms", type=float, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--by-action", action="store_true", help="latency per interaction at each level")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.sessions.split(",")]
+
+    workdir = Path(tempfile.mkdtemp())
+    env = dict(
+        os.environ, DASHBOARD_RELOAD_INTERVAL="0", DASHBOARD_SNAPSHOT_DIR=str(workdir / "snapshots")
+    )
+    if args.countries:
+        from generate import generate
+
+        generate(workdir / "population.csv", args.countries)
+        env["DASHBOARD_DATA_PATH"] = str(workdir / "population.csv")
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "dashboard.serve", "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        wait_healthy(port)
+        # One short session so lazily built views exist before the baseline
+        asyncio.run(run_level(url, 1, 2, 0, args.seed, lambda: None))
+        baseline = rss_bytes(server.pid)
+
+        print(f"{'sessions':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'KB/rerun':>9} {'errors':>6} {'RSS/session':>12}")
+        capacity = 0
+        for n in levels:
+            tabs, elapsed, memory = asyncio.run(
+                run_level(url, n, args.seconds, args.think_ms / 1000, args.seed, lambda: rss_bytes(server.pid))
+            )
+            samples = [s for tab in tabs for s in tab.samples]
+            latency = np.array([s[1] for s in samples]) * 1000
+            received = np.array([s[2] for s in samples])
+            p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+            if p95 <= args.p95_budget_ms:
+                capacity = max(capacity, n)
+            print(f"{n:8d} {len(samples) / elapsed:9.1f} {p50:8.1f} {p95:8.1f} {p99:8.1f} "
+                  f"{received.mean() / 1024:9.1f} {sum(t.errors for t in tabs):6d} "
+                  f"{(memory - baseline) / n / 2**20:9.2f} MiB")
+            if args.by_action:
+                print_actions(samples)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"sessions within p95 budget ({args.p95_budget_ms:.0f} ms): {capacity or 'none'}")
+    print(f"dataset-sized DataFrames copied per session: {session_frame_copies()}")
+
+
+if __name__ == "__main__":
+    main()
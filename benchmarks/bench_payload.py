@@ -0,0 +1,88 @@
+"""Bytes each chart and table sends to the browser, and how many trimming saves.
+
+Usage: python benchmarks/bench_payload.py [--countries N] [--annual]
+           [--compare-all]
+
+Runs every page headlessly with AppTest under profiling and prints, per
+page section, the chart/table bytes sent and the bytes payload trimming
+(dashboard.payload) kept off the wire, i.e. what the section would have
+sent untrimmed. --annual switches the pages to an annual series and
+--compare-all selects every country on the Compare page. --countries
+generates a synthetic dataset of that size instead of the bundled CSV.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PAGES = ["pages/1_Country_Overview.py", "pages/2_Compare_Countries.py", "pages/3_Global_Statistics.py"]
+ANNUAL = "Annual, constant growth (CAGR)"
+
+
+def run_worker(annual, compare_all):
+    from streamlit.testing.v1 import AppTest
+
+    rows = []
+    for page in PAGES:
+        at = AppTest.from_file(str(ROOT / page), default_timeout=600).run()
+        if annual:
+            for box in at.selectbox:
+                if box.label in ("Series", "Frames"):
+                    box.set_value(ANNUAL)
+        if compare_all and at.sidebar.multiselect:
+            at.sidebar.multiselect[0].set_value(at.sidebar.multiselect[0].options)
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        for record in at.session_state["_profile_records"]:
+            if record["payload_bytes"] or record["saved_bytes"]:
+                rows.append((Path(page).stem, record["section"], record["payload_bytes"], record["saved_bytes"]))
+
+    print(f"{'page':28} {'section':18} {'sent KB':>9} {'untrimmed KB':>13} {'saved':>6}")
+    for page, section, sent, saved in rows:
+        print(f"{page:28} {section:18} {sent / 1024:9.1f} {(sent + saved) / 1024:13.1f} "
+              f"{saved / (sent + saved):6.0%}")
+    sent = sum(row[2] for row in rows)
+    saved = sum(row[3] for row in rows)
+    print(f"{'total':47} {sent / 1024:9.1f} {(sent + saved) / 1024:13.1f} {saved / (sent + saved):6.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=0, help="synthetic dataset size; 0 uses the bundled CSV")
+    parser.add_argument("--annual", action="store_true")
+    parser.add_argument("--compare-all", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.annual, args.compare_all)
+        return
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        env = dict(
+            os.environ, DASHBOARD_SNAPSHOT_DIR=str(workdir / "snapshots"), DASHBOARD_PROFILE="1",
+            DASHBOARD_RELOAD_INTERVAL="0",
+        )
+        if args.countries:
+            from generate import generate
+
+            generate(workdir / "population.csv", args.countries)
+            env["DASHBOARD_DATA_PATH"] = str(workdir / "population.csv")
+        command = [sys.executable, __file__, "--worker"]
+        command += ["--annual"] * args.annual + ["--compare-all"] * args.compare_all
+        out = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(out, end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Fitting projections for every country: batch least squares vs a per-country loop.
+
+Usage: python benchmarks/bench_projection.py [--countries 3000] [--years 1950:2020]
+           [--step 10] [--repeat 3]
+
+The loop baseline fits the log-linear model one country at a time with
+np.polyfit, the way a per-country curve_fit would be driven; the batch path
+fits every model for every country in dashboard.projection.project().
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, projection  # noqa: E402
+from dashboard.interpolate import population_matrix  # noqa: E402
+
+
+def loop_loglinear(df_long, df_world, horizon):
+    _, _, knots, values = population_matrix(df_long, df_world)
+    years = np.arange(knots[-1], horizon + 1)
+    out = np.full((len(values), len(years)), np.nan)
+    for row, series in enumerate(values):
+        valid = ~np.isnan(series) & (series > 0)
+        if valid.sum() < 3:
+            continue
+        slope, intercept = np.polyfit(knots[valid], np.log(series[valid]), 1)
+        out[row] = np.exp(intercept + slope * years)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=3000)
+    parser.add_argument("--years", default="1950:2020")
+    parser.add_argument("--step", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1, args.step))
+        df_long, df_world = data.transform_data(data.load_data(csv_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"countries x census years: {args.countries:,} x {df_long['Year'].nunique()}")
+    loop_time = best_of(lambda: loop_loglinear(df_long, df_world, projection.HORIZON), args.repeat)
+    print(f"per-country loop, loglinear: {loop_time * 1000:8.1f} ms")
+    for model in projection.MODELS:
+        batch_time = best_of(lambda: projection.project(df_long, df_world, model), args.repeat)
+        print(f"batch {model:22} {batch_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
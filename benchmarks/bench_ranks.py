@@ -0,0 +1,75 @@
+"""Ranking race and rank-change queries: per-year nlargest vs the rank matrix.
+
+Usage: python benchmarks/bench_ranks.py [--countries 3000] [--years 1950:2100]
+           [--top 10] [--repeat 3]
+
+The nlargest path selects each frame's top N with its own nlargest and
+answers "who moved most between two years" by ranking both years and
+merging. The matrix path builds the Year x Country rank matrix once (timed
+separately), then reads frames and rank changes out of it.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, ranks  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+
+
+def nlargest_frames(df_long, n):
+    return [group.nlargest(n, "Population") for _, group in df_long.groupby("Year")]
+
+
+def nlargest_movers(df_long, start, end, n):
+    def ranked(year):
+        rows = df_long[df_long["Year"] == year].drop_duplicates("Country", keep="last")
+        return rows.assign(Rank=rows["Population"].rank(ascending=False, method="first"))
+    merged = ranked(start)[["Country", "Rank"]].merge(
+        ranked(end)[["Country", "Rank"]], on="Country", suffixes=(" start", " end")
+    )
+    change = merged["Rank start"] - merged["Rank end"]
+    return merged.loc[change.nlargest(n).index], merged.loc[change.nsmallest(n).index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=3000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1))
+        df_long, df_world = data.transform_data(data.load_data(csv_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    index = build_index(df_long, df_world)
+
+    build_time = best_of(lambda: ranks.build_ranks(index), args.repeat)
+    matrix = ranks.build_ranks(index)
+    frames_old = best_of(lambda: nlargest_frames(df_long, args.top), args.repeat)
+    frames_new = best_of(lambda: ranks.race_figure(matrix, "plotly", args.top), args.repeat)
+    movers_old = best_of(lambda: nlargest_movers(df_long, first, last, args.top), args.repeat)
+    movers_new = best_of(lambda: matrix.movers(first, last, args.top), args.repeat)
+
+    print(f"matrix:                {len(matrix.years)} years x {len(matrix.countries):,} countries")
+    print(f"rank matrix build:     {build_time * 1000:8.1f} ms (once per dataset version)")
+    print(f"race frames:           nlargest {frames_old * 1000:8.1f} ms   "
+          f"matrix + figure {frames_new * 1000:8.1f} ms ({frames_old / frames_new:.1f}x)")
+    print(f"climbers/fallers:      nlargest {movers_old * 1000:8.1f} ms   "
+          f"matrix {movers_new * 1000:8.1f} ms ({movers_old / movers_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
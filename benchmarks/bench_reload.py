@@ -0,0 +1,76 @@
+"""Reload cost after a CSV edit: full rebuild vs incremental refresh.
+
+Usage: python benchmarks/bench_reload.py [--countries 2000] [--repeat R]
+
+Both paths start from the already-read wide frame, so the CSV parse (timed
+separately) is left out. The full path re-melts everything and rebuilds the
+aggregate cube; the incremental path re-melts only what changed and
+recomputes the cube for the affected years.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, reload  # noqa: E402
+from dashboard.aggregates import build_cube  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+
+
+def edits(df_original):
+    """(name, edited wide frame) pairs"""
+    one_cell = df_original.copy()
+    one_cell.loc[0, one_cell.columns[-1]] += 1000
+    year = int(data.year_columns(df_original.columns)[-1][:4])
+    new_column = df_original.copy()
+    new_column[f"{year + 1} Population"] = (df_original[f"{year} Population"] * 1.01).round()
+    return [("one corrected cell", one_cell), ("appended year column", new_column)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries)
+        start = time.perf_counter()
+        df_original = data.load_data(csv_path)
+        read_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    df_long, df_world = data.transform_data(df_original)
+    cube = build_cube(df_long, df_world)
+    state = reload.source_state(df_original)
+
+    def full(edited):
+        new_long, new_world = data.transform_data(edited)
+        build_index(new_long, new_world)
+        build_cube(new_long, new_world)
+
+    def incremental(edited):
+        new_long, new_world, _, _ = reload.refresh(df_long, df_world, cube, state, edited)
+        build_index(new_long, new_world)
+
+    print(f"long rows:             {len(df_long):,}")
+    print(f"CSV read (both paths): {read_time * 1000:8.1f} ms")
+    for name, edited in edits(df_original):
+        full_time = best_of(lambda: full(edited), args.repeat)
+        incr_time = best_of(lambda: incremental(edited), args.repeat)
+        print(f"{name:22} full {full_time * 1000:8.1f} ms   incremental {incr_time * 1000:8.1f} ms"
+              f"   ({full_time / incr_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
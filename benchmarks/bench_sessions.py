@@ -0,0 +1,110 @@
+"""Measure memory retained per additional browser session.
+
+Usage: python benchmarks/bench_sessions.py [--sessions N] [--max-kib K]
+
+Each session is a headless AppTest that opens every page cold (no prior
+visit to app.py). Sessions are kept alive while memory is sampled, so the
+numbers reported are what a live session costs on top of the shared
+dataset. Growth is split into the rendered element tree AppTest keeps for
+each page (allocated inside streamlit or protobuf) and everything else a
+session retains, such as the page globals its fragments keep alive.
+
+The script exits non-zero if the sessions opened after the first one keep
+any DataFrame at least as long as the dataset's long frame (every session
+must share the Publisher's frames rather than hold its own), or if a
+session retains more than --max-kib outside the element tree.
+"""
+import argparse
+import gc
+import sys
+import sysconfig
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dashboard import data, store  # noqa: E402
+
+PAGES = [
+    "pages/1_Country_Overview.py",
+    "pages/2_Compare_Countries.py",
+    "pages/3_Global_Statistics.py",
+]
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_ELEMENT_TREE = ("/streamlit/", "/google/protobuf/")
+
+
+def open_session():
+    session = []
+    for page in PAGES:
+        at = AppTest.from_file(str(ROOT / page), default_timeout=60).run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        session.append(at)
+    return session
+
+
+def long_frames(rows):
+    """id -> DataFrame for every live DataFrame of at least rows rows"""
+    return {
+        id(obj): obj for obj in gc.get_objects()
+        if isinstance(obj, pd.DataFrame) and len(obj) >= rows
+    }
+
+
+def split_growth(before, after):
+    """(element tree, other) bytes allocated between two tracemalloc
+    snapshots and still live, by the innermost non-stdlib frame"""
+    tree = other = 0
+    for stat in after.compare_to(before, "traceback"):
+        frames = [frame.filename for frame in stat.traceback]
+        inner = next(
+            (name for name in reversed(frames) if "site-packages" in name or not name.startswith(_STDLIB)),
+            frames[-1],
+        )
+        if any(part in inner for part in _ELEMENT_TREE):
+            tree += stat.size_diff
+        else:
+            other += stat.size_diff
+    return tree, other
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--max-kib", type=float, default=512)
+    args = parser.parse_args()
+
+    # The first session pays for the shared dataset, its derived caches
+    # and warm imports
+    sessions = [open_session()]
+    gc.collect()
+    rows = len(store._publisher(data.DATA_PATH).dataset.df_long)
+    shared = long_frames(rows)
+    tracemalloc.start(32)
+    before = tracemalloc.take_snapshot()
+
+    for _ in range(args.sessions):
+        sessions.append(open_session())
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    tree, other = split_growth(before, after)
+    copies = [frame for key, frame in long_frames(rows).items() if key not in shared]
+
+    print(f"sessions:              {len(sessions)}")
+    print(f"element tree:          {tree / args.sessions / 1024:8.1f} KiB per session")
+    print(f"retained otherwise:    {other / args.sessions / 1024:8.1f} KiB per session "
+          f"(limit {args.max_kib:.0f})")
+    print(f"shared frames:         {len(shared)} of {rows:,}+ rows, {len(copies)} more held by sessions")
+    if copies or other / args.sessions / 1024 > args.max_kib:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Similar-country queries: pivot and normalize per rerun vs the trajectory index.
+
+Usage: python benchmarks/bench_similarity.py [--countries 3000] [--years 1950:2100]
+           [--queries 200] [--repeat 3]
+
+Each query picks a random country and year window. The pivot path does what
+a rerun would do without an index: pivot df_long to Country x Year, cut the
+window, normalize every trajectory and take distances to the query row. The
+index path builds dashboard.similarity's prefix sums once (timed
+separately) and answers each query from them.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, similarity  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+
+
+def pivot_nearest(df_long, country, year_range, k):
+    window = df_long[df_long["Year"].between(*year_range)]
+    matrix = np.log(window.pivot_table(
+        index="Country", columns="Year", values="Population", aggfunc="first", observed=True
+    ).astype("float64")).dropna()
+    paths = matrix.to_numpy() - matrix.to_numpy()[:, :1]
+    distance = np.sqrt(((paths - paths[matrix.index.get_loc(country)]) ** 2).mean(axis=1))
+    return matrix.index[np.argsort(distance)[1:k + 1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=3000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1))
+        df_long, df_world = data.transform_data(data.load_data(csv_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    index = build_index(df_long, df_world)
+
+    build_time = best_of(lambda: similarity.build_similarity(index), args.repeat)
+    trajectories = similarity.build_similarity(index)
+
+    rng = np.random.default_rng(0)
+    names = index.countries
+    queries = []
+    for _ in range(args.queries):
+        start, end = sorted(rng.choice(np.arange(first, last + 1), 2, replace=False))
+        queries.append((names[rng.integers(len(names))], (int(start), int(end))))
+    pivot_queries = queries[:max(1, args.queries // 20)]
+
+    start = time.perf_counter()
+    for country, year_range in pivot_queries:
+        pivot_nearest(df_long, country, year_range, 5)
+    pivot_time = (time.perf_counter() - start) / len(pivot_queries)
+
+    print(f"trajectories:          {len(trajectories.countries):,} x {len(trajectories.years)} years")
+    print(f"index build:           {build_time * 1000:8.1f} ms (once per dataset version)")
+    print(f"pivot per query:       {pivot_time * 1000:8.3f} ms")
+    for metric in similarity.METRICS:
+        start = time.perf_counter()
+        for country, year_range in queries:
+            trajectories.nearest(country, year_range, 5, metric)
+        query_time = (time.perf_counter() - start) / len(queries)
+        print(f"index, {metric:12}   {query_time * 1000:8.3f} ms per query ({pivot_time / query_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare a cold CSV parse + melt against mapping the column-file snapshot.
+
+Usage: python benchmarks/bench_snapshot.py [--scale N] [--repeat R]
+
+The bundled world_population.csv is replicated N times (with suffixed
+country names) to approximate a larger source file.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dashboard import data, snapshot  # noqa: E402
+
+
+def scaled_csv(path, scale):
+    df = data.load_data()
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        copy["Country"] = copy["Country"] + f" {i}"
+        copies.append(copy)
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "world_population.csv"
+        snapshot_dir = workdir / "snapshots"
+        scaled_csv(csv_path, args.scale)
+
+        csv_time = best_of(lambda: data.transform_data(data.load_data(csv_path)), args.repeat)
+        snapshot.load_or_build(csv_path, snapshot_dir)
+        snap_time = best_of(lambda: snapshot.load_or_build(csv_path, snapshot_dir), args.repeat)
+
+        rows = len(data.load_data(csv_path))
+        print(f"source rows:           {rows:,}")
+        print(f"CSV + melt:            {csv_time * 1000:8.1f} ms")
+        print(f"snapshot load:         {snap_time * 1000:8.1f} ms")
+        print(f"speedup:               {csv_time / snap_time:8.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
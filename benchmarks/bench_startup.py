@@ -0,0 +1,106 @@
+"""Cold-start cost of a fresh worker, with and without the boot prewarm.
+
+Usage: python benchmarks/bench_startup.py [--repeat 3] [--import-budget-ms 1000]
+           [--session-budget-ms 250]
+
+Every measurement runs in a new interpreter with an empty snapshot
+directory, as on a freshly scaled-out worker:
+
+  import         importing what app.py and the pages import at module level
+  first session  home page plus Country Overview for the first user
+  prewarm        dashboard.serve.prewarm() before the first session
+
+Exits with status 1 when the import or the prewarmed first session exceeds
+its budget, or when the export stack (kaleido) or plotly.express is loaded
+by the imports alone.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Only loaded on first use; importing the app must not pull them in
+DEFERRED = ["kaleido", "plotly.express"]
+
+
+def run_worker(prewarm):
+    start = time.perf_counter()
+    import pandas  # noqa: F401
+    import streamlit  # noqa: F401
+    from dashboard import charts, compare, export, figures, interpolate, profiling, store  # noqa: F401
+    result = {
+        "import_ms": (time.perf_counter() - start) * 1000,
+        "loaded": [name for name in DEFERRED if name in sys.modules],
+        "prewarm_ms": None,
+    }
+
+    from streamlit.testing.v1 import AppTest
+    if prewarm:
+        from dashboard import serve
+        result["prewarm_ms"] = serve.prewarm() * 1000
+
+    start = time.perf_counter()
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600).run()
+    at.switch_page("pages/1_Country_Overview.py").run()
+    result["session_ms"] = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    print(json.dumps(result))
+
+
+def measure(prewarm):
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        env = dict(os.environ, DASHBOARD_SNAPSHOT_DIR=str(workdir), DASHBOARD_RELOAD_INTERVAL="0")
+        args = [sys.executable, __file__, "--worker"] + (["--prewarm"] if prewarm else [])
+        out = subprocess.run(args, env=env, check=True, capture_output=True, text=True).stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--session-budget-ms", type=float, default=250)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--prewarm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.prewarm)
+        return
+
+    # Best of --repeat fresh interpreters, to keep disk cache noise out
+    cold = min((measure(False) for _ in range(args.repeat)), key=lambda r: r["session_ms"])
+    warm = min((measure(True) for _ in range(args.repeat)), key=lambda r: r["session_ms"])
+    import_ms = min(cold["import_ms"], warm["import_ms"])
+
+    print(f"import:                      {import_ms:8.1f} ms")
+    print(f"first session, cold:         {cold['session_ms']:8.1f} ms")
+    print(f"prewarm at boot:             {warm['prewarm_ms']:8.1f} ms")
+    print(f"first session, prewarmed:    {warm['session_ms']:8.1f} ms")
+    print(f"loaded by import:            {', '.join(cold['loaded']) or 'none of ' + ', '.join(DEFERRED)}")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import {import_ms:.1f} ms > {args.import_budget_ms:.1f} ms")
+    if warm["session_ms"] > args.session_budget_ms:
+        failures.append(f"prewarmed session {warm['session_ms']:.1f} ms > {args.session_budget_ms:.1f} ms")
+    if cold["loaded"]:
+        failures.append(f"eagerly imported {', '.join(cold['loaded'])}")
+    print(f"budget:                      {'EXCEEDED: ' + '; '.join(failures) if failures else 'ok'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
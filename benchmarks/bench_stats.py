@@ -0,0 +1,116 @@
+"""Every-country statistics: a per-country loop vs one vectorized pass, and
+streamed vs whole-file export.
+
+Usage: python benchmarks/bench_stats.py [--countries 3000] [--years 1950:2100]
+           [--repeat 3]
+
+The loop path computes each country's window statistics from its rows of
+the LongIndex, as the Compare page's summary table does for the selected
+countries. The matrix path lays out the Country x Year matrix once per
+dataset version (timed separately) and then builds the table for every
+country in one pass (dashboard.stats). Export compares the peak memory
+traced while writing the table with one to_csv() call against draining the
+chunks dashboard.api streams.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_snapshot import best_of  # noqa: E402
+from dashboard import data, stats  # noqa: E402
+from dashboard.index import build_index  # noqa: E402
+
+
+def loop_table(index, year_range):
+    rows = []
+    for country in index.countries:
+        df = index.country(country, year_range).dropna(subset=["Population"])
+        if df.empty:
+            continue
+        start, end = df.iloc[0], df.iloc[-1]
+        span = end["Year"] - start["Year"]
+        cagr = (end["Population"] / start["Population"]) ** (1 / span) - 1 if span > 0 else np.nan
+        peak = df.loc[df["Population"].idxmax()]
+        rows.append({
+            "Country": country,
+            "Total Change": end["Population"] - start["Population"],
+            "CAGR %": cagr * 100,
+            "Doubling Time (years)": np.log(2) / np.log1p(cagr) if cagr > 0 else np.nan,
+            "Peak Year": peak["Year"],
+        })
+    return pd.DataFrame(rows)
+
+
+def peak_kb(write):
+    tracemalloc.start()
+    try:
+        write()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def drain(chunks):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=3000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from generate import generate
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1))
+        df_long, df_world = data.transform_data(data.load_data(csv_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    index = build_index(df_long, df_world)
+    year_range = (first, last)
+
+    matrix_time = best_of(lambda: stats.build_stats(index), args.repeat)
+    matrix = stats.build_stats(index)
+    loop_time = best_of(lambda: loop_table(index, year_range), 1)
+    table_time = best_of(lambda: matrix.table(year_range), args.repeat)
+
+    # Both paths must agree on every country
+    expected = loop_table(index, year_range).set_index("Country")
+    table = matrix.table(year_range).set_index("Country").loc[expected.index]
+    for column in expected.columns:
+        assert np.allclose(
+            expected[column].to_numpy(dtype="float64"), table[column].to_numpy(dtype="float64"),
+            equal_nan=True, rtol=1e-6,
+        ), column
+
+    table = matrix.table(year_range)
+    whole_kb = peak_kb(lambda: table.to_csv(index=False).encode())
+    csv_kb = peak_kb(lambda: drain(stats.iter_csv(table)))
+    parquet_kb = peak_kb(lambda: drain(stats.iter_parquet(table)))
+
+    print(f"matrix:           {len(matrix.countries):,} countries x {len(matrix.years)} years")
+    print(f"stats matrix:     {matrix_time * 1000:8.1f} ms (once per dataset version)")
+    print(f"per window:       loop {loop_time * 1000:8.1f} ms   "
+          f"vectorized {table_time * 1000:8.1f} ms ({loop_time / table_time:.0f}x)")
+    print(f"export peak:      whole CSV {whole_kb:8.0f} KB   streamed CSV {csv_kb:8.0f} KB   "
+          f"streamed Parquet {parquet_kb:8.0f} KB (chunks of {stats.CHUNK_ROWS} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Host memory and readiness of N worker processes: private vs mapped frames.
+
+Usage: python benchmarks/bench_workers.py [--workers 4] [--countries 20000]
+           [--years 1950:2100]
+
+Starts --workers processes that each get the dataset frames, build the
+index and read every column once, as a Streamlit worker does before its
+first page. In the private mode each reads the frames from Parquet into
+its own memory, as snapshots were loaded before dashboard.columns; in the
+mapped mode each maps the same column-file snapshot read-only. Reports the
+time until the slowest worker has its frames and until it is ready, and
+the proportional set size (PSS, which splits shared pages between the
+processes mapping them) summed over the workers, from
+/proc/<pid>/smaps_rollup, so Linux only.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+MODES = ("private", "mapped")
+
+
+def run_worker(mode, workdir):
+    import pandas as pd
+
+    from dashboard import columns, snapshot
+    from dashboard.index import build_index
+
+    start = time.perf_counter()
+    if mode == "private":
+        frames = tuple(pd.read_parquet(Path(workdir) / f"{name}.parquet") for name in snapshot.FRAMES)
+    else:
+        frames = snapshot.load_snapshot(Path(workdir) / "population.csv", Path(workdir) / "snapshots")
+    loaded = time.perf_counter() - start
+    index = build_index(*frames)
+    for frame in frames:
+        for values in columns.buffers(frame):
+            values.sum()
+    ready = time.perf_counter() - start
+    print(f"{loaded * 1000:.1f} {ready * 1000:.1f} {len(index.frame)}", flush=True)
+    # Stay alive, holding the frames, until the parent has measured us
+    sys.stdin.read()
+
+
+def pss_kb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(mode, workdir, workers):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--worker", mode, str(workdir)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        timings = [[float(t) for t in proc.stdout.readline().split()[:2]] for proc in procs]
+        total = sum(pss_kb(proc.pid) for proc in procs)
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return max(t[0] for t in timings), max(t[1] for t in timings), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--countries", type=int, default=20000)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    from generate import generate
+
+    from dashboard import data, snapshot
+
+    first, last = (int(part) for part in args.years.split(":"))
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        csv_path = workdir / "population.csv"
+        generate(csv_path, args.countries, years=range(first, last + 1))
+        frames = data.transform_data(data.load_data(csv_path))
+        for name, frame in zip(snapshot.FRAMES, frames):
+            frame.to_parquet(workdir / f"{name}.parquet", index=False)
+        snapshot.save_snapshot(csv_path, frames, workdir / "snapshots")
+        rows = len(frames[0])
+        del frames
+
+        print(f"dataset: {args.countries:,} countries x {last - first + 1} years = {rows:,} rows, "
+              f"{args.workers} workers")
+        results = {mode: measure(mode, workdir, args.workers) for mode in MODES}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for mode, (loaded, ready, total) in results.items():
+        print(f"{mode:8} frames {loaded:8.1f} ms   ready {ready:8.1f} ms   host PSS {total / 1024:8.1f} MB "
+              f"({total / 1024 / args.workers:.1f} MB per worker)")
+    saved = results["private"][2] - results["mapped"][2]
+    print(f"mapped frames save {saved / 1024:.1f} MB over {args.workers} workers")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DASHBOARD_RELOAD_INTERVAL", "0")
+    main()
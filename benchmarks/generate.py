@@ -0,0 +1,102 @@
+"""Write synthetic wide CSVs in the world_population.csv schema.
+
+Usage: python benchmarks/generate.py OUT.csv [--countries N | --target-mb M]
+           [--years 1950:2100] [--step 1] [--continents K] [--variants V]
+           [--metrics K]
+
+Each row is one country (or country variant) with a "<year> Population"
+column per year, so file size scales as countries x variants x years.
+--metrics adds K more "<year> <Metric>" columns per year and an area
+column, for the multi-metric indicator store.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CONTINENTS = ["Africa", "Asia", "Europe", "North America", "Oceania", "South America"]
+VARIANTS = ["Medium", "High", "Low", "Constant fertility", "Zero migration"]
+METRICS = ["Urban Population", "Births", "Deaths", "Net Migration", "Median Age", "Life Expectancy"]
+
+# Average bytes a population cell takes in the CSV, including the comma
+_CELL_BYTES = 8
+
+
+def countries_for_size(target_mb, years, variants=1):
+    """Number of countries that makes a file of roughly target_mb"""
+    return max(1, int(target_mb * 1e6 / (len(years) * _CELL_BYTES * variants)))
+
+
+def generate(path, countries=200, years=range(1950, 2101), continents=6, variants=1,
+             seed=0, chunk_rows=5_000, metrics=0):
+    """Write the CSV to path in chunks and return the number of rows"""
+    years = list(years)
+    continent_names = [
+        CONTINENTS[i] if i < len(CONTINENTS) else f"Continent {i}" for i in range(continents)
+    ]
+    variant_names = VARIANTS[:variants] if variants <= len(VARIANTS) else [
+        f"Variant {i}" for i in range(variants)
+    ]
+    rng = np.random.default_rng(seed)
+    t = np.arange(len(years)) - len(years) // 2
+    metric_names = METRICS[:metrics] if metrics <= len(METRICS) else [
+        f"Metric {i}" for i in range(metrics)
+    ]
+    columns = ["Country", "Continent"] + [f"{year} Population" for year in years]
+
+    total = countries * variants
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    for start in range(0, total, chunk_rows):
+        rows = np.arange(start, min(start + chunk_rows, total))
+        country_ids, variant_ids = rows // variants, rows % variants
+
+        base = np.exp(rng.uniform(np.log(1e4), np.log(1.5e9), len(rows)))
+        rate = rng.normal(0.01, 0.012, len(rows)) + (variant_ids - variants / 2) * 0.001
+        values = np.rint(base[:, None] * np.exp(rate[:, None] * t[None, :] / 2)).astype(np.int64)
+
+        names = [
+            f"Country {c}" if variants == 1 else f"Country {c} ({variant_names[v]})"
+            for c, v in zip(country_ids, variant_ids)
+        ]
+        chunk = pd.DataFrame(values, columns=columns[2:])
+        for metric in metric_names:
+            scale = rng.uniform(0.01, 0.5, len(rows))
+            extra = np.round(values * scale[:, None], 2)
+            chunk = pd.concat(
+                [chunk, pd.DataFrame(extra, columns=[f"{year} {metric}" for year in years])], axis=1
+            )
+        if metric_names:
+            chunk["Area (km²)"] = np.round(np.exp(rng.uniform(np.log(10), np.log(1.7e7), len(rows))))
+        chunk.insert(0, "Continent", [continent_names[c % continents] for c in country_ids])
+        chunk.insert(0, "Country", names)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return total
+
+
+def parse_years(spec, step):
+    first, last = (int(part) for part in spec.split(":"))
+    return range(first, last + 1, step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out")
+    parser.add_argument("--countries", type=int)
+    parser.add_argument("--target-mb", type=float)
+    parser.add_argument("--years", default="1950:2100")
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--continents", type=int, default=6)
+    parser.add_argument("--variants", type=int, default=1)
+    parser.add_argument("--metrics", type=int, default=0)
+    args = parser.parse_args()
+
+    years = parse_years(args.years, args.step)
+    countries = args.countries or countries_for_size(args.target_mb or 10, years, args.variants)
+    rows = generate(args.out, countries, years, args.continents, args.variants, metrics=args.metrics)
+    size = Path(args.out).stat().st_size / 1e6
+    print(f"wrote {rows:,} rows x {len(years)} years to {args.out} ({size:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Data and computation layer shared by the dashboard pages."""
@@ -0,0 +1,121 @@
+"""Precomputed aggregates for the Global Statistics page.
+
+Everything the page shows for a given year is computed once per dataset
+version over all years, so moving the year slider is a dictionary lookup
+rather than a groupby, a per-continent loop and two sorts.
+"""
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class AggregateCube:
+    continent_totals: pd.DataFrame
+    year_summary: pd.DataFrame
+    continents_by_year: dict
+    top_population: dict
+    top_growth: dict
+
+    def continents(self, year):
+        """Continent totals for one year, largest first"""
+        return self.continents_by_year.get(year, self.continent_totals.iloc[:0])
+
+    def top_by_population(self, year):
+        return self.top_population.get(year, _EMPTY_TOP)
+
+    def top_by_growth(self, year):
+        return self.top_growth.get(year, _EMPTY_TOP)
+
+    def summary(self, year):
+        """World population, country/continent counts and mean growth for a year"""
+        if year not in self.year_summary.index:
+            return None
+        return self.year_summary.loc[year]
+
+
+_EMPTY_TOP = pd.DataFrame(
+    {"Country": pd.Series(dtype=str), "Continent": pd.Series(dtype=str),
+     "Population": pd.Series(dtype="Int64"), "Growth_Rate": pd.Series(dtype="float32")}
+)
+
+
+def _split_by_year(df):
+    return {int(year): group.drop(columns="Year").reset_index(drop=True)
+            for year, group in df.groupby("Year", sort=True)}
+
+
+def build_cube(df_long, df_world, top_n=10):
+    """Compute every per-year aggregate the Global Statistics page needs"""
+    plain = df_long.astype({"Country": str, "Continent": str})
+
+    # Year x Continent totals, country counts and share of the summed total
+    continent_totals = (
+        plain.groupby(["Year", "Continent"])
+        .agg(Population=("Population", "sum"), Countries=("Country", "size"))
+        .reset_index()
+    )
+    year_totals = continent_totals.groupby("Year")["Population"].transform("sum")
+    continent_totals["Share"] = (
+        continent_totals["Population"].astype("float64") / year_totals.astype("float64") * 100
+    )
+    continents_by_year = _split_by_year(
+        continent_totals.sort_values(["Year", "Population"], ascending=[True, False])
+    )
+
+    # Per-year top N, from one sort over all years
+    columns = ["Year", "Country", "Continent", "Population", "Growth_Rate"]
+    top_population = _split_by_year(
+        plain.sort_values(["Year", "Population"], ascending=[True, False])
+        .groupby("Year").head(top_n)[columns]
+    )
+    top_growth = _split_by_year(
+        plain.dropna(subset=["Growth_Rate"])
+        .sort_values(["Year", "Growth_Rate"], ascending=[True, False])
+        .groupby("Year").head(top_n)[columns]
+    )
+
+    # Per-year headline numbers
+    year_summary = plain.groupby("Year").agg(
+        Countries=("Country", "size"),
+        Continents=("Continent", "nunique"),
+        Avg_Growth_Rate=("Growth_Rate", "mean"),
+    )
+    year_summary["World_Population"] = df_world.set_index("Year")["Population"]
+
+    return AggregateCube(
+        continent_totals, year_summary, continents_by_year, top_population, top_growth
+    )
+
+
+def _merge_years(old, new, years):
+    merged = {year: value for year, value in old.items() if year not in years}
+    merged.update(new)
+    return dict(sorted(merged.items()))
+
+
+def update_cube(cube, df_long, df_world, years, top_n=10):
+    """Recompute the aggregates of the given years only; every aggregate is
+    per year, so the other years carry over unchanged"""
+    years = set(years)
+    if not years:
+        return cube
+    part = build_cube(df_long[df_long["Year"].isin(years)], df_world, top_n)
+
+    continent_totals = pd.concat(
+        [cube.continent_totals[~cube.continent_totals["Year"].isin(years)], part.continent_totals],
+        ignore_index=True,
+    ).sort_values(["Year", "Continent"], kind="stable").reset_index(drop=True)
+    year_summary = pd.concat(
+        [cube.year_summary.drop(index=list(years), errors="ignore"), part.year_summary.dropna(subset=["Countries"])]
+    ).sort_index()
+    year_summary["World_Population"] = df_world.set_index("Year")["Population"]
+
+    return replace(
+        cube,
+        continent_totals=continent_totals,
+        year_summary=year_summary,
+        continents_by_year=_merge_years(cube.continents_by_year, part.continents_by_year, years),
+        top_population=_merge_years(cube.top_population, part.top_population, years),
+        top_growth=_merge_years(cube.top_growth, part.top_growth, years),
+    )
@@ -0,0 +1,276 @@
+"""Read-only JSON API over the dashboard's data layer.
+
+Usage: python -m dashboard.api [--host 127.0.0.1] [--port 8600]
+
+Serves the series, rankings and continent totals the pages show, from the
+same Publisher (and so the same snapshot, index, cube and hot reload) the
+Streamlit app uses, without going through a script rerun:
+
+    GET /countries
+    GET /series/<country>?from=1970&to=2022[&series=log|linear|pchip]
+    GET /top?year=2022[&by=population|growth][&n=10]
+    GET /continents[?year=2022]
+    GET /stats?from=1970&to=2022[&series=...][&format=csv|parquet]
+
+Response bodies are memoized per dataset version and request, and carry an
+ETag derived from both, so a client that sends If-None-Match gets a 304
+until the data changes. Bodies are gzipped when the client accepts it.
+
+/stats is the every-country statistics table (dashboard.stats) as a file.
+It is not memoized: it is sent with chunked transfer encoding as it is
+written, a block of rows at a time, so the whole file is never held in
+memory. Its ETag depends only on the dataset version and the query.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import pandas as pd
+
+from dashboard import data, interpolate, stats
+from dashboard.figures import FigureCache
+from dashboard.store import Publisher
+
+CACHE_SIZE = int(os.environ.get("DASHBOARD_API_CACHE_SIZE", "4096"))
+
+# Bodies smaller than this are not worth compressing
+_GZIP_MIN_BYTES = 512
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(value):
+    """JSON-safe int/float, with NaN and missing values as null"""
+    if pd.isna(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+
+def _records(df, columns):
+    """Rows of df as dicts of plain JSON values"""
+    out = []
+    for row in df[list(columns)].itertuples(index=False):
+        out.append({
+            name: value if isinstance(value, str) else _number(value)
+            for name, value in zip(columns.values(), row)
+        })
+    return out
+
+
+def _int_param(query, name, default=None):
+    value = query.get(name)
+    if value is None:
+        if default is None:
+            raise APIError(400, f"missing parameter {name!r}")
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise APIError(400, f"parameter {name!r} must be an integer") from None
+
+
+class API:
+    """Routes requests to the current dataset and memoizes the responses"""
+
+    def __init__(self, publisher, cache_size=CACHE_SIZE):
+        self.publisher = publisher
+        self.responses = FigureCache(maxsize=cache_size)
+
+    def countries(self, dataset, query):
+        return {"countries": dataset.index.countries}
+
+    def series(self, dataset, query, country):
+        method = query.get("series")
+        if method is not None and method not in interpolate.METHODS:
+            raise APIError(400, f"series must be one of {', '.join(interpolate.METHODS)}")
+        index = dataset.index if method is None else self.publisher.annual_index(dataset, method)
+        if country not in index.countries:
+            raise APIError(404, f"unknown country {country!r}")
+        years = index.years
+        year_range = (_int_param(query, "from", years[0]), _int_param(query, "to", years[-1]))
+        rows = index.country(country, year_range)
+        return {
+            "country": country,
+            "series": method or "census",
+            "data": _records(rows, {"Year": "year", "Population": "population", "Growth_Rate": "growth_rate"}),
+        }
+
+    def top(self, dataset, query):
+        cube = self.publisher.cube(dataset)
+        year = _int_param(query, "year", dataset.index.years[-1])
+        by = query.get("by", "population")
+        if by not in ("population", "growth"):
+            raise APIError(400, "by must be 'population' or 'growth'")
+        n = _int_param(query, "n", 10)
+        rows = cube.top_by_population(year) if by == "population" else cube.top_by_growth(year)
+        return {
+            "year": year,
+            "by": by,
+            "data": _records(rows.head(n), {
+                "Country": "country", "Continent": "continent",
+                "Population": "population", "Growth_Rate": "growth_rate",
+            }),
+        }
+
+    def continents(self, dataset, query):
+        cube = self.publisher.cube(dataset)
+        columns = {
+            "Year": "year", "Continent": "continent", "Population": "population",
+            "Countries": "countries", "Share": "share",
+        }
+        if "year" not in query:
+            return {"data": _records(cube.continent_totals, columns)}
+        year = _int_param(query, "year")
+        totals = cube.continents(year).assign(Year=year)
+        return {"year": year, "data": _records(totals, columns)}
+
+    def route(self, dataset, path, query):
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["countries"]:
+            return self.countries(dataset, query)
+        if len(parts) == 2 and parts[0] == "series":
+            return self.series(dataset, query, parts[1])
+        if parts == ["top"]:
+            return self.top(dataset, query)
+        if parts == ["continents"]:
+            return self.continents(dataset, query)
+        raise APIError(404, f"no such endpoint {path!r}")
+
+    def stats_table(self, dataset, query):
+        """(statistics table, export format) for a /stats query"""
+        method = query.get("series")
+        if method is not None and method not in interpolate.METHODS:
+            raise APIError(400, f"series must be one of {', '.join(interpolate.METHODS)}")
+        export_format = query.get("format", "csv")
+        if export_format not in stats.FORMATS:
+            raise APIError(400, f"format must be one of {', '.join(stats.FORMATS)}")
+        matrix = self.publisher.stats(dataset, method)
+        years = matrix.years
+        year_range = (_int_param(query, "from", int(years[0])), _int_param(query, "to", int(years[-1])))
+        return matrix.table(year_range), export_format
+
+    def stream(self, target, headers):
+        """Return (status, headers, chunks) for a GET of a streamed
+        endpoint, or None if target is not one"""
+        url = urlsplit(target)
+        if url.path.strip("/") != "stats":
+            return None
+        query = dict(parse_qsl(url.query))
+        dataset = self.publisher.dataset
+        key = json.dumps([dataset.version, sorted(query.items())]).encode()
+        etag = '"%s"' % hashlib.sha1(key).hexdigest()[:20]
+        response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in {t.strip() for t in headers.get("If-None-Match", "").split(",")}:
+            return 304, response_headers, []
+        try:
+            table, export_format = self.stats_table(dataset, query)
+        except APIError as e:
+            body = json.dumps({"error": str(e), "version": dataset.version}, separators=(",", ":"))
+            return e.status, {"Content-Type": "application/json"}, [body.encode()]
+        extension, mime = stats.FORMATS[export_format]
+        response_headers["Content-Type"] = mime
+        response_headers["Content-Disposition"] = f'attachment; filename="population_stats.{extension}"'
+        return 200, response_headers, stats.iter_format(table, export_format)
+
+    def _build(self, dataset, path, query):
+        try:
+            status, payload = 200, self.route(dataset, path, query)
+        except APIError as e:
+            status, payload = e.status, {"error": str(e)}
+        payload["version"] = dataset.version
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        etag = '"%s"' % hashlib.sha1(dataset.version.encode() + body).hexdigest()[:20]
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= _GZIP_MIN_BYTES else None
+        return status, etag, body, compressed
+
+    def respond(self, target, headers):
+        """Return (status, headers, body) for a GET of target"""
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        dataset = self.publisher.dataset
+        key = (dataset.version, url.path, tuple(sorted(query.items())))
+        status, etag, body, compressed = self.responses.get_or_build(
+            key, lambda: self._build(dataset, url.path, query)
+        )
+
+        response_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if status == 200 and etag in {t.strip() for t in headers.get("If-None-Match", "").split(",")}:
+            return 304, response_headers, b""
+        response_headers["Content-Type"] = "application/json"
+        if compressed is not None and "gzip" in headers.get("Accept-Encoding", ""):
+            response_headers["Content-Encoding"] = "gzip"
+            body = compressed
+        return status, response_headers, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in two writes; with Nagle on, the body waits
+    # for the client's delayed ACK on every keep-alive response
+    disable_nagle_algorithm = True
+    api = None
+
+    def do_GET(self):
+        streamed = self.api.stream(self.path, self.headers)
+        if streamed is not None:
+            self._send_chunked(*streamed)
+            return
+        status, headers, body = self.api.respond(self.path, self.headers)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self, status, headers, chunks):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            if chunk:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        # One line per request would dominate the cost of a cached response
+        pass
+
+
+def make_server(host, port, path=data.DATA_PATH):
+    handler = type("Handler", (_Handler,), {"api": API(Publisher(path))})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
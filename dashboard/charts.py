@@ -0,0 +1,75 @@
+"""Figure builders shared by the pages and the export service.
+
+plotly.express is imported on first build rather than with the module: the
+pages only build on a figure cache miss.
+"""
+import plotly.graph_objects as go
+
+
+def country_trend(df, country, template):
+    """Population line chart for one country"""
+    import plotly.express as px
+
+    fig_line = px.line(
+        df,
+        x="Year",
+        y="Population",
+        title=f"Population Growth Trend: {country}",
+        markers=True,
+        template=template
+    )
+
+    fig_line.update_layout(
+        hovermode='x unified',
+        height=400
+    )
+    return fig_line
+
+
+def country_growth(growth_data, country, template):
+    """Growth rate bar chart for one country; growth_data has no NaN rates"""
+    import plotly.express as px
+
+    fig_growth = px.bar(
+        growth_data,
+        x="Year",
+        y="Growth_Rate",
+        title=f"Annual Growth Rate: {country}",
+        color="Growth_Rate",
+        color_continuous_scale="RdYlGn",
+        template=template
+    )
+
+    fig_growth.update_layout(height=300)
+    return fig_growth
+
+
+def add_projection(fig, projected, name, color=None, band=True):
+    """Overlay a projection.Projection.country() frame on a population chart:
+    a dashed line, and the uncertainty band unless band is False"""
+    if projected.empty:
+        return fig
+    line = {"dash": "dash"} if color is None else {"dash": "dash", "color": color}
+    if band:
+        fig.add_trace(go.Scatter(
+            x=projected["Year"], y=projected["Upper"], mode="lines", line={"width": 0},
+            showlegend=False, hoverinfo="skip", legendgroup=f"{name} projection",
+        ))
+        fig.add_trace(go.Scatter(
+            x=projected["Year"], y=projected["Lower"], mode="lines", line={"width": 0},
+            fill="tonexty", fillcolor=_translucent(color), showlegend=False,
+            hoverinfo="skip", legendgroup=f"{name} projection",
+        ))
+    fig.add_trace(go.Scatter(
+        x=projected["Year"], y=projected["Population"], mode="lines", line=line,
+        name=f"{name} (projected)", legendgroup=f"{name} projection",
+    ))
+    return fig
+
+
+def _translucent(color, alpha=0.15):
+    """rgba() of a '#rrggbb' color at alpha; grey when there is no color"""
+    if not color or not color.startswith("#") or len(color) != 7:
+        return f"rgba(128,128,128,{alpha})"
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alpha})"
@@ -0,0 +1,104 @@
+"""Frames stored as memory-mapped column files.
+
+Each column of a frame is one ``.npy`` file: categorical columns as their
+integer codes, nullable integer columns as their values plus a boolean
+mask, anything else as its plain numpy array. A small JSON dictionary next
+to them holds the column names and dtypes and the category strings.
+
+Reading a frame back maps every file read-only and wraps the mappings in
+pandas arrays without copying them, so any number of worker processes on a
+host share one copy of the data in the page cache instead of each holding
+its own, and opening a frame costs a few system calls however big it is.
+Frames built this way are read-only: writing into one in place, through
+pandas (``df.loc[...] = ...``) or to its arrays, raises ValueError
+("assignment destination is read-only"). Copy a frame before modifying it.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DICTIONARY = "dictionary.json"
+
+# Bump whenever the file layout changes
+FORMAT_VERSION = 1
+
+
+def write_frame(df, directory):
+    """Write df's columns (not its index) into directory as column files"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for position, (name, column) in enumerate(df.items()):
+        entry = {"name": name, "file": f"{position}.npy"}
+        dtype = column.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            entry.update(
+                kind="category",
+                categories=[str(category) for category in dtype.categories],
+                ordered=bool(dtype.ordered),
+            )
+            values = column.cat.codes.to_numpy()
+        elif isinstance(dtype, pd.core.dtypes.dtypes.BaseMaskedDtype):
+            entry.update(kind="masked", dtype=dtype.name, mask=f"{position}.mask.npy")
+            array = column.array
+            values = array._data
+            np.save(directory / entry["mask"], np.ascontiguousarray(array._mask))
+        else:
+            entry.update(kind="numpy")
+            values = column.to_numpy()
+        np.save(directory / entry["file"], np.ascontiguousarray(values), allow_pickle=False)
+        columns.append(entry)
+    with open(directory / DICTIONARY, "w") as f:
+        json.dump({"format": FORMAT_VERSION, "rows": len(df), "columns": columns}, f)
+
+
+def _map(path):
+    # asarray drops the memmap subclass but keeps the mapping as the buffer
+    return np.asarray(np.load(path, mmap_mode="r", allow_pickle=False))
+
+
+def map_frame(directory):
+    """The frame written into directory, backed by read-only mappings of
+    its column files"""
+    directory = Path(directory)
+    with open(directory / DICTIONARY) as f:
+        layout = json.load(f)
+    if layout.get("format") != FORMAT_VERSION:
+        raise ValueError(f"column files in {directory} have format {layout.get('format')!r}")
+
+    arrays = {}
+    for entry in layout["columns"]:
+        values = _map(directory / entry["file"])
+        if entry["kind"] == "category":
+            dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+            arrays[entry["name"]] = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        elif entry["kind"] == "masked":
+            array_type = pd.api.types.pandas_dtype(entry["dtype"]).construct_array_type()
+            arrays[entry["name"]] = array_type(values, _map(directory / entry["mask"]), copy=False)
+        else:
+            arrays[entry["name"]] = values
+    if any(len(values) != layout["rows"] for values in arrays.values()):
+        raise ValueError(f"column files in {directory} do not all have {layout['rows']} rows")
+    return pd.DataFrame(arrays, copy=False)
+
+
+def buffers(df):
+    """The numpy arrays behind df's columns: category codes, masked values
+    and their masks, or the plain arrays"""
+    for _, column in df.items():
+        array = column.array
+        if isinstance(array, pd.Categorical):
+            yield array.codes
+        elif isinstance(array, pd.core.arrays.masked.BaseMaskedArray):
+            yield array._data
+            yield array._mask
+        else:
+            yield column.to_numpy()
+
+
+def is_mapped(df):
+    """Whether every column of df is still backed by a read-only mapping
+    rather than a private copy"""
+    return not any(values.flags.writeable for values in buffers(df))
@@ -0,0 +1,127 @@
+"""Building blocks for comparing many countries at once.
+
+With a handful of countries the Compare page keeps its plotly express
+charts. Past ``HIGH_CARDINALITY`` series it switches to WebGL (Scattergl)
+traces built straight from the column arrays, and once the chart would
+carry more than ``MAX_POINTS`` points each series is downsampled with
+Largest-Triangle-Three-Buckets, which keeps the visual shape of a line with
+a fraction of its points. Summary statistics come from one groupby and the
+pivoted table is paged by country.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+HIGH_CARDINALITY = int(os.environ.get("DASHBOARD_COMPARE_WEBGL_AFTER", "20"))
+MAX_POINTS = int(os.environ.get("DASHBOARD_COMPARE_MAX_POINTS", "20000"))
+TABLE_PAGE_SIZE = 25
+
+# Fewer points than this per series would no longer look like a line
+_MIN_POINTS = 8
+
+
+def lttb(x, y, threshold):
+    """Positions of the threshold points LTTB keeps out of (x, y)"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    # Bucket edges over the interior points; first and last are always kept
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.intp) + 1
+    edges[-1] = n - 1
+    keep = np.empty(threshold, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def series_bounds(df):
+    """(country, start, stop) of each contiguous country block in df"""
+    codes = df["Country"].cat.codes.to_numpy()
+    if len(codes) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(codes)]
+    categories = df["Country"].cat.categories
+    return [(categories[codes[s]], int(s), int(e)) for s, e in zip(starts, stops)]
+
+
+def webgl_figure(df, y, title, template, height, max_points=MAX_POINTS):
+    """One Scattergl line per country, downsampled to max_points in total.
+
+    df must hold each country's rows contiguously and sorted by year, as
+    LongIndex.countries_frame() returns them.
+    """
+    df = df.dropna(subset=[y])
+    bounds = series_bounds(df)
+    years = df["Year"].to_numpy()
+    values = df[y].to_numpy(dtype="float64", na_value=np.nan)
+    per_series = max(_MIN_POINTS, max_points // max(len(bounds), 1))
+
+    traces = []
+    for country, start, stop in bounds:
+        x, v = years[start:stop], values[start:stop]
+        keep = lttb(x, v, per_series)
+        traces.append({"type": "scattergl", "mode": "lines", "name": country,
+                       "x": x[keep], "y": v[keep]})
+    # Hundreds of traces: skip plotly's per-property validation
+    layout = {
+        "title": {"text": title}, "height": height, "template": template,
+        "xaxis": {"title": {"text": "Year"}}, "yaxis": {"title": {"text": y}},
+        "legend": {"title": {"text": "Country"}},
+    }
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+
+def summary(df, countries):
+    """Latest year, max/min population and growth per country, in countries order"""
+    stats = df.groupby("Country", observed=True).agg(
+        Latest_Year=("Year", "max"),
+        Latest_Population=("Population", "max"),
+        Earliest_Population=("Population", "min"),
+    )
+    stats = stats.reindex([c for c in countries if c in stats.index])
+    latest = stats["Latest_Population"].astype("float64")
+    earliest = stats["Earliest_Population"].astype("float64")
+    return pd.DataFrame({
+        "Country": stats.index.astype(str),
+        "Latest Year": stats["Latest_Year"].astype(int).to_numpy(),
+        "Latest Population": stats["Latest_Population"].astype("int64").to_numpy(),
+        "Earliest Population": stats["Earliest_Population"].astype("int64").to_numpy(),
+        "Growth": ((latest - earliest) / earliest * 100).map("{:.2f}%".format).to_numpy(),
+    })
+
+
+def table_pages(countries, page_size=TABLE_PAGE_SIZE):
+    """Number of pages the pivoted table spans"""
+    return max(1, -(-len(countries) // page_size))
+
+
+def pivot_page(index, countries, year_range, page, page_size=TABLE_PAGE_SIZE):
+    """Year x Country populations for one page of countries"""
+    page_countries = countries[(page - 1) * page_size:page * page_size]
+    df = index.countries_frame(page_countries, year_range)
+    table_df = df.pivot_table(
+        index="Year",
+        columns="Country",
+        values="Population",
+        aggfunc="first",
+        observed=True
+    ).astype(int)
+    table_df.columns = table_df.columns.astype(str)
+    return table_df
@@ -0,0 +1,131 @@
+"""Loading and reshaping of the world population dataset."""
+import os
+import re
+from pathlib import Path
+
+import pandas as pd
+
+# DASHBOARD_DATA_PATH points the dashboard at another CSV in the same schema
+DATA_PATH = Path(os.environ.get(
+    "DASHBOARD_DATA_PATH", Path(__file__).resolve().parent.parent / "world_population.csv"
+))
+
+# Name of the synthetic aggregate row served alongside the real countries
+WORLD = "World"
+
+# The metric the pages are built around
+POPULATION = "Population"
+
+# Per-year source columns are named "<year> <Metric>", e.g. "2022 Population"
+_YEAR_METRIC = re.compile(r"^(\d{4}) (.+)$")
+
+
+def metric_columns(columns):
+    """Metric -> [(year, column), ...] for the "<year> <Metric>" columns
+    among columns, in order"""
+    metrics = {}
+    for col in columns:
+        match = _YEAR_METRIC.match(str(col))
+        if match:
+            metrics.setdefault(match.group(2), []).append((int(match.group(1)), col))
+    return metrics
+
+
+def year_columns(columns):
+    """The "<year> Population" columns among columns, in order"""
+    return [col for _, col in metric_columns(columns).get(POPULATION, [])]
+
+
+def load_data(path=DATA_PATH):
+    """Read the wide-format population CSV"""
+    return pd.read_csv(path)
+
+
+def check_labels(df, columns):
+    """Raise ValueError if a row of df has a value in columns but no Country
+    or Continent to file it under; rows without any value are dropped
+    anyway and pass"""
+    blank = df[['Country', 'Continent']].isna()
+    if not blank.to_numpy().any():
+        return
+    counted = df.loc[blank.any(axis=1), columns].apply(pd.to_numeric, errors='coerce').notna().any(axis=1)
+    for column in ('Country', 'Continent'):
+        missing = counted.index[counted & blank.loc[counted.index, column]]
+        if len(missing):
+            # The index counts data rows from 0; line 1 is the header
+            lines = ", ".join(str(row + 2) for row in missing[:10])
+            more = f" and {len(missing) - 10} more" if len(missing) > 10 else ""
+            raise ValueError(f"{column} is blank on CSV line(s) {lines}{more}")
+
+
+def transform_data(df_original):
+    """Transform data from wide to long format.
+
+    Returns (df_long, df_world) in a compact schema: categorical Country and
+    Continent sharing one set of categories, int16 Year, nullable Int64
+    Population and float32 Growth_Rate. World totals (the source's own World
+    row when it has one, otherwise the sum over countries) are kept in their
+    own small frame and joined on demand by the index instead of being
+    concatenated onto df_long.
+    """
+    # Get all year columns (every "<year> Population" column)
+    columns = year_columns(df_original.columns)
+    check_labels(df_original, columns)
+
+    # Melt the dataframe
+    df_long = pd.melt(
+        df_original[['Country', 'Continent'] + columns],
+        id_vars=['Country', 'Continent'],
+        value_vars=columns,
+        var_name='Year',
+        value_name='Population'
+    )
+
+    # Extract year from column name (e.g., "2022 Population" -> 2022)
+    df_long['Year'] = df_long['Year'].str.extract(r'(\d{4})', expand=False).astype('int16')
+
+    # Convert population to numeric, handling commas and other formats
+    df_long['Population'] = pd.to_numeric(df_long['Population'], errors='coerce')
+
+    # Drop rows with NaN populations
+    df_long = df_long.dropna(subset=['Population'])
+
+    # Populations are head counts; fractional values (e.g. model estimates)
+    # are rounded to the nearest person so they fit the Int64 column
+    df_long['Population'] = df_long['Population'].round()
+
+    # The source may carry its own World row; it is the World series, not a
+    # country, and must not be summed into the World totals again
+    source_world = df_long[df_long['Country'] == WORLD]
+    df_long = df_long[df_long['Country'] != WORLD]
+
+    # Categories are shared with df_world so the two frames concatenate
+    # without falling back to object columns
+    df_long['Country'] = df_long['Country'].astype(
+        pd.CategoricalDtype(sorted(set(df_long['Country']) | {WORLD}))
+    )
+    df_long['Continent'] = df_long['Continent'].astype(
+        pd.CategoricalDtype(sorted(set(df_long['Continent']) | {WORLD}))
+    )
+
+    # Calculate growth rate
+    df_long = df_long.sort_values(['Country', 'Year']).reset_index(drop=True)
+    df_long['Growth_Rate'] = (
+        df_long.groupby('Country', observed=True)['Population'].pct_change() * 100
+    ).astype('float32')
+    df_long['Population'] = df_long['Population'].astype('Int64')
+
+    # Get world population data
+    if source_world.empty:
+        world_pop = df_long.groupby('Year')['Population'].sum()
+    else:
+        world_pop = source_world.groupby('Year')['Population'].first().astype('Int64')
+    df_world = pd.DataFrame({
+        'Country': pd.Categorical([WORLD] * len(world_pop), dtype=df_long['Country'].dtype),
+        'Continent': pd.Categorical([WORLD] * len(world_pop), dtype=df_long['Continent'].dtype),
+        'Year': world_pop.index.to_numpy(),
+        'Population': world_pop.array,
+        'Growth_Rate': (world_pop.astype('float64').pct_change() * 100).to_numpy(dtype='float32'),
+    })
+
+    return df_long, df_world
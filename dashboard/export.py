@@ -0,0 +1,216 @@
+"""Background export of charts to PNG, SVG and HTML.
+
+Exports run on a process-wide worker pool instead of the script thread, so
+clicking export never freezes the session. Static images go through one
+warm kaleido renderer that is started on first use and then reused, and
+rendered artifacts are cached by a hash of the figure, so exporting the same
+chart twice renders it once. Batch jobs stream their results into a zip
+archive on disk as they complete. A finished job is read into memory once
+and its file deleted; a job dropped unread, say because its session ended,
+deletes its file when it is garbage collected.
+"""
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable
+
+import streamlit as st
+
+from dashboard import charts
+from dashboard.figures import FigureCache
+
+# Display name -> (file extension, mime type)
+FORMATS = {
+    "PNG": ("png", "image/png"),
+    "SVG": ("svg", "image/svg+xml"),
+    "HTML": ("html", "text/html"),
+}
+
+EXPORT_WORKERS = int(os.environ.get("DASHBOARD_EXPORT_WORKERS", "2"))
+MAX_ARTIFACTS = int(os.environ.get("DASHBOARD_EXPORT_CACHE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class ExportItem:
+    """One chart to render; build() returns the plotly figure"""
+    file_stem: str
+    export_format: str
+    build: Callable
+
+    @property
+    def file_name(self):
+        return f"{self.file_stem}.{FORMATS[self.export_format][0]}"
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    """What a finished ExportJob produced, held in memory"""
+    file_name: str
+    mime: str
+    # None when every chart failed
+    data: bytes
+    errors: list
+    total: int
+
+
+def _unlink(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+class ExportJob:
+    """Progress and result of one submitted batch"""
+
+    def __init__(self, items, archive_name):
+        self.items = list(items)
+        self.archive_name = archive_name
+        self.total = len(self.items)
+        self.done = 0
+        self.errors = []
+        self.path = None
+        self._finished = threading.Event()
+        # Deletes the file once, on discard() or when the job is collected
+        self._remove = None
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def single(self):
+        """True when the job holds one chart, downloaded as-is rather than zipped"""
+        return self.total == 1
+
+    @property
+    def file_name(self):
+        return self.items[0].file_name if self.single else f"{self.archive_name}.zip"
+
+    @property
+    def mime(self):
+        return FORMATS[self.items[0].export_format][1] if self.single else "application/zip"
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def discard(self):
+        if self._remove is not None:
+            self._remove()
+
+    def collect(self):
+        """The ExportResult of a finished job; reads its file and deletes it"""
+        try:
+            data = self.read() if self.path is not None and self.done > len(self.errors) else None
+        finally:
+            self.discard()
+        return ExportResult(self.file_name, self.mime, data, list(self.errors), self.total)
+
+
+class ExportService:
+    def __init__(self, workers=EXPORT_WORKERS):
+        self.workers = workers
+        self.artifacts = FigureCache(maxsize=MAX_ARTIFACTS)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="export")
+        self._renderer_lock = threading.Lock()
+        self._renderer_started = False
+
+    def _start_renderer(self):
+        # kaleido is imported here so pages never pay for it unless someone
+        # exports; the sync server keeps one browser warm for all renders
+        with self._renderer_lock:
+            if not self._renderer_started:
+                import kaleido
+                # Constructing Kaleido raises if Chrome is missing, whereas the
+                # sync server would die in its own thread and block renders
+                kaleido.Kaleido(n=self.workers)
+                kaleido.start_sync_server(n=self.workers, silence_warnings=True)
+                self._renderer_started = True
+
+    def _render(self, fig, export_format):
+        if export_format == "HTML":
+            return fig.to_html(include_plotlyjs="cdn").encode()
+        self._start_renderer()
+        return fig.to_image(format=FORMATS[export_format][0])
+
+    def render(self, fig, export_format):
+        """Bytes of fig in export_format, rendered at most once per figure"""
+        spec = fig.to_json()
+        key = hashlib.sha256(f"{export_format}:{spec}".encode()).hexdigest()
+        return self.artifacts.get_or_build(key, lambda: self._render(fig, export_format))
+
+    def _render_item(self, item):
+        return self.render(item.build(), item.export_format)
+
+    def submit(self, items, archive_name="charts"):
+        """Start rendering items in the background and return the ExportJob"""
+        job = ExportJob(items, archive_name)
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return job
+
+    def _run(self, job):
+        try:
+            fd, path = tempfile.mkstemp(prefix="dashboard-export-")
+            os.close(fd)
+            job.path = path
+            job._remove = weakref.finalize(job, _unlink, path)
+            futures = {self._pool.submit(self._render_item, item): item for item in job.items}
+            if job.single:
+                item, future = job.items[0], next(iter(futures))
+                try:
+                    with open(path, "wb") as f:
+                        f.write(future.result())
+                except Exception as e:
+                    job.errors.append(f"{item.file_name}: {e}")
+                job.done = 1
+            else:
+                with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                    for future in as_completed(futures):
+                        item = futures[future]
+                        try:
+                            archive.writestr(item.file_name, future.result())
+                        except Exception as e:
+                            job.errors.append(f"{item.file_name}: {e}")
+                        job.done += 1
+        except Exception as e:
+            # The temporary file could not be created or written, so
+            # whatever it holds is not a result
+            job.errors.append(f"{job.file_name}: {e}")
+            job.discard()
+            job.path = None
+        finally:
+            job._finished.set()
+
+@st.cache_resource
+def get_export_service():
+    return ExportService()
+
+
+def country_items(index, countries, year_range, export_formats, template):
+    """Export items for the Country Overview charts of every country given"""
+    items = []
+    for country in countries:
+        df = index.country(country, year_range)
+        if df.empty:
+            continue
+        growth_data = df.dropna(subset=["Growth_Rate"])
+        for export_format in export_formats:
+            items.append(ExportItem(
+                f"{country}_population", export_format,
+                lambda df=df, country=country: charts.country_trend(df, country, template),
+            ))
+            if not growth_data.empty:
+                items.append(ExportItem(
+                    f"{country}_growth_rate", export_format,
+                    lambda df=growth_data, country=country: charts.country_growth(df, country, template),
+                ))
+    return items
@@ -0,0 +1,116 @@
+"""Process-wide LRU cache of built plotly figures.
+
+Building a figure with plotly express is the largest per-rerun CPU cost on
+every page, and most sessions ask for the same few views (the default
+Kenya/World comparison, the latest year on Global Statistics, ...). Figures
+are cached as JSON keyed by chart kind, filter parameters and dataset
+version. The theme template is applied when a figure is served rather than
+being part of the key, so toggling the theme never rebuilds a chart.
+
+Figures are trimmed for the wire (see dashboard.payload) before they are
+cached, and the template is pruned to the trace types a figure draws; the
+bytes both save are counted in the profiling records.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+import streamlit as st
+
+from dashboard import payload, profiling, store
+
+MAX_FIGURES = int(os.environ.get("DASHBOARD_FIGURE_CACHE_SIZE", "512"))
+
+
+class FigureCache:
+    """Bounded LRU mapping of key -> figure JSON with hit/miss counters"""
+
+    def __init__(self, maxsize=MAX_FIGURES):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+
+        # Build outside the lock; two sessions racing on the same key just
+        # build it twice
+        spec = build()
+        with self._lock:
+            self._entries[key] = spec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return spec
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+def _dumps(spec):
+    return json.dumps(spec, separators=(",", ":"), cls=PlotlyJSONEncoder)
+
+
+@st.cache_resource
+def _template_json(template, trace_types):
+    """(JSON, bytes saved) of the template pruned to trace_types"""
+    full = json.loads(_dumps(pio.templates[template].to_plotly_json()))
+    pruned = _dumps(payload.trim_template(full, trace_types))
+    return pruned, len(_dumps(full)) - len(pruned)
+
+
+def _serialize(fig):
+    """(JSON, bytes saved) of the trimmed figure, without its template"""
+    spec = json.loads(fig.to_json())
+    spec["layout"].pop("template", None)
+    raw = len(_dumps(spec))
+    trimmed = _dumps(payload.trim_figure(spec))
+    return trimmed, raw - len(trimmed)
+
+
+def _trace_types(spec):
+    traces = spec["data"] + [trace for frame in spec.get("frames", []) for trace in frame.get("data", [])]
+    return tuple(sorted({trace.get("type", "scatter") for trace in traces}))
+
+
+def cached_figure(kind, params, build, template):
+    """Return the figure for (kind, params) on the current dataset.
+
+    build() is only called on a cache miss and must depend on nothing but
+    params and the dataset; params must be hashable.
+    """
+    key = (kind, store.get_dataset().version, params)
+    spec, saved = get_figure_cache().get_or_build(key, lambda: _serialize(build()))
+    spec = json.loads(spec)
+    template_json, template_saved = _template_json(template, _trace_types(spec))
+    spec["layout"]["template"] = json.loads(template_json)
+    profiling.saved(saved + template_saved)
+    return go.Figure(spec, _validate=False)
@@ -0,0 +1,273 @@
+"""Population totals for arbitrary, possibly overlapping groupings of countries.
+
+A grouping (continents, trade blocs, economic forums, or any regions listed
+in the JSON file at ``DASHBOARD_GROUPINGS_PATH``) is stored as a sparse
+Country x Group membership matrix in compressed form: the country rows and
+weights of every membership sorted by group, plus where each group's run
+starts. A country may belong to any number of groups of a grouping, or to
+none.
+
+Every country is laid out once per dataset version and series as a Country
+x Year matrix of populations next to one counting the source rows that
+report a value. Totals and reporting-country counts for every
+group and year then come out of one sparse product of the membership
+matrix against both, so adding a grouping costs one multiply rather than a
+groupby per widget change. Shares and growth rates follow from the totals
+with elementwise arithmetic.
+
+Duplicate rows of a country in the source are summed, as the continent
+groupby on Global Statistics always has, so the Continent grouping gives
+the same totals as dashboard.aggregates.
+"""
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+
+# A JSON object of grouping name -> {group name: [country, ...]}; its
+# groupings are offered next to the built-in ones and may replace them
+GROUPINGS_PATH = os.environ.get("DASHBOARD_GROUPINGS_PATH", "")
+
+# Built from each country's Continent column rather than a member list
+CONTINENT = "Continent"
+
+BUILTIN = {
+    "Trade bloc": {
+        "European Union": [
+            "Austria", "Belgium", "Bulgaria", "Croatia", "Cyprus", "Czech Republic", "Denmark",
+            "Estonia", "Finland", "France", "Germany", "Greece", "Hungary", "Ireland", "Italy",
+            "Latvia", "Lithuania", "Luxembourg", "Malta", "Netherlands", "Poland", "Portugal",
+            "Romania", "Slovakia", "Slovenia", "Spain", "Sweden",
+        ],
+        "ASEAN": [
+            "Brunei", "Cambodia", "Indonesia", "Laos", "Malaysia", "Myanmar", "Philippines",
+            "Singapore", "Thailand", "Vietnam",
+        ],
+        "USMCA": ["Canada", "Mexico", "United States"],
+        "Mercosur": ["Argentina", "Bolivia", "Brazil", "Paraguay", "Uruguay"],
+        "East African Community": [
+            "Burundi", "DR Congo", "Kenya", "Rwanda", "Somalia", "South Sudan", "Tanzania", "Uganda",
+        ],
+        "Gulf Cooperation Council": [
+            "Bahrain", "Kuwait", "Oman", "Qatar", "Saudi Arabia", "United Arab Emirates",
+        ],
+    },
+    "Economic forum": {
+        "G7": ["Canada", "France", "Germany", "Italy", "Japan", "United Kingdom", "United States"],
+        "G20": [
+            "Argentina", "Australia", "Brazil", "Canada", "China", "France", "Germany", "India",
+            "Indonesia", "Italy", "Japan", "Mexico", "Russia", "Saudi Arabia", "South Africa",
+            "South Korea", "Turkey", "United Kingdom", "United States",
+        ],
+        "BRICS": [
+            "Brazil", "China", "Egypt", "Ethiopia", "India", "Indonesia", "Iran", "Russia",
+            "South Africa", "United Arab Emirates",
+        ],
+    },
+}
+
+
+def load(path=GROUPINGS_PATH):
+    """Grouping name -> {group: [countries]} for every grouping on offer.
+
+    The Continent grouping maps to None. Groupings from the file at path
+    (if any) come after the built-in ones.
+    """
+    groupings = {CONTINENT: None, **BUILTIN}
+    if path:
+        with open(Path(path)) as f:
+            for name, groups in json.load(f).items():
+                groupings[name] = {
+                    str(group): [str(country) for country in members] for group, members in groups.items()
+                }
+    return groupings
+
+
+@dataclass(frozen=True)
+class PopulationMatrix:
+    countries: np.ndarray
+    continents: np.ndarray
+    # Country -> row in values
+    rows: dict
+    years: np.ndarray
+    # Country x (2 * Year): summed populations (0 where missing), then the
+    # number of source rows behind each cell
+    values: np.ndarray
+
+    @property
+    def totals(self):
+        """Population summed over every country, per year"""
+        return self.values[:, :len(self.years)].sum(axis=0)
+
+
+@dataclass(frozen=True)
+class Membership:
+    grouping: str
+    groups: np.ndarray
+    # One entry per (country, group) membership, sorted by group; group g
+    # owns entries starts[g]:starts[g + 1]
+    rows: np.ndarray
+    starts: np.ndarray
+    weights: np.ndarray
+    # Members named in the definition that the dataset does not have
+    missing: tuple
+
+    @property
+    def partition(self):
+        """Whether no country belongs to more than one group"""
+        return len(np.unique(self.rows)) == len(self.rows)
+
+
+@dataclass(frozen=True)
+class GroupAggregate:
+    """Per-group, per-year totals of one grouping.
+
+    countries_frame() and years mirror LongIndex, with each group in the
+    Country column, so group series can stand in for country series.
+    """
+    grouping: str
+    groups: np.ndarray
+    partition: bool
+    # Group -> row in the matrices below
+    rows: dict
+    year_values: np.ndarray
+    # Group x Year; NaN where no member reports a value
+    totals: np.ndarray
+    counts: np.ndarray
+    # Percent of the summed total over all countries, and change from the
+    # previous year column
+    shares: np.ndarray
+    growth: np.ndarray
+
+    @property
+    def years(self):
+        """All years, in ascending order"""
+        return [int(year) for year in self.year_values]
+
+    @property
+    def countries(self):
+        return list(self.groups)
+
+    def year(self, year):
+        """Group, Population, Countries, Share and Growth_Rate for one year,
+        largest first, leaving out groups without a value"""
+        col = int(np.searchsorted(self.year_values, year))
+        if col == len(self.year_values) or self.year_values[col] != year:
+            rows = np.arange(0)
+        else:
+            rows = np.flatnonzero(~np.isnan(self.totals[:, col]))
+            rows = rows[np.argsort(-self.totals[rows, col], kind="stable")]
+            col = np.full(len(rows), col)
+        return pd.DataFrame({
+            "Group": self.groups[rows],
+            "Population": self.totals[rows, col].astype("int64"),
+            "Countries": self.counts[rows, col].astype("int64"),
+            "Share": self.shares[rows, col],
+            "Growth_Rate": self.growth[rows, col],
+        })
+
+    def countries_frame(self, groups, year_range=None):
+        """Year, Country (the group), Population, Growth_Rate and Countries
+        for several groups, grouped by group in the given order"""
+        lo, hi = 0, len(self.year_values)
+        if year_range is not None:
+            lo = int(np.searchsorted(self.year_values, year_range[0], side="left"))
+            hi = int(np.searchsorted(self.year_values, year_range[1], side="right"))
+        rows = [self.rows[group] for group in groups if group in self.rows]
+        totals = self.totals[rows, lo:hi]
+        keep = ~np.isnan(totals).ravel()
+        names = [str(group) for group in self.groups[rows]]
+        return pd.DataFrame({
+            "Year": np.tile(self.year_values[lo:hi], len(rows))[keep],
+            "Country": pd.Categorical(np.repeat(names, hi - lo)[keep], categories=names),
+            "Population": pd.array(totals.ravel()[keep].round(), dtype="Int64"),
+            "Growth_Rate": self.growth[rows, lo:hi].ravel()[keep].astype("float32"),
+            "Countries": self.counts[rows, lo:hi].ravel()[keep].astype("int64"),
+        })
+
+    def frame(self, year_range=None):
+        """Every group's rows, as countries_frame() lays them out"""
+        return self.countries_frame(self.groups, year_range)
+
+
+def build_matrix(index):
+    """Country x Year populations and row counts of a LongIndex's countries"""
+    frame = index.frame
+    codes = frame["Country"].cat.codes.to_numpy()
+    years = np.union1d(frame["Year"].to_numpy(), index.world["Year"].to_numpy())
+    cols = np.searchsorted(years, frame["Year"].to_numpy())
+    populations = frame["Population"].to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(populations)
+
+    categories = frame["Country"].cat.categories
+    values = np.zeros((len(categories), 2 * len(years)))
+    np.add.at(values, (codes[present], cols[present]), populations[present])
+    np.add.at(values, (codes[present], cols[present] + len(years)), 1)
+
+    continents = np.full(len(categories), "", dtype=object)
+    continents[codes] = frame["Continent"].cat.categories[frame["Continent"].cat.codes.to_numpy()]
+    countries = categories.to_numpy(dtype=object)
+    return PopulationMatrix(
+        countries, continents, {name: i for i, name in enumerate(countries)}, years, values,
+    )
+
+
+def membership(matrix, grouping, definition):
+    """Sparse Country x Group membership of a grouping over matrix's countries.
+
+    definition is None for the Continent grouping, else {group: [countries]}.
+    """
+    if definition is None:
+        reporting = matrix.values[:, len(matrix.years):].any(axis=1)
+        groups, cols = np.unique(matrix.continents[reporting].astype(str), return_inverse=True)
+        rows = np.flatnonzero(reporting)
+        missing = ()
+    else:
+        groups = np.array(list(definition), dtype=object)
+        pairs = [
+            (matrix.rows[country], col)
+            for col, members in enumerate(definition.values())
+            for country in dict.fromkeys(members) if country in matrix.rows and country != WORLD
+        ]
+        rows, cols = (np.array(part, dtype=np.intp) for part in zip(*pairs)) if pairs else (
+            np.arange(0), np.arange(0)
+        )
+        missing = tuple(sorted({
+            country for members in definition.values() for country in members
+            if country not in matrix.rows
+        }))
+    order = np.argsort(cols, kind="stable")
+    starts = np.searchsorted(cols[order], np.arange(len(groups) + 1))
+    return Membership(
+        grouping, np.asarray(groups, dtype=object), rows[order], starts,
+        np.ones(len(rows)), missing,
+    )
+
+
+def aggregate(matrix, member):
+    """Totals, reporting counts, shares and growth of every group and year"""
+    n_years = len(matrix.years)
+    # The sparse product: membership transposed times the Country x Year
+    # values and counts, summing each group's run of member rows
+    product = np.zeros((len(member.groups), 2 * n_years))
+    nonempty = np.flatnonzero(np.diff(member.starts) > 0)
+    if len(nonempty):
+        weighted = member.weights[:, None] * matrix.values[member.rows]
+        product[nonempty] = np.add.reduceat(weighted, member.starts[nonempty], axis=0)
+    totals, counts = product[:, :n_years], product[:, n_years:]
+    totals = np.where(counts > 0, totals, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = totals / matrix.totals * 100
+        growth = np.full_like(totals, np.nan)
+        growth[:, 1:] = (totals[:, 1:] / totals[:, :-1] - 1) * 100
+    return GroupAggregate(
+        member.grouping, member.groups, member.partition,
+        {group: i for i, group in enumerate(member.groups)},
+        matrix.years, totals, counts, shares, growth,
+    )
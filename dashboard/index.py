@@ -0,0 +1,130 @@
+"""Positional index over the long-format frame.
+
+Rows are sorted once by (Country, Year) so each country's series is one
+contiguous slice and each year's cross-section is a precomputed array of
+row positions. Lookups then cost O(rows returned) instead of a boolean mask
+over the whole column plus a sort on every rerun.
+
+World totals live in their own frame and are joined in only when a lookup
+asks for them.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+
+
+@dataclass(frozen=True)
+class LongIndex:
+    frame: pd.DataFrame
+    world: pd.DataFrame
+    country_slices: dict
+    year_rows: dict
+    continent_countries: dict
+    countries: list
+    frame_years: np.ndarray
+    world_years: np.ndarray
+    # Year -> cross-section with World, filled in by year()
+    _year_frames: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def years(self):
+        """All years, in ascending order"""
+        return list(self.year_rows)
+
+    def _slice(self, country, year_range=None):
+        if country == WORLD:
+            frame, all_years = self.world, self.world_years
+            start, stop = 0, len(self.world)
+        else:
+            frame, all_years = self.frame, self.frame_years
+            start, stop = self.country_slices.get(country, (0, 0))
+        if year_range is not None and stop > start:
+            years = all_years[start:stop]
+            lo = np.searchsorted(years, year_range[0], side="left")
+            hi = np.searchsorted(years, year_range[1], side="right")
+            start, stop = start + int(lo), start + int(hi)
+        return frame, start, stop
+
+    def country(self, country, year_range=None):
+        """Rows for one country (or World), sorted by year"""
+        frame, start, stop = self._slice(country, year_range)
+        return frame.iloc[start:stop]
+
+    def countries_frame(self, countries, year_range=None):
+        """Rows for several countries, grouped by country in the given order"""
+        parts, positions = [], []
+        for country in countries:
+            frame, start, stop = self._slice(country, year_range)
+            if frame is self.frame:
+                positions.append(np.arange(start, stop))
+                continue
+            if positions:
+                parts.append(self.frame.take(np.concatenate(positions)))
+                positions = []
+            parts.append(frame.iloc[start:stop])
+        if positions or not parts:
+            parts.append(self.frame.take(np.concatenate(positions or [np.arange(0)])))
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts, ignore_index=True)
+
+    def year(self, year, include_world=True):
+        """Cross-section of every country for one year.
+
+        With World, the frame is built on the first request for the year
+        and then shared by every caller, like country()'s slices, so treat
+        it as read-only. All of them together hold one copy of the frame.
+        """
+        rows = self.year_rows.get(year, np.arange(0))
+        if not include_world:
+            return self.frame.take(rows)
+        cross_section = self._year_frames.get(year)
+        if cross_section is None:
+            # Concatenating the World row costs more than the take itself,
+            # so it is paid once per year and index
+            world = self.country(WORLD, (year, year))
+            cross_section = self._year_frames.setdefault(
+                year, pd.concat([self.frame.take(rows), world], ignore_index=True)
+            )
+        return cross_section
+
+
+def _is_sorted(codes, years):
+    same = codes[1:] == codes[:-1]
+    return bool(np.all(codes[1:] >= codes[:-1]) and np.all(years[1:][same] >= years[:-1][same]))
+
+
+def build_index(df_long, df_world):
+    """Index df_long by (Country, Year) and attach the World totals"""
+    codes = df_long["Country"].cat.codes.to_numpy()
+    if not _is_sorted(codes, df_long["Year"].to_numpy()):
+        df_long = df_long.sort_values(["Country", "Year"], kind="stable").reset_index(drop=True)
+        codes = df_long["Country"].cat.codes.to_numpy()
+
+    categories = df_long["Country"].cat.categories
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(df_long)]
+    country_slices = {
+        categories[codes[start]]: (int(start), int(stop)) for start, stop in zip(starts, stops)
+    }
+
+    years = df_long["Year"].to_numpy()
+    order = np.argsort(years, kind="stable")
+    unique_years, first = np.unique(years[order], return_index=True)
+    year_rows = {
+        int(year): rows for year, rows in zip(unique_years, np.split(order, first[1:]))
+    }
+
+    continent_countries = {}
+    continents = df_long["Continent"].to_numpy()[starts]
+    for country, continent in zip(country_slices, continents):
+        continent_countries.setdefault(continent, []).append(country)
+
+    countries = sorted(list(country_slices) + [WORLD])
+    return LongIndex(
+        df_long, df_world, country_slices, year_rows, continent_countries, countries,
+        years, df_world["Year"].to_numpy(),
+    )
@@ -0,0 +1,348 @@
+"""Every per-year indicator of the source CSV, not only Population.
+
+Each ``"<year> <Metric>"`` column of the source is melted, for all metrics
+at once, into one typed long table: categorical Country and Metric, int16
+Year and float64 Value, sorted by (Country, Metric, Year) so the series of
+one metric for one country is one contiguous slice. The wide values are
+converted and scanned for missing cells once however many metrics the file
+has, so adding an indicator adds its cells to the table rather than
+another pass over the file. Numeric columns without a year (an area, say)
+are kept as per-country attributes.
+
+The table is read from the CSV in chunks (ingest_indicators), so building
+it never holds the whole wide file in memory, and it is kept in the
+dataset's snapshot as column files that every worker maps. It is built
+only when a page first asks for a metric other than Population; the
+metric names come from the CSV header (available_metrics), and Population
+itself is served from the census statistics matrix (population_metric).
+
+A metric's Country x Year matrix, and the derived metrics computed from
+those matrices, are built only when first asked for; the Publisher
+memoizes them per dataset version (see store.get_metric). Derived metrics:
+
+- ``"<Metric> Share of World (%)"`` for every metric, of its World series:
+  the source's World row, or for Population the sum over countries, as
+  transform_data() does; missing throughout when there is neither
+- ``"Population Density (per km²)"`` when the source has an ``AREA``
+  column
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import DATA_PATH, POPULATION, WORLD, metric_columns
+from dashboard.ingest import CHUNKSIZE
+
+AREA = "Area (km²)"
+
+# Metrics whose World series is the sum over countries when the source has
+# no World row of its own
+SUMMABLE = (POPULATION,)
+
+SHARE_SUFFIX = " Share of World (%)"
+DENSITY = f"{POPULATION} Density (per km²)"
+
+
+@dataclass(frozen=True)
+class MetricMatrix:
+    metric: str
+    # Countries without World, with the continent of each
+    countries: np.ndarray
+    continents: np.ndarray
+    # Country -> row in values
+    rows: dict
+    year_values: np.ndarray
+    # Country x Year, NaN where missing
+    values: np.ndarray
+    # World series per year, or None when the metric has none
+    world: np.ndarray
+
+    @property
+    def years(self):
+        """All years, in ascending order"""
+        return [int(year) for year in self.year_values]
+
+    def _columns(self, year_range):
+        if year_range is None:
+            return 0, len(self.year_values)
+        lo = int(np.searchsorted(self.year_values, year_range[0], side="left"))
+        hi = int(np.searchsorted(self.year_values, year_range[1], side="right"))
+        return lo, hi
+
+    def _series(self, country):
+        if country == WORLD:
+            return self.world
+        row = self.rows.get(country)
+        return None if row is None else self.values[row]
+
+    def country(self, country, year_range=None):
+        """Year and value of one country (or World), leaving out missing years"""
+        return self.countries_frame([country], year_range)[["Year", self.metric]]
+
+    def countries_frame(self, countries, year_range=None):
+        """Year, Country and value for several countries, grouped by country
+        in the given order"""
+        lo, hi = self._columns(year_range)
+        names = [country for country in countries if self._series(country) is not None]
+        values = np.array([self._series(country)[lo:hi] for country in names]).reshape(len(names), hi - lo)
+        keep = ~np.isnan(values).ravel()
+        return pd.DataFrame({
+            "Year": np.tile(self.year_values[lo:hi], len(names))[keep],
+            "Country": pd.Categorical(np.repeat(names, hi - lo)[keep], categories=names),
+            self.metric: values.ravel()[keep],
+        })
+
+    def top(self, year, n=10):
+        """Country, Continent and value of the n countries with the largest
+        value in year"""
+        col = int(np.searchsorted(self.year_values, year))
+        if col == len(self.year_values) or self.year_values[col] != year:
+            rows = np.arange(0)
+        else:
+            rows = np.flatnonzero(~np.isnan(self.values[:, col]))
+            rows = rows[np.argsort(-self.values[rows, col], kind="stable")][:n]
+        return pd.DataFrame({
+            "Country": self.countries[rows],
+            "Continent": self.continents[rows],
+            self.metric: self.values[rows, col] if len(rows) else np.empty(0),
+        })
+
+
+@dataclass(frozen=True)
+class IndicatorStore:
+    # Country, Metric, Year, Value sorted by (Country, Metric, Year)
+    frame: pd.DataFrame
+    # (country, metric) -> (start, stop) rows of frame
+    slices: dict
+    # Base metrics, in source column order
+    metrics: list
+    # Country -> continent, for every country but World
+    continents: dict
+    # Numeric columns without a year, one row per country
+    attributes: pd.DataFrame
+
+    @property
+    def derived(self):
+        """Derived metric -> the base metrics it is computed from"""
+        return derived_metrics(self.metrics, self.attributes.columns)
+
+    @property
+    def available(self):
+        """Every metric that can be asked for: base metrics, then derived"""
+        return self.metrics + list(self.derived)
+
+    def sources(self, metric):
+        """Base metrics a metric is computed from; () for a base metric"""
+        if metric in self.metrics:
+            return ()
+        derived = self.derived
+        if metric not in derived:
+            raise ValueError(f"unknown metric {metric!r}; expected one of {tuple(self.available)}")
+        return derived[metric]
+
+    def series(self, country, metric, year_range=None):
+        """Year and Value rows of one base metric for one country"""
+        start, stop = self.slices.get((country, metric), (0, 0))
+        rows = self.frame.iloc[start:stop]
+        if year_range is not None:
+            years = rows["Year"].to_numpy()
+            lo = np.searchsorted(years, year_range[0], side="left")
+            hi = np.searchsorted(years, year_range[1], side="right")
+            rows = rows.iloc[lo:hi]
+        return rows[["Year", "Value"]]
+
+    def matrix(self, metric):
+        """Country x Year matrix of a base metric"""
+        code = self.frame["Metric"].cat.categories.get_loc(metric)
+        selected = np.flatnonzero(self.frame["Metric"].cat.codes.to_numpy() == code)
+        codes = self.frame["Country"].cat.codes.to_numpy()[selected]
+        years = self.frame["Year"].to_numpy()[selected]
+        values = self.frame["Value"].to_numpy()[selected]
+
+        categories = self.frame["Country"].cat.categories
+        world_code = categories.get_loc(WORLD)
+        year_values = np.unique(years)
+        cols = np.searchsorted(year_values, years)
+        countries = np.array(sorted(self.continents), dtype=object)
+        rows = {name: i for i, name in enumerate(countries)}
+        positions = np.full(len(categories), -1)
+        positions[[categories.get_loc(name) for name in countries]] = np.arange(len(countries))
+
+        # Rows are sorted by country and year with duplicate source rows in
+        # source order; writing them back to front keeps each cell's first
+        matrix = np.full((len(countries), len(year_values)), np.nan)
+        is_country = codes != world_code
+        order = np.flatnonzero(is_country)[::-1]
+        matrix[positions[codes[order]], cols[order]] = values[order]
+
+        world = None
+        if (WORLD, metric) in self.slices:
+            world = np.full(len(year_values), np.nan)
+            order = np.flatnonzero(~is_country)[::-1]
+            world[cols[order]] = values[order]
+        elif metric in SUMMABLE:
+            world = np.nansum(matrix, axis=0)
+        return MetricMatrix(
+            metric, countries, np.array([self.continents[name] for name in countries], dtype=object),
+            rows, year_values, matrix, world,
+        )
+
+    def derive(self, metric, matrices):
+        """Matrix of a derived metric from the matrices of its sources"""
+        (base,) = matrices
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == DENSITY:
+                area = self.attributes[AREA].reindex(base.countries).to_numpy(dtype="float64")
+                area = np.where(area > 0, area, np.nan)
+                values = base.values / area[:, None]
+                world_area = np.nansum(area)
+                world = base.world / world_area if base.world is not None and world_area > 0 else None
+            elif base.world is None:
+                values, world = np.full_like(base.values, np.nan), None
+            else:
+                values = base.values / base.world * 100
+                world = np.where(np.isnan(base.world), np.nan, 100.0)
+        return MetricMatrix(
+            metric, base.countries, base.continents, base.rows, base.year_values, values, world,
+        )
+
+
+def derived_metrics(metrics, attributes):
+    """Derived metric -> the base metrics it is computed from, given the
+    base metrics and the names of the per-country attribute columns"""
+    derived = {f"{metric}{SHARE_SUFFIX}": (metric,) for metric in metrics}
+    if POPULATION in metrics and AREA in attributes:
+        derived[DENSITY] = (POPULATION,)
+    return derived
+
+
+def available_metrics(path=DATA_PATH):
+    """Every metric of the CSV at path, base then derived, from its header
+    alone"""
+    columns = pd.read_csv(path, nrows=0).columns
+    metrics = metric_columns(columns)
+    names = {col for pairs in metrics.values() for _, col in pairs}
+    attributes = [col for col in columns if col not in names and col not in ("Country", "Continent")]
+    return list(metrics) + list(derived_metrics(list(metrics), attributes))
+
+
+def population_metric(matrix):
+    """Population as a MetricMatrix, from the census stats.StatsMatrix
+    (whose last row is World) rather than from an indicator table"""
+    countries = matrix.countries[:-1]
+    return MetricMatrix(
+        POPULATION, countries, matrix.continents[:-1], {name: i for i, name in enumerate(countries)},
+        matrix.years, matrix.values[:-1], matrix.values[-1],
+    )
+
+
+def _slices(frame):
+    country = frame["Country"].cat.codes.to_numpy()
+    metric = frame["Metric"].cat.codes.to_numpy()
+    categories, metrics = frame["Country"].cat.categories, frame["Metric"].cat.categories
+    starts = np.flatnonzero(np.r_[True, (country[1:] != country[:-1]) | (metric[1:] != metric[:-1])])
+    stops = np.r_[starts[1:], len(frame)]
+    return {
+        (categories[country[start]], metrics[metric[start]]): (int(start), int(stop))
+        for start, stop in zip(starts[starts < len(frame)], stops)
+    }
+
+
+def _build(columns, chunks):
+    by_metric = metric_columns(columns)
+    metrics = list(by_metric)
+    names = [col for pairs in by_metric.values() for _, col in pairs]
+    metric_of = np.repeat(np.arange(len(metrics), dtype="int16"), [len(pairs) for pairs in by_metric.values()])
+    year_of = np.array([year for pairs in by_metric.values() for year, _ in pairs], dtype="int16")
+    other = [col for col in columns if col not in names and col not in ("Country", "Continent")]
+
+    parts = {"country": [], "continent": [], "attributes": [], "row": [], "value": [], "col": []}
+    n_rows = 0
+    for chunk in chunks:
+        values = chunk[names].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+        rows, cols = np.nonzero(~np.isnan(values))
+        parts["row"].append((rows + n_rows).astype(np.int32))
+        parts["col"].append(cols.astype(np.int32))
+        parts["value"].append(values[rows, cols])
+        del values
+        parts["country"].append(chunk["Country"].astype(str).to_numpy(dtype=object))
+        parts["continent"].append(chunk["Continent"].to_numpy(dtype=object))
+        parts["attributes"].append(chunk[other].apply(pd.to_numeric, errors="coerce").astype("float64"))
+        n_rows += len(chunk)
+
+    def concat(key, dtype):
+        return np.concatenate(parts.pop(key)) if parts[key] else np.empty(0, dtype)
+
+    countries = pd.Series(concat("country", object), dtype=object)
+    row_continents = concat("continent", object)
+    attributes = (
+        pd.concat(parts.pop("attributes"), ignore_index=True) if parts["attributes"]
+        else pd.DataFrame(columns=other, dtype="float64")
+    )
+
+    # Columns are built one at a time and each source array is dropped as
+    # soon as it is used, so the peak stays near the size of the result
+    categories = sorted(set(countries) | {WORLD})
+    country = pd.Categorical(countries, categories=categories).codes[concat("row", np.int32)]
+    col = concat("col", np.int32)
+    metric, year = metric_of[col], year_of[col]
+    del col
+    # lexsort is stable, so a country listed twice keeps source order
+    order = np.lexsort((year, metric, country))
+    country, metric, year = country[order], metric[order], year[order]
+    value = concat("value", np.float64)[order]
+    del order
+    frame = pd.DataFrame({
+        "Country": pd.Categorical.from_codes(country, categories=categories),
+        "Metric": pd.Categorical.from_codes(metric, categories=metrics),
+        "Year": year,
+        "Value": value,
+    }, copy=False)
+    del country, metric, year, value
+
+    # A country listed twice keeps its first row's continent and attributes
+    first = ~countries.duplicated().to_numpy()
+    continents = {
+        name: str(continent)
+        for name, continent in zip(countries[first], row_continents[first])
+        if name != WORLD
+    }
+    attributes = attributes.loc[first].set_axis(countries[first].to_numpy())
+    return IndicatorStore(frame, _slices(frame), metrics, continents, attributes)
+
+
+def build_indicators(df_original):
+    """Melt every "<year> <Metric>" column of a wide frame in one pass"""
+    return _build(df_original.columns, [df_original])
+
+
+def ingest_indicators(path=DATA_PATH, chunksize=None):
+    """Build the indicator store from the CSV chunksize rows at a time; by
+    default a chunk holds about as many cells as one of dashboard.ingest's
+    however many metrics the file has"""
+    columns = pd.read_csv(path, nrows=0).columns
+    if chunksize is None:
+        chunksize = max(1, CHUNKSIZE // max(1, len(metric_columns(columns))))
+    return _build(columns, pd.read_csv(path, chunksize=chunksize))
+
+
+def to_frames(store):
+    """(frame, countries) holding store for dashboard.columns: the long
+    table, and per country its continent and attributes"""
+    names = store.attributes.index.to_numpy()
+    countries = pd.DataFrame({
+        "Country": pd.Categorical(names),
+        "Continent": pd.Categorical([store.continents.get(name, WORLD) for name in names]),
+    })
+    return store.frame, pd.concat([countries, store.attributes.reset_index(drop=True)], axis=1)
+
+
+def from_frames(frame, countries):
+    """The store to_frames() laid out, over frames that may be mapped"""
+    names = countries["Country"].to_numpy(dtype=object)
+    continents = {
+        name: str(continent) for name, continent in zip(names, countries["Continent"]) if name != WORLD
+    }
+    attributes = countries.drop(columns=["Country", "Continent"]).set_axis(names)
+    return IndicatorStore(frame, _slices(frame), list(frame["Metric"].cat.categories), continents, attributes)
@@ -0,0 +1,161 @@
+"""Chunked ingestion of the wide population CSV into the compact long frames.
+
+The CSV is read ``chunksize`` rows at a time; each chunk is melted and
+type-converted straight into compact numpy arrays (dictionary-encoded
+country/continent codes, int16 years, int64 populations) that are appended
+to the store. Peak memory is therefore bounded by the chunk size plus the
+compact output, not by the size of the file, which matters for annual
+1950-2100 series with several variants.
+
+The result is identical to ``data.transform_data(data.load_data(path))``.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard import data
+from dashboard.data import DATA_PATH, WORLD
+
+CHUNKSIZE = 20_000
+
+
+def year_columns(path):
+    """Year columns, detected the same way transform_data() does"""
+    return data.year_columns(pd.read_csv(path, nrows=0).columns)
+
+
+class _Encoder:
+    """Incremental string -> int dictionary encoding across chunks"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        """Codes for values; missing values get -1"""
+        local, uniques = pd.factorize(values)
+        mapping = [self.codes.setdefault(u, len(self.codes)) for u in uniques]
+        # factorize() codes missing values as -1, which must stay -1 rather
+        # than index the last category
+        return np.array(mapping + [-1], dtype=np.int32)[local]
+
+    def recode(self, codes, extra=()):
+        """Re-code to the sorted categories actually used, plus extra;
+        -1 (missing) stays -1"""
+        names = np.array(list(self.codes), dtype=object)
+        categories = sorted(set(names[np.unique(codes[codes >= 0])]) | set(extra))
+        position = {name: i for i, name in enumerate(categories)}
+        remap = np.array([position.get(name, -1) for name in names] + [-1], dtype=np.int32)
+        return categories, remap[codes]
+
+
+def iter_long_chunks(path=DATA_PATH, chunksize=CHUNKSIZE):
+    """Yield (countries, continents, rows, years, populations) per chunk.
+
+    countries/continents hold one value per source row of the chunk; rows,
+    years and populations describe its melted, non-NaN cells, with rows
+    pointing back into the first two arrays.
+    """
+    columns = year_columns(path)
+    years = pd.Series(columns).str.extract(r'(\d{4})', expand=False).astype('int16').to_numpy()
+    reader = pd.read_csv(path, usecols=['Country', 'Continent'] + columns, chunksize=chunksize)
+    for chunk in reader:
+        data.check_labels(chunk, columns)
+        values = chunk[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        rows, cols = np.nonzero(~np.isnan(values))
+        yield (
+            chunk['Country'].to_numpy(dtype=object),
+            chunk['Continent'].to_numpy(dtype=object),
+            rows,
+            years[cols],
+            values[rows, cols],
+        )
+
+
+def ingest_csv(path=DATA_PATH, chunksize=CHUNKSIZE):
+    """Build (df_long, df_world) from the CSV without loading it whole"""
+    countries, continents = _Encoder(), _Encoder()
+    # Continent is a property of the source row, so it is stored once per
+    # row rather than once per melted cell
+    row_continents = []
+    parts = {"row": [], "year": [], "population": []}
+    n_rows = 0
+
+    for names, regions, rows, years, populations in iter_long_chunks(path, chunksize):
+        row_codes = countries.encode(names)
+        row_continents.append(continents.encode(regions))
+        parts["row"].append((rows + n_rows).astype(np.int32))
+        parts["year"].append(years)
+        # Rounded to whole people, exactly like transform_data()
+        parts["population"].append(np.rint(populations).astype(np.int64))
+        parts.setdefault("country_of_row", []).append(row_codes)
+        n_rows += len(names)
+
+    def concat(key, dtype):
+        return np.concatenate(parts.pop(key)) if parts.get(key) else np.empty(0, dtype)
+
+    row_country = concat("country_of_row", np.int32)
+    row_continent = np.concatenate(row_continents) if row_continents else np.empty(0, np.int32)
+    row = concat("row", np.int32)
+    year = concat("year", np.int16)
+    population = concat("population", np.int64)
+    country = row_country[row]
+
+    # The source may carry its own World row; split it off as the World series
+    world_code = countries.codes.get(WORLD)
+    if world_code is not None:
+        is_world = country == world_code
+        world_year, world_population = year[is_world], population[is_world]
+        keep = ~is_world
+        country, row, year, population = country[keep], row[keep], year[keep], population[keep]
+        del is_world, keep
+    else:
+        world_year, world_population = year[:0], population[:0]
+
+    # Only continents of rows that kept a value become categories, as in
+    # transform_data(); the others (possibly blank) are masked as missing
+    used = np.zeros(len(row_continent), dtype=bool)
+    used[row] = True
+    row_continent[~used] = -1
+    del used
+
+    # Re-code to sorted categories shared with df_world, then sort rows by
+    # (Country, Year); lexsort is stable so duplicate rows keep source order
+    country_categories, country = countries.recode(country, extra=[WORLD])
+    continent_categories, continent_of_row = continents.recode(row_continent, extra=[WORLD])
+    order = np.lexsort((year, country))
+    country = country[order]
+    continent = continent_of_row[row[order]]
+    year = year[order]
+    population = population[order]
+    del order, row
+
+    # Growth rate within each country
+    growth = np.full(len(population), np.nan, dtype=np.float32)
+    same = country[1:] == country[:-1]
+    growth[1:][same] = (population[1:][same] / population[:-1][same] - 1) * 100
+    del same
+
+    country_dtype = pd.CategoricalDtype(country_categories)
+    continent_dtype = pd.CategoricalDtype(continent_categories)
+    df_long = pd.DataFrame({
+        'Country': pd.Categorical.from_codes(country, dtype=country_dtype),
+        'Continent': pd.Categorical.from_codes(continent, dtype=continent_dtype),
+        'Year': year,
+        'Population': pd.arrays.IntegerArray(population, np.zeros(len(population), dtype=bool)),
+        'Growth_Rate': growth,
+    })
+
+    # World totals: the source's own row when present, else the sum
+    if len(world_year):
+        unique_years, first = np.unique(world_year, return_index=True)
+        world_pop = pd.Series(pd.array(world_population[first], dtype='Int64'), index=unique_years)
+    else:
+        world_pop = df_long.groupby('Year')['Population'].sum()
+    df_world = pd.DataFrame({
+        'Country': pd.Categorical([WORLD] * len(world_pop), dtype=country_dtype),
+        'Continent': pd.Categorical([WORLD] * len(world_pop), dtype=continent_dtype),
+        'Year': np.asarray(world_pop.index, dtype=np.int16),
+        'Population': world_pop.array,
+        'Growth_Rate': (world_pop.astype('float64').pct_change() * 100).to_numpy(dtype='float32'),
+    })
+
+    return df_long, df_world
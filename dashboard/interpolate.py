@@ -0,0 +1,176 @@
+"""Annual series interpolated between the census years.
+
+The source only has populations for a handful of census years, so a
+pct_change between adjacent rows is a decade-long change, not an annual
+rate. This module lays every country (and World) out as one Country x Year
+matrix and fills in each year between the first and last census of a
+country in a single vectorized pass:
+
+- ``linear``: straight lines between census points
+- ``log``: log-linear, i.e. a constant compound annual growth rate (CAGR)
+  between census points
+- ``pchip``: monotone piecewise cubic (Fritsch-Carlson), smooth but never
+  overshooting the census values
+
+Growth_Rate of the result is the true year-over-year rate of the annual
+series. Years outside a country's census range are left out rather than
+extrapolated.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+
+METHODS = ("log", "linear", "pchip")
+
+# Sidebar label -> method; None keeps the census years as published
+LABELS = {
+    "Annual, constant growth (CAGR)": "log",
+    "Annual, linear": "linear",
+    "Annual, monotone cubic": "pchip",
+    "Census years only": None,
+}
+
+
+def population_matrix(df_long, df_world):
+    """Return (countries, continent codes, knot years, matrix).
+
+    The matrix has one row per country in category order with World last,
+    one column per census year, and NaN where a country has no value. A
+    country listed twice in the source keeps its first row, like the
+    pivot on the Compare page.
+    """
+    codes = df_long["Country"].cat.codes.to_numpy()
+    years = df_long["Year"].to_numpy()
+    knots = np.union1d(years, df_world["Year"].to_numpy())
+
+    used, first = np.unique(codes, return_index=True)
+    rows = np.searchsorted(used, codes)
+    cols = np.searchsorted(knots, years)
+
+    matrix = np.full((len(used) + 1, len(knots)), np.nan)
+    cells, keep = np.unique(rows * len(knots) + cols, return_index=True)
+    matrix.flat[cells] = df_long["Population"].to_numpy(dtype="float64", na_value=np.nan)[keep]
+    matrix[-1, np.searchsorted(knots, df_world["Year"].to_numpy())] = (
+        df_world["Population"].to_numpy(dtype="float64", na_value=np.nan)
+    )
+
+    countries = df_long["Country"].cat.categories[used]
+    continents = df_long["Continent"].cat.codes.to_numpy()[first]
+    return countries, continents, knots, matrix
+
+
+def _neighbours(valid):
+    """Index of the last valid knot <= j and the first valid knot >= j"""
+    n = valid.shape[1]
+    positions = np.arange(n)
+    prev = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+    next_ = np.minimum.accumulate(np.where(valid, positions, n)[:, ::-1], axis=1)[:, ::-1]
+    return prev, next_
+
+
+def _gather(values, index):
+    """values[i, index[i, j]] with out-of-range indices giving NaN"""
+    n = values.shape[1]
+    inside = (index >= 0) & (index < n)
+    out = np.take_along_axis(values, np.clip(index, 0, n - 1), axis=1)
+    return np.where(inside, out, np.nan)
+
+
+def _slopes(knots, matrix, prev, next_):
+    """Fritsch-Carlson derivatives at each valid knot"""
+    n_rows, n = matrix.shape
+    before = np.hstack([np.full((n_rows, 1), -1), prev[:, :-1]])
+    after = np.hstack([next_[:, 1:], np.full((n_rows, 1), n)])
+    x = knots.astype("float64")
+    h1 = x - _gather(np.broadcast_to(x, matrix.shape), before)
+    h2 = _gather(np.broadcast_to(x, matrix.shape), after) - x
+    d1 = (matrix - _gather(matrix, before)) / h1
+    d2 = (_gather(matrix, after) - matrix) / h2
+
+    w1, w2 = 2 * h2 + h1, h2 + 2 * h1
+    interior = (w1 + w2) / (w1 / d1 + w2 / d2)
+    slopes = np.where(d1 * d2 > 0, interior, 0.0)
+    # Endpoints (one neighbour) take the one-sided secant
+    slopes = np.where(np.isnan(d1), d2, np.where(np.isnan(d2), d1, slopes))
+    return np.nan_to_num(slopes)
+
+
+def interpolate(knots, matrix, years, method="log"):
+    """Evaluate each row of matrix (values at knots) at every year"""
+    if method not in METHODS:
+        raise ValueError(f"unknown interpolation method {method!r}; expected one of {METHODS}")
+    years = np.asarray(years)
+    valid = ~np.isnan(matrix)
+    prev, next_ = _neighbours(valid)
+
+    # Bracketing valid knots for every (row, year)
+    k = np.searchsorted(knots, years, side="right") - 1
+    kc = np.clip(k, 0, len(knots) - 1)
+    lo = np.where(k >= 0, prev[:, kc], -1)
+    exact = (lo == k) & (knots[kc] == years)
+    after = np.clip(k + 1, 0, len(knots) - 1)
+    hi = np.where(exact, lo, np.where(k + 1 < len(knots), next_[:, after], len(knots)))
+
+    x = np.broadcast_to(knots.astype("float64"), matrix.shape)
+    xl, xh = _gather(x, lo), _gather(x, hi)
+    yl, yh = _gather(matrix, lo), _gather(matrix, hi)
+    h = xh - xl
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(h > 0, (years - xl) / h, 0.0)
+
+        if method == "linear":
+            out = yl + s * (yh - yl)
+        elif method == "log":
+            positive = (yl > 0) & (yh > 0)
+            log_out = np.exp(np.log(np.where(positive, yl, 1)) * (1 - s)
+                             + np.log(np.where(positive, yh, 1)) * s)
+            out = np.where(positive, log_out, yl + s * (yh - yl))
+        else:
+            slopes = _slopes(knots, matrix, prev, next_)
+            dl, dh = _gather(slopes, lo), _gather(slopes, hi)
+            s2, s3 = s * s, s * s * s
+            out = ((2 * s3 - 3 * s2 + 1) * yl + (s3 - 2 * s2 + s) * h * dl
+                   + (-2 * s3 + 3 * s2) * yh + (s3 - s2) * h * dh)
+    return out
+
+
+def annual_growth(values):
+    """Year-over-year growth in percent along each row; NaN for the first year"""
+    growth = np.full(values.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[:, 1:] = (values[:, 1:] / values[:, :-1] - 1) * 100
+    return growth
+
+
+def annual_frames(df_long, df_world, method="log"):
+    """Annual (df_long, df_world) in the same schema as transform_data()"""
+    countries, continents, knots, matrix = population_matrix(df_long, df_world)
+    years = np.arange(knots[0], knots[-1] + 1) if len(knots) else np.arange(0)
+    values = interpolate(knots, matrix, years, method)
+    growth = annual_growth(values)
+
+    country_dtype = df_long["Country"].dtype
+    continent_dtype = df_long["Continent"].dtype
+    country_codes = country_dtype.categories.get_indexer(countries)
+
+    # Countries: one row per (country, year) with a value, already sorted
+    rows, cols = np.nonzero(~np.isnan(values[:-1]))
+    long_values = values[rows, cols]
+    df_annual = pd.DataFrame({
+        "Country": pd.Categorical.from_codes(country_codes[rows], dtype=country_dtype),
+        "Continent": pd.Categorical.from_codes(continents[rows], dtype=continent_dtype),
+        "Year": years[cols].astype("int16"),
+        "Population": pd.array(np.rint(long_values).astype("int64"), dtype="Int64"),
+        "Growth_Rate": growth[rows, cols].astype("float32"),
+    })
+
+    world_cols = np.flatnonzero(~np.isnan(values[-1]))
+    df_annual_world = pd.DataFrame({
+        "Country": pd.Categorical([WORLD] * len(world_cols), dtype=country_dtype),
+        "Continent": pd.Categorical([WORLD] * len(world_cols), dtype=continent_dtype),
+        "Year": years[world_cols].astype("int16"),
+        "Population": pd.array(np.rint(values[-1, world_cols]).astype("int64"), dtype="Int64"),
+        "Growth_Rate": growth[-1, world_cols].astype("float32"),
+    })
+    return df_annual, df_annual_world
@@ -0,0 +1,62 @@
+"""Memory accounting for the dataset frames.
+
+Usage: python -m dashboard.memory [path/to/world_population.csv]
+
+Prints the bytes held by each frame in the compact schema next to the
+object/int64/float64 schema (with World concatenated onto the long frame)
+that transform_data() used to produce.
+"""
+import sys
+
+import pandas as pd
+
+from dashboard import data
+
+
+def frame_bytes(df):
+    """Deep memory usage of df, including its index"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(frames):
+    """Bytes per frame for a {name: DataFrame} mapping, plus a total row"""
+    report = pd.DataFrame(
+        {"Frame": list(frames), "Bytes": [frame_bytes(df) for df in frames.values()]}
+    )
+    total = pd.DataFrame({"Frame": ["total"], "Bytes": [int(report["Bytes"].sum())]})
+    return pd.concat([report, total], ignore_index=True)
+
+
+def legacy_frames(df_long, df_world):
+    """Rebuild the pre-compaction df_long and df_long_with_world"""
+    legacy_long = df_long.astype({
+        "Country": object,
+        "Continent": object,
+        "Year": "int64",
+        "Population": "float64",
+        "Growth_Rate": "float64",
+    })
+    legacy_world = df_world.astype(legacy_long.dtypes.to_dict())
+    return {
+        "df_long": legacy_long,
+        "df_long_with_world": pd.concat([legacy_long, legacy_world], ignore_index=True),
+    }
+
+
+def main(path=data.DATA_PATH):
+    df_long, df_world = data.transform_data(data.load_data(path))
+    before = memory_report(legacy_frames(df_long, df_world))
+    after = memory_report({"df_long": df_long, "df_world": df_world})
+
+    print("Before (object strings, int64/float64, World concatenated):")
+    print(before.to_string(index=False))
+    print()
+    print("After (categorical, int16/Int64/float32, World joined on demand):")
+    print(after.to_string(index=False))
+    print()
+    ratio = before["Bytes"].iloc[-1] / after["Bytes"].iloc[-1]
+    print(f"Reduction: {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
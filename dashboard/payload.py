@@ -0,0 +1,213 @@
+"""Smaller chart and table payloads for the browser.
+
+Every chart and table a rerun shows is serialised and sent over the
+websocket again, so for remote sessions the bytes per interaction matter
+more than the milliseconds spent building them. Figures are trimmed once,
+when the figure cache builds them:
+
+- numeric data arrays are sent as the narrowest typed array (plotly's
+  base64 ``bdata`` encoding) that holds them: whole numbers exactly, as
+  int8 to uint32; anything else rounded to ``DASHBOARD_FIGURE_PRECISION``
+  significant digits and sent as float32, or float64 where a large whole
+  number would not survive float32
+- ``customdata`` no trace template refers to is dropped
+- animation frames leave out every property that equals the base trace's,
+  since plotly.js merges each frame onto the trace it animates
+
+The theme template is pruned when a figure is served: its per-trace-type
+defaults are kept only for the trace types the figure draws, and the
+polar/ternary/3D/geo axis defaults only when such a subplot is used.
+
+Tables are narrowed to the smallest integer dtypes and rounded to display
+precision, and long ones are sent a page of rows at a time.
+"""
+import base64
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard.memory import frame_bytes
+
+PRECISION = int(os.environ.get("DASHBOARD_FIGURE_PRECISION", "6"))
+TABLE_PAGE_ROWS = int(os.environ.get("DASHBOARD_TABLE_PAGE_ROWS", "50"))
+
+# Trace properties holding one value per point
+_ARRAY_KEYS = ("x", "y", "z", "base", "width", "values", "customdata", "r", "theta", "lat", "lon")
+_MARKER_ARRAY_KEYS = ("color", "size", "opacity")
+
+# Template layout defaults for subplots -> trace types drawn on them
+_SUBPLOTS = {
+    "polar": ("scatterpolar", "scatterpolargl", "barpolar"),
+    "ternary": ("scatterternary",),
+    "scene": ("scatter3d", "surface", "mesh3d", "cone", "streamtube", "volume", "isosurface"),
+    "geo": ("scattergeo", "choropleth"),
+}
+
+# Integer typed-array dtypes plotly.js reads, narrowest first
+_INTEGERS = ("i1", "u1", "i2", "u2", "i4", "u4")
+_FLOAT32_EXACT = 2 ** 24
+
+
+def _decode(typed):
+    data = np.frombuffer(base64.b64decode(typed["bdata"]), dtype=np.dtype(typed["dtype"]))
+    shape = typed.get("shape")
+    if shape:
+        data = data.reshape([int(n) for n in str(shape).split(",")])
+    return data
+
+
+def _encode(values, dtype):
+    typed = {"dtype": dtype, "bdata": base64.b64encode(values.astype(dtype).tobytes()).decode()}
+    if values.ndim > 1:
+        typed["shape"] = ",".join(str(n) for n in values.shape)
+    return typed
+
+
+def round_significant(values, digits=PRECISION):
+    """values rounded to digits significant digits; NaN and 0 unchanged"""
+    values = np.asarray(values, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+        scale = 10.0 ** (digits - 1 - np.where(np.isfinite(magnitude), magnitude, 0))
+        return np.where(np.isfinite(values) & (values != 0), np.round(values * scale) / scale, values)
+
+
+def narrow(values, digits=PRECISION):
+    """Typed-array dict for a numeric array, rounded and narrowed.
+
+    Returns None for arrays that are not numeric.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in "iuf" or values.size == 0:
+        return None
+    # Whole numbers that fit an integer type are sent exactly; rounding them
+    # would not make them any smaller
+    typed = _integers(values)
+    if typed is not None:
+        return typed
+    # Whole numbers out of integer range, or with gaps, are sent exactly too
+    typed = _whole(values)
+    if typed is not None:
+        return typed
+    values = round_significant(values, digits)
+    typed = _integers(values)
+    if typed is not None:
+        return typed
+    return _whole(values) or _encode(values, "f4")
+
+
+def _integers(values):
+    """values in the narrowest integer typed array, or None if they are not
+    all whole numbers in range"""
+    if values.dtype.kind == "f" and not (np.all(np.isfinite(values)) and np.all(values == np.round(values))):
+        return None
+    low, high = values.min(), values.max()
+    for dtype in _INTEGERS:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return _encode(values, dtype)
+    return None
+
+
+def _whole(values):
+    """values as f4, or as f8 when f4 cannot hold them exactly, or None if
+    they are not all whole numbers where finite"""
+    finite = values[np.isfinite(values)] if values.dtype.kind == "f" else values
+    if not len(finite) or np.any(finite != np.round(finite)):
+        return None
+    return _encode(values, "f8" if np.abs(finite).max() >= _FLOAT32_EXACT else "f4")
+
+
+def _narrow_key(container, key):
+    value = container.get(key)
+    if isinstance(value, dict) and "bdata" in value:
+        values = _decode(value)
+    elif isinstance(value, list) and value and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) or v is None for v in value
+    ):
+        values = np.array([np.nan if v is None else v for v in value], dtype="float64")
+    else:
+        return
+    typed = narrow(values)
+    if typed is not None:
+        container[key] = typed
+
+
+def _uses_customdata(trace):
+    return any("customdata" in str(trace.get(key, "")) for key in ("hovertemplate", "texttemplate"))
+
+
+def trim_trace(trace, base=None):
+    """Round and narrow a trace's data arrays in place; base is the trace
+    an animation frame's trace is merged onto"""
+    merged = trace if base is None else {**base, **trace}
+    if "customdata" in trace and not _uses_customdata(merged):
+        del trace["customdata"]
+    for key in _ARRAY_KEYS:
+        _narrow_key(trace, key)
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in _MARKER_ARRAY_KEYS:
+            _narrow_key(marker, key)
+    return trace
+
+
+def trim_figure(spec):
+    """Trim a figure's JSON dict (as fig.to_json() gives it) in place"""
+    base = [trim_trace(trace) for trace in spec.get("data", [])]
+    for frame in spec.get("frames", []):
+        targets = frame.get("traces", range(len(frame.get("data", []))))
+        for trace, target in zip(frame.get("data", []), targets):
+            if target >= len(base):
+                trim_trace(trace)
+                continue
+            trim_trace(trace, base[target])
+            for key in [k for k, v in trace.items() if base[target].get(k) == v]:
+                del trace[key]
+    return spec
+
+
+def trim_template(template, trace_types):
+    """The parts of a template's JSON dict a figure with these trace types uses"""
+    data = {kind: defaults for kind, defaults in template.get("data", {}).items() if kind in trace_types}
+    layout = {
+        key: value for key, value in template.get("layout", {}).items()
+        if key not in _SUBPLOTS or any(kind in trace_types for kind in _SUBPLOTS[key])
+    }
+    return {"data": data, "layout": layout}
+
+
+def compact(df, decimals=2):
+    """df with integers in the narrowest dtype that holds them and floats
+    rounded to decimals, for display.
+
+    Floats stay float64: the grid would print a float32's binary expansion
+    rather than the rounded value.
+    """
+    columns = {}
+    for name, column in df.items():
+        if pd.api.types.is_integer_dtype(column.dtype):
+            columns[name] = pd.to_numeric(column, downcast="integer")
+        elif pd.api.types.is_float_dtype(column.dtype):
+            columns[name] = column.astype("float64").round(decimals)
+        else:
+            columns[name] = column
+    return pd.DataFrame(columns, index=df.index)
+
+
+def trimmed_table(df, page=1, decimals=2, page_size=TABLE_PAGE_ROWS):
+    """(one page of df compacted for display, bytes saved against sending
+    all of df as it is)"""
+    table = compact(table_page(df, page, page_size), decimals)
+    return table, frame_bytes(df) - frame_bytes(table)
+
+
+def table_pages(rows, page_size=TABLE_PAGE_ROWS):
+    """Number of pages a table of rows spans"""
+    return max(1, -(-rows // page_size))
+
+
+def table_page(df, page, page_size=TABLE_PAGE_ROWS):
+    """Rows of one page of df, counting pages from 1"""
+    return df.iloc[(page - 1) * page_size:page * page_size]
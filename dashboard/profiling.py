@@ -0,0 +1,212 @@
+"""Lightweight per-section timing for the dashboard pages.
+
+Set ``DASHBOARD_PROFILE=1`` to record, for every page section, the wall
+time it took, the rows it touched, the bytes of chart/table data it sent
+to the browser and the bytes payload trimming kept off the wire. A timing
+panel is then shown in the sidebar, and if ``DASHBOARD_PROFILE_TRACE``
+names a file, one JSON line per rerun (full page or fragment) is appended
+to it. With profiling disabled every helper here reduces to a plain call.
+
+Summarise a trace with ``python -m dashboard.profiling TRACE.jsonl``.
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+ENABLED = os.environ.get("DASHBOARD_PROFILE") == "1"
+TRACE_PATH = os.environ.get("DASHBOARD_PROFILE_TRACE")
+
+_STATE_KEY = "_profile_records"
+_RUN_KEY = "_profile_run"
+_fragment = contextvars.ContextVar("fragment", default=None)
+_section = contextvars.ContextVar("section", default=None)
+_trace_lock = threading.Lock()
+
+
+def start_run(page):
+    """Reset the records at the top of a full page run"""
+    if ENABLED:
+        st.session_state[_STATE_KEY] = []
+        st.session_state["_profile_page"] = page
+        st.session_state[_RUN_KEY] = time.perf_counter()
+
+
+def end_run():
+    """Close a full page run: write its trace and show the timing panel"""
+    if not ENABLED:
+        return
+    started = st.session_state.pop(_RUN_KEY, None)
+    if started is None:
+        return
+    trace = _trace("full", None, records(), time.perf_counter() - started)
+    _write_trace(trace)
+    _panel(trace)
+
+
+def records():
+    """Records collected since the last full run"""
+    return st.session_state.get(_STATE_KEY, [])
+
+
+def _new_record(name):
+    return {
+        "section": name, "fragment": _fragment.get(),
+        "seconds": 0.0, "rows": 0, "payload_bytes": 0, "saved_bytes": 0,
+    }
+
+
+@contextmanager
+def section(name):
+    """Time the enclosed block as one page section"""
+    if not ENABLED:
+        yield
+        return
+    record = _new_record(name)
+    token = _section.set(record)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        _section.reset(token)
+        st.session_state.setdefault(_STATE_KEY, []).append(record)
+
+
+def touch(rows):
+    """Count rows (a frame or a number) as touched by the current section"""
+    record = _section.get()
+    if record is not None:
+        record["rows"] += rows if isinstance(rows, int) else len(rows)
+
+
+def saved(nbytes):
+    """Count bytes trimmed from the current section's payload"""
+    record = _section.get()
+    if record is not None:
+        record["saved_bytes"] += int(nbytes)
+
+
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart that also counts the figure JSON sent to the browser"""
+    record = _section.get()
+    if record is not None:
+        record["payload_bytes"] += len(fig.to_json())
+    return st.plotly_chart(fig, **kwargs)
+
+
+def dataframe(df, **kwargs):
+    """st.dataframe that also counts the rows serialised for the browser"""
+    record = _section.get()
+    if record is not None:
+        record["rows"] += len(df)
+        record["payload_bytes"] += int(df.memory_usage(index=True, deep=True).sum())
+    return st.dataframe(df, **kwargs)
+
+
+def fragment(name, run_every=None):
+    """st.fragment that tags the sections it contains with name.
+
+    A widget created inside the decorated function reruns only that function,
+    so only its sections are recomputed and re-sent. Such a fragment-only
+    rerun is traced as a run of its own.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = _fragment.set(name)
+            # Inside a full run start_run() has set the run key
+            standalone = ENABLED and _RUN_KEY not in st.session_state
+            if standalone:
+                first = len(records())
+                start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _fragment.reset(token)
+                # Polling fragments that timed nothing are not worth a line
+                if standalone and len(records()) > first:
+                    seconds = time.perf_counter() - start
+                    _write_trace(_trace("fragment", name, records()[first:], seconds))
+        return st.fragment(wrapper, run_every=run_every)
+    return decorator
+
+
+def _trace(kind, fragment_name, sections, seconds):
+    return {
+        "timestamp": time.time(),
+        "page": st.session_state.get("_profile_page"),
+        "kind": kind,
+        "fragment": fragment_name,
+        "seconds": seconds,
+        "sections": list(sections),
+    }
+
+
+def _write_trace(trace):
+    if TRACE_PATH is None:
+        return
+    line = json.dumps(trace) + "\n"
+    with _trace_lock, open(TRACE_PATH, "a") as f:
+        f.write(line)
+
+
+def _panel(trace):
+    with st.sidebar.expander("⏱️ Profiling", expanded=False):
+        st.caption(f"Last full run: {trace['seconds'] * 1000:.1f} ms")
+        if trace["sections"]:
+            table = pd.DataFrame(trace["sections"])
+            table["ms"] = (table.pop("seconds") * 1000).round(1)
+            table["KB"] = (table.pop("payload_bytes") / 1024).round(1)
+            table["KB saved"] = (table.pop("saved_bytes") / 1024).round(1)
+            st.dataframe(table, hide_index=True, use_container_width=True)
+        st.download_button(
+            "Download trace",
+            data=json.dumps(trace, indent=2),
+            file_name="profile_trace.json",
+            mime="application/json"
+        )
+
+
+def summarize(traces):
+    """Per (page, section) call count, mean/p95/max ms, rows, KB sent and
+    KB saved"""
+    rows = [
+        {"page": t["page"], "kind": t["kind"], **s}
+        for t in traces for s in t["sections"]
+    ]
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df["ms"] = df["seconds"] * 1000
+    # Traces written before trimming was counted have no saved_bytes
+    df["saved_bytes"] = df.reindex(columns=["saved_bytes"])["saved_bytes"].fillna(0)
+    grouped = df.groupby(["page", "section"], dropna=False)
+    return pd.DataFrame({
+        "calls": grouped.size(),
+        "mean_ms": grouped["ms"].mean(),
+        "p95_ms": grouped["ms"].quantile(0.95),
+        "max_ms": grouped["ms"].max(),
+        "mean_rows": grouped["rows"].mean(),
+        "mean_KB": grouped["payload_bytes"].mean() / 1024,
+        "mean_saved_KB": grouped["saved_bytes"].mean() / 1024,
+    }).round(2).sort_values("mean_ms", ascending=False)
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        traces = [json.loads(line) for line in f if line.strip()]
+    kinds = pd.Series([t["kind"] for t in traces]).value_counts()
+    print(f"{len(traces)} reruns: " + ", ".join(f"{n} {kind}" for kind, n in kinds.items()))
+    print(summarize(traces).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Population projections past the last census year, fitted for every
+country at once.
+
+Each model is a straight line in some transform of the population, so a
+fit is a weighted least-squares line along the year axis of the Country x
+Year census matrix (interpolate.population_matrix), solved in closed form
+for every row together:
+
+- ``loglinear``: log P = a + b t, a constant growth rate
+- ``logistic``: log(K / P - 1) = a + b t, growth that slows towards a
+  carrying capacity K. K is picked per country from a grid of multiples of
+  its largest census value; all candidates are fitted in the same pass.
+- ``damped``: log P with census points weighted by DAMPING ** (age in
+  years), projected with a slope that decays by DAMPING every year
+
+Projections start from each country's last census value (the fitted line
+is shifted to pass through it). The bands are a normal approximation in the
+transformed space, from the slope's standard error and residual noise that
+accumulates per census interval; they are indicative, not a forecast
+interval in the statistical sense.
+"""
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+from dashboard.interpolate import population_matrix
+
+MODELS = ("loglinear", "logistic", "damped")
+
+# Sidebar label -> model; None shows no projection
+LABELS = {
+    "No projection": None,
+    "Constant growth (log-linear)": "loglinear",
+    "Logistic (carrying capacity)": "logistic",
+    "Damped trend": "damped",
+}
+
+HORIZON = int(os.environ.get("DASHBOARD_PROJECTION_HORIZON", "2050"))
+DAMPING = float(os.environ.get("DASHBOARD_PROJECTION_DAMPING", "0.97"))
+
+# Two-sided band level -> standard normal quantile
+_Z = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600}
+LEVEL = 0.9
+
+# Carrying capacity candidates, as multiples of a country's largest value
+_CAPACITY = np.geomspace(1.02, 20, 48)
+
+
+@dataclass(frozen=True)
+class Projection:
+    model: str
+    level: float
+    countries: pd.Index
+    # First year is the last census year, where every band has zero width
+    years: np.ndarray
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    def country(self, country):
+        """Year, Population, Lower and Upper for one country (or World);
+        empty when it has too few census values to fit"""
+        row = self.countries.get_indexer([country])[0]
+        keep = ~np.isnan(self.mean[row]) if row >= 0 else np.zeros(len(self.years), bool)
+        return pd.DataFrame({
+            "Year": self.years[keep],
+            "Population": self.mean[row, keep],
+            "Lower": self.lower[row, keep],
+            "Upper": self.upper[row, keep],
+        })
+
+
+def _fit_lines(t, y, w):
+    """Weighted least-squares lines y = a + b t along the last axis.
+
+    NaN values in y are left out. Returns (a, b, residual variance,
+    slope variance); rows with fewer than three points get NaN.
+    """
+    w = np.where(np.isnan(y), 0.0, w)
+    y = np.nan_to_num(y)
+    n = np.count_nonzero(w, axis=-1)
+    sw = w.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tm = (w * t).sum(axis=-1) / sw
+        ym = (w * y).sum(axis=-1) / sw
+        dt = t - tm[..., None]
+        stt = (w * dt * dt).sum(axis=-1)
+        b = (w * dt * (y - ym[..., None])).sum(axis=-1) / stt
+        a = ym - b * tm
+        resid = y - (a[..., None] + b[..., None] * t)
+        s2 = (w * resid * resid).sum(axis=-1) / sw * n / (n - 2)
+        slope_var = s2 / stt
+    unfit = n < 3
+    return tuple(np.where(unfit, np.nan, v) for v in (a, b, s2, slope_var))
+
+
+def _logistic(t, log_p, values):
+    """Best (capacity, a, b, s2, slope variance) per row over the grid"""
+    capacity = np.nanmax(values, axis=1, initial=0)[:, None] * _CAPACITY   # row x grid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = np.log(capacity[:, :, None] / values[:, None, :] - 1)          # row x grid x year
+    a, b, s2, slope_var = _fit_lines(t, y, np.ones(y.shape))
+
+    # Pick the capacity that fits best on the population's own log scale
+    with np.errstate(over="ignore", invalid="ignore"):
+        fitted = np.log(capacity)[:, :, None] - np.log1p(np.exp(a[..., None] + b[..., None] * t))
+        sse = np.nansum((fitted - log_p[:, None, :]) ** 2, axis=-1)
+    sse = np.where(np.isnan(a), np.inf, sse)
+    best = np.argmin(sse, axis=1)[:, None]
+
+    def pick(v):
+        return np.take_along_axis(v, best, axis=1)[:, 0]
+
+    return pick(capacity), pick(a), pick(b), pick(s2), pick(slope_var)
+
+
+def _last_valid(t, values):
+    """Year (relative to t's origin) and value of each row's last census"""
+    valid = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    has = valid.any(axis=1)
+    return np.where(has, t[last], np.nan), np.where(has, values[np.arange(len(values)), last], np.nan)
+
+
+def project(df_long, df_world, model="loglinear", horizon=HORIZON, level=LEVEL, damping=DAMPING):
+    """Fit model to every country and World and project to horizon"""
+    if model not in MODELS:
+        raise ValueError(f"unknown projection model {model!r}; expected one of {MODELS}")
+    countries, _, knots, values = population_matrix(df_long, df_world)
+    countries = pd.Index(list(countries) + [WORLD])
+    values = np.where(values > 0, values, np.nan)
+    origin = knots[-1]
+    t = (knots - origin).astype("float64")
+    years = np.arange(origin, max(horizon, origin) + 1)
+    log_p = np.log(values)
+    last_t, last_value = _last_valid(t, values)
+    # Years past each country's own last census; the band grows with it
+    ahead = (years - origin)[None, :] - last_t[:, None]
+    spacing = np.diff(knots).mean() if len(knots) > 1 else 1.0
+
+    if model == "logistic":
+        capacity, a, b, s2, slope_var = _logistic(t, log_p, values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jump_off = np.log(capacity / last_value - 1)
+        distance = ahead
+        transform = np.log(capacity)[:, None]
+    else:
+        weights = damping ** -t[None, :] if model == "damped" else np.ones(len(t))
+        weights = np.broadcast_to(weights, values.shape)
+        a, b, s2, slope_var = _fit_lines(t, log_p, weights)
+        jump_off = np.log(last_value)
+        if model == "damped":
+            distance = damping * (1 - damping ** ahead) / (1 - damping)
+        else:
+            distance = ahead
+
+    centre = jump_off[:, None] + b[:, None] * distance
+    spread = _Z[level] * np.sqrt(slope_var[:, None] * distance ** 2 + s2[:, None] * ahead / spacing)
+    with np.errstate(over="ignore", invalid="ignore"):
+        if model == "logistic":
+            # log(K / P - 1) falls as P rises, so the bands swap
+            mean = np.exp(transform - np.log1p(np.exp(centre)))
+            lower = np.exp(transform - np.log1p(np.exp(centre + spread)))
+            upper = np.exp(transform - np.log1p(np.exp(centre - spread)))
+        else:
+            mean, lower, upper = np.exp(centre), np.exp(centre - spread), np.exp(centre + spread)
+
+    # Only years after a country's own last census, plus that census itself
+    keep = ahead >= 0
+    mean, lower, upper = (np.where(keep, v, np.nan) for v in (mean, lower, upper))
+    return Projection(model, level, countries, years, mean, lower, upper)
@@ -0,0 +1,158 @@
+"""Year x Country population rank matrix and the views built on it.
+
+Ranks for every year are computed in one argsort over a dense Year x
+Country population matrix, so the animated ranking race takes its frames
+straight from the matrix and "who climbed the most between two years" is a
+subtraction of two rows, instead of an nlargest per year over the long
+frame.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+RACE_SIZE = 10
+
+
+@dataclass(frozen=True)
+class RankMatrix:
+    years: np.ndarray
+    countries: np.ndarray
+    continents: np.ndarray
+    # Year x Country; NaN where a country has no value for the year
+    population: np.ndarray
+    # Year x Country, 1 for the most populous; 0 where unranked
+    rank: np.ndarray
+    # Year x rank position -> country column, most populous first; positions
+    # past ranked[year] hold the unranked countries
+    order: np.ndarray
+    ranked: np.ndarray
+
+    def _row(self, year):
+        row = int(np.searchsorted(self.years, year))
+        if row == len(self.years) or self.years[row] != year:
+            raise KeyError(year)
+        return row
+
+    def top(self, year, n=RACE_SIZE):
+        """The n most populous countries in year, with their rank"""
+        row = self._row(year)
+        columns = self.order[row, :min(n, self.ranked[row])]
+        return pd.DataFrame({
+            "Rank": self.rank[row, columns],
+            "Country": self.countries[columns],
+            "Continent": self.continents[columns],
+            "Population": pd.array(self.population[row, columns].round(), dtype="Int64"),
+        })
+
+    def movers(self, start, end, n=RACE_SIZE):
+        """(climbers, fallers): the n countries whose rank improved or
+        worsened the most from start to end, among those ranked in both"""
+        first, last = self.rank[self._row(start)], self.rank[self._row(end)]
+        columns = np.flatnonzero((first > 0) & (last > 0))
+        change = first[columns].astype(np.int64) - last[columns]
+        moves = pd.DataFrame({
+            "Country": self.countries[columns],
+            "Continent": self.continents[columns],
+            f"Rank {start}": first[columns],
+            f"Rank {end}": last[columns],
+            "Change": change,
+        })
+        # Stable sorts, so ties keep the alphabetical column order
+        order = np.argsort(-change, kind="stable")
+        climbers = moves.take(order[:n])
+        climbers = climbers[climbers["Change"] > 0].reset_index(drop=True)
+        order = np.argsort(change, kind="stable")
+        fallers = moves.take(order[:n])
+        fallers = fallers[fallers["Change"] < 0].reset_index(drop=True)
+        return climbers, fallers
+
+
+def build_ranks(index):
+    """Rank every country in every year of a LongIndex"""
+    frame = index.frame
+    codes = frame["Country"].cat.codes.to_numpy()
+    present = np.unique(codes)
+    column = np.searchsorted(present, codes)
+    years = np.asarray(index.years)
+    row = np.searchsorted(years, frame["Year"].to_numpy())
+
+    # A country listed twice in the source keeps its first listing, like
+    # interpolate.population_matrix
+    population = np.full((len(years), len(present)), np.nan)
+    cells, keep = np.unique(row * len(present) + column, return_index=True)
+    population.flat[cells] = frame["Population"].to_numpy(dtype="float64", na_value=np.nan)[keep]
+    # The index keeps each country's rows contiguous, in category order
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    continent = frame["Continent"].cat
+    continents = continent.categories.to_numpy(dtype=object)[continent.codes.to_numpy()[starts]]
+
+    # NaN sorts last, so each row's ranked countries come first
+    order = np.argsort(-population, axis=1, kind="stable")
+    ranked = np.count_nonzero(~np.isnan(population), axis=1)
+    positions = np.arange(1, len(present) + 1, dtype=np.int32)
+    rank = np.zeros(population.shape, dtype=np.int32)
+    np.put_along_axis(rank, order, np.broadcast_to(positions, order.shape), axis=1)
+    rank[np.isnan(population)] = 0
+
+    countries = np.asarray(frame["Country"].cat.categories[present], dtype=object)
+    return RankMatrix(years, countries, continents, population, rank, order, ranked)
+
+
+def race_figure(ranks, template, n=RACE_SIZE, height=500, frame_ms=200):
+    """Animated horizontal bar chart of the top n countries, one frame per year"""
+    n = max(1, min(n, len(ranks.countries)))
+    top = ranks.order[:, :n]
+    values = np.take_along_axis(ranks.population, top, axis=1)
+    palette = dict(zip(sorted(set(ranks.continents)), qualitative.Plotly * 4))
+
+    def bars(row):
+        count = min(n, ranks.ranked[row])
+        # Reversed so the most populous bar is drawn at the top
+        columns, value = top[row, :count][::-1], values[row, :count][::-1]
+        continents = ranks.continents[columns]
+        return {
+            "type": "bar",
+            "orientation": "h",
+            "x": value,
+            "y": ranks.countries[columns],
+            "texttemplate": "%{x:,.0f}",
+            "textposition": "outside",
+            "customdata": continents,
+            "marker": {"color": [palette[c] for c in continents]},
+            "hovertemplate": "%{y} (%{customdata})<br>%{x:,.0f}<extra></extra>",
+        }
+
+    labels = [str(year) for year in ranks.years]
+    frames = [
+        {"name": label, "data": [bars(row)], "layout": {"title": {"text": f"Most Populous Countries: {label}"}}}
+        for row, label in enumerate(labels)
+    ]
+    step_args = {"mode": "immediate", "frame": {"duration": frame_ms, "redraw": True},
+                 "transition": {"duration": frame_ms // 2}}
+    layout = {
+        "template": template,
+        "height": height,
+        "title": {"text": f"Most Populous Countries: {labels[-1]}"},
+        "xaxis": {"title": {"text": "Population"}, "range": [0, np.nanmax(values) * 1.15]},
+        "yaxis": {"type": "category"},
+        "margin": {"l": 140},
+        "updatemenus": [{
+            "type": "buttons", "direction": "left", "x": 0, "y": -0.12, "xanchor": "left",
+            "buttons": [
+                {"label": "▶", "method": "animate", "args": [None, {**step_args, "fromcurrent": True}]},
+                {"label": "⏸", "method": "animate",
+                 "args": [[None], {"mode": "immediate", "frame": {"duration": 0}}]},
+            ],
+        }],
+        "sliders": [{
+            "active": len(labels) - 1, "x": 0.1, "len": 0.9, "y": -0.05,
+            "currentvalue": {"prefix": "Year: "},
+            "steps": [{"label": label, "method": "animate", "args": [[label], step_args]}
+                      for label in labels],
+        }],
+    }
+    # Start on the latest year, matching the slider
+    return go.Figure({"data": frames[-1]["data"], "layout": layout, "frames": frames}, _validate=False)
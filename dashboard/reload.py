@@ -0,0 +1,176 @@
+"""Incremental refresh of the transformed frames after the CSV changes.
+
+A correction to one country row or a newly appended "<year> Population"
+column should not cost a full melt and sort of every country. The reloader
+keeps a hash of every source row; when the file changes it re-melts only
+the rows that changed (plus the new year columns of the others), splices
+them into the previous df_long and reports which years moved, so the
+per-year aggregates are recomputed for those years alone.
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard import data
+from dashboard.aggregates import update_cube
+from dashboard.data import WORLD
+
+# Past this share of changed countries a full rebuild is cheaper
+FULL_REBUILD_SHARE = 0.5
+
+
+@dataclass(frozen=True)
+class SourceState:
+    """What was ingested: the year columns and a hash per source row"""
+    year_columns: tuple
+    keys: pd.MultiIndex
+    hashes: np.ndarray
+
+
+@dataclass(frozen=True)
+class Changes:
+    countries: frozenset
+    added_columns: tuple
+    full: bool
+
+
+def _row_keys(df_original):
+    # A country may be listed more than once; the n-th listing is its own row
+    occurrence = df_original.groupby('Country', sort=False).cumcount()
+    return pd.MultiIndex.from_arrays([df_original['Country'], occurrence])
+
+
+def _row_hashes(df_original, columns):
+    return pd.util.hash_pandas_object(
+        df_original[['Country', 'Continent'] + list(columns)], index=False
+    ).to_numpy()
+
+
+def source_state(df_original):
+    columns = tuple(data.year_columns(df_original.columns))
+    return SourceState(columns, _row_keys(df_original), _row_hashes(df_original, columns))
+
+
+def detect_changes(state, df_original):
+    """Countries whose rows changed, appeared or vanished, and new year columns"""
+    columns = data.year_columns(df_original.columns)
+    if set(state.year_columns) - set(columns):
+        return Changes(frozenset(), (), full=True)
+    added = tuple(col for col in columns if col not in state.year_columns)
+
+    keys = _row_keys(df_original)
+    hashes = _row_hashes(df_original, state.year_columns)
+    position = state.keys.get_indexer(keys)
+    changed = (position < 0) | (state.hashes[np.maximum(position, 0)] != hashes)
+    vanished = keys.get_indexer(state.keys) < 0
+    countries = frozenset(keys[changed].get_level_values(0)) | frozenset(
+        state.keys[vanished].get_level_values(0)
+    )
+    total = max(len(set(keys.get_level_values(0))), 1)
+    return Changes(countries, added, full=len(countries) / total > FULL_REBUILD_SHARE)
+
+
+def _with_categories(df, countries, continents):
+    return df.assign(
+        Country=df['Country'].cat.set_categories(countries),
+        Continent=df['Continent'].cat.set_categories(continents),
+    )
+
+
+def _present(column):
+    codes = np.unique(column.cat.codes.to_numpy())
+    return set(column.cat.categories[codes[codes >= 0]])
+
+
+def _changed_years(old, new):
+    """Years in which any (Country, Continent, Year, Population, Growth_Rate)
+    row differs; a country moving continent moves every year it reports"""
+    columns = ['Country', 'Continent', 'Year', 'Population', 'Growth_Rate']
+    merged = old[columns].astype({'Country': str, 'Continent': str}).merge(
+        new[columns].astype({'Country': str, 'Continent': str}), how='outer', indicator=True
+    )
+    return set(merged.loc[merged['_merge'] != 'both', 'Year'].astype(int))
+
+
+def apply_changes(df_long, df_world, df_original, changes):
+    """Return (df_long, df_world, changed years) after applying changes"""
+    countries = changes.countries - {WORLD}
+    in_source = df_original['Country']
+
+    # Changed countries are re-melted whole; the rest only for new columns
+    parts = []
+    rebuilt_rows = df_original[in_source.isin(countries)]
+    if len(rebuilt_rows):
+        parts.append(data.transform_data(rebuilt_rows)[0])
+    others = df_original[~in_source.isin(countries | {WORLD})]
+    if changes.added_columns and len(others):
+        appended = others[['Country', 'Continent'] + list(changes.added_columns)]
+        parts.append(data.transform_data(appended)[0])
+
+    kept = df_long[~df_long['Country'].isin(countries)]
+    country_names = sorted(set().union(_present(kept['Country']), *(_present(p['Country']) for p in parts), {WORLD}))
+    continent_names = sorted(set().union(_present(kept['Continent']), *(_present(p['Continent']) for p in parts), {WORLD}))
+    combined = pd.concat(
+        [_with_categories(p, country_names, continent_names) for p in [kept, *parts]],
+        ignore_index=True,
+    )
+
+    # lexsort is stable, so duplicate listings of a country keep source order
+    codes = combined['Country'].cat.codes.to_numpy()
+    order = np.lexsort((combined['Year'].to_numpy(), codes))
+    combined = combined.take(order).reset_index(drop=True)
+
+    # Growth is re-derived in one vectorized pass: a new year column changes
+    # the growth of the year after it, not just its own
+    codes = codes[order]
+    population = combined['Population'].to_numpy(dtype='float64', na_value=np.nan)
+    growth = np.full(len(combined), np.nan, dtype=np.float32)
+    same = codes[1:] == codes[:-1]
+    growth[1:][same] = (population[1:][same] / population[:-1][same] - 1) * 100
+    combined['Growth_Rate'] = growth
+
+    years = _changed_years(
+        df_long[df_long['Country'].isin(countries)],
+        combined[combined['Country'].isin(countries)],
+    )
+    if changes.added_columns:
+        # Other countries only move from the first new year onwards
+        added = [int(re.search(r'(\d{4})', col).group(1)) for col in changes.added_columns]
+        names = set(others['Country'])
+        old_rows = df_long[df_long['Country'].isin(names) & (df_long['Year'] >= min(added))]
+        new_rows = combined[combined['Country'].isin(names) & (combined['Year'] >= min(added))]
+        years |= set(added) | _changed_years(old_rows, new_rows)
+
+    # World: the source's own row when it has one, otherwise the sum
+    world_rows = df_original[in_source == WORLD]
+    country_dtype = combined['Country'].dtype
+    continent_dtype = combined['Continent'].dtype
+    if len(world_rows):
+        new_world = data.transform_data(world_rows)[1]
+    else:
+        world_pop = combined.groupby('Year')['Population'].sum()
+        new_world = pd.DataFrame({
+            'Country': [WORLD] * len(world_pop),
+            'Continent': [WORLD] * len(world_pop),
+            'Year': world_pop.index.to_numpy(dtype='int16'),
+            'Population': world_pop.array,
+            'Growth_Rate': (world_pop.astype('float64').pct_change() * 100).to_numpy(dtype='float32'),
+        })
+    new_world = new_world.astype({'Country': country_dtype, 'Continent': continent_dtype})
+    years |= _changed_years(df_world, new_world)
+
+    return combined, new_world, years
+
+
+def refresh(df_long, df_world, cube, state, df_original):
+    """Incrementally updated (df_long, df_world, cube, state), or None when a
+    full rebuild is needed. cube may be None if it was never built."""
+    changes = detect_changes(state, df_original)
+    if changes.full:
+        return None
+    df_long, df_world, years = apply_changes(df_long, df_world, df_original, changes)
+    if cube is not None:
+        cube = update_cube(cube, df_long, df_world, years)
+    return df_long, df_world, cube, source_state(df_original)
@@ -0,0 +1,62 @@
+"""Start the dashboard with its caches already warm.
+
+Usage: python -m dashboard.serve [streamlit run options...]
+
+A plain ``streamlit run app.py`` loads the dataset, builds the index, cube
+and interpolated series and renders the default charts on the first
+session's request, so every freshly scaled-out worker makes its first user
+wait. This entry point does that work before the server starts listening:
+it runs the home script and every page once headlessly, in this process, so
+the shared st.cache_resource entries (the Publisher and its derived data,
+the figure cache) are filled with exactly what a new session asks for. The
+export stack (kaleido) is not touched; it is still loaded on first export.
+
+Set DASHBOARD_PREWARM=0 to skip the warm-up.
+"""
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = [
+    "pages/1_Country_Overview.py",
+    "pages/2_Compare_Countries.py",
+    "pages/3_Global_Statistics.py",
+]
+
+PREWARM = os.environ.get("DASHBOARD_PREWARM", "1") == "1"
+PREWARM_TIMEOUT = float(os.environ.get("DASHBOARD_PREWARM_TIMEOUT", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm(pages=PAGES, timeout=PREWARM_TIMEOUT):
+    """Run app.py and each page under its default widgets; return seconds taken"""
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout).run()
+    for page in pages:
+        at.switch_page(page).run()
+        if at.exception:
+            # A broken page should fail in front of its user, not block boot
+            logger.warning("Prewarming %s failed: %s", page, at.exception[0].message)
+    return time.perf_counter() - start
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if PREWARM:
+        logger.info("Prewarmed caches in %.2fs", prewarm())
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(ROOT / "app.py"), *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Countries whose population trajectories look like a given country's.
+
+Trajectories are compared on log population, so a country of 5 million and
+one of 500 million that grow at the same rates are neighbours. Two metrics
+are offered over any window of years:
+
+- ``path``: root-mean-square distance between the log trajectories after
+  each is shifted to start at zero, i.e. between cumulative growth paths
+- ``correlation``: 1 - Pearson correlation of the log trajectories, which
+  ignores how fast a country grows and compares only the shape
+
+Both reduce to sums over the window (of x, x^2 and the query product x*q),
+so the index keeps per-country prefix sums and a query costs one
+matrix-vector product over the window's columns plus O(countries) work. No
+pairwise distance matrix is stored or recomputed.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+from dashboard.interpolate import population_matrix
+
+METRICS = ("path", "correlation")
+
+# Radio label -> metric
+LABELS = {
+    "Growth path": "path",
+    "Shape (correlation)": "correlation",
+}
+
+
+@dataclass(frozen=True)
+class TrajectoryIndex:
+    years: np.ndarray
+    countries: np.ndarray
+    continents: np.ndarray
+    # Country -> column in the matrices below
+    columns: dict
+    # Year x Country log population, 0 where missing (see counts); years
+    # run down the rows so a window and a prefix-sum row are contiguous
+    values: np.ndarray
+    # (Year + 1) x Country prefix sums of present values, squares and counts
+    sums: np.ndarray
+    squares: np.ndarray
+    counts: np.ndarray
+
+    def _window(self, year_range):
+        lo = int(np.searchsorted(self.years, year_range[0], side="left"))
+        hi = int(np.searchsorted(self.years, year_range[1], side="right"))
+        return lo, hi
+
+    def trajectories(self, countries, year_range):
+        """Year, Country and Index (population relative to the first year
+        of the window, 100 = unchanged) for the given countries"""
+        lo, hi = self._window(year_range)
+        rows = [self.columns[c] for c in countries if c in self.columns]
+        window = self.values[lo:hi, rows].T
+        index = np.exp(window - window[:, :1]) * 100
+        return pd.DataFrame({
+            "Year": np.tile(self.years[lo:hi], len(rows)),
+            "Country": np.repeat(self.countries[rows], hi - lo),
+            "Index": index.ravel(),
+        })
+
+    def nearest(self, country, year_range, k=5, metric="path"):
+        """The k countries closest to country over year_range, nearest first.
+
+        Only countries with a value in every year of the window take part.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}; expected one of {METRICS}")
+        empty = pd.DataFrame({"Country": [], "Continent": [], "Distance": []})
+        query = self.columns.get(country)
+        lo, hi = self._window(year_range)
+        n = hi - lo
+        # A correlation over two points is always +-1
+        if query is None or n < (3 if metric == "correlation" else 2):
+            return empty
+
+        complete = (self.counts[hi] - self.counts[lo]) == n
+        if not complete[query]:
+            return empty
+        s1 = self.sums[hi] - self.sums[lo]
+        s2 = self.squares[hi] - self.squares[lo]
+        q = self.values[lo:hi, query]
+        cross = q @ self.values[lo:hi]
+        q1, q2 = s1[query], s2[query]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == "path":
+                # sum((x - x0) - (q - q0))^2 expanded into window sums
+                u0 = self.values[lo] - q[0]
+                su = s1 - q1
+                su2 = s2 + q2 - 2 * cross
+                distance = np.sqrt(np.maximum(su2 - 2 * u0 * su + n * u0 * u0, 0) / n)
+            else:
+                covariance = n * cross - s1 * q1
+                spread = np.sqrt(np.maximum(n * s2 - s1 * s1, 0) * max(n * q2 - q1 * q1, 0))
+                distance = 1 - covariance / spread
+
+        candidates = np.flatnonzero(complete & ~np.isnan(distance))
+        candidates = candidates[candidates != query]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distance[candidates], k)[:k]]
+        candidates = candidates[np.argsort(distance[candidates], kind="stable")]
+        return pd.DataFrame({
+            "Country": self.countries[candidates],
+            "Continent": self.continents[candidates],
+            "Distance": distance[candidates],
+        })
+
+
+def build_similarity(index):
+    """Trajectory index over every country and World of a LongIndex"""
+    countries, continent_codes, years, matrix = population_matrix(index.frame, index.world)
+    present = (matrix > 0).T
+    values = np.where(present, np.log(np.where(present, matrix.T, 1)), 0.0)
+
+    def prefix(a):
+        out = np.zeros((a.shape[0] + 1, a.shape[1]))
+        np.cumsum(a, axis=0, out=out[1:])
+        return out
+
+    names = np.array(list(countries) + [WORLD], dtype=object)
+    continent_names = index.frame["Continent"].cat.categories
+    continents = np.append(continent_names[continent_codes].to_numpy(dtype=object), WORLD)
+    return TrajectoryIndex(
+        years, names, continents, {name: i for i, name in enumerate(names)}, values,
+        prefix(values), prefix(values * values), prefix(present.astype(np.float64)),
+    )
@@ -0,0 +1,151 @@
+"""On-disk snapshots of the transformed frames, shared by every worker.
+
+Snapshots are keyed by a fingerprint of the source CSV so a cold worker can
+skip the CSV parse and melt when the data has not changed, and a new
+snapshot is built automatically as soon as the CSV does change.
+
+Each frame is stored as memory-mapped column files (dashboard.columns).
+Workers map a snapshot read-only rather than reading it into memory, so
+the Streamlit processes on a host share one copy of the dataset and a new
+worker has its frames as soon as the files are mapped. A snapshot version
+is published by renaming its finished directory into place, so a worker
+maps either the whole of a version or none of it; removing an old version
+leaves the mappings workers still hold of it intact.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from dashboard import columns, data, ingest
+
+SNAPSHOT_DIR = Path(os.environ.get(
+    "DASHBOARD_SNAPSHOT_DIR", Path(__file__).resolve().parent.parent / ".snapshots"
+))
+
+# Bump whenever transform_data() changes the shape or dtypes of its output,
+# so snapshots written by older code are never served.
+SCHEMA_VERSION = 4
+
+FRAMES = ("df_long", "df_world")
+
+# Indicator table of a version (dashboard.indicators.to_frames), added to its
+# snapshot directory the first time a worker builds it
+INDICATORS = "indicators"
+INDICATOR_FRAMES = ("frame", "countries")
+
+# (path, size, mtime) -> fingerprint, so callers can check the version on
+# every rerun without rehashing an unchanged file
+_fingerprints = {}
+
+
+def fingerprint(path):
+    """Return a short content hash of the source CSV"""
+    stat = os.stat(path)
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _fingerprints:
+        for stale in [k for k in _fingerprints if k[0] == key[0]]:
+            del _fingerprints[stale]
+        _fingerprints[key] = _hash_file(path)
+    return _fingerprints[key]
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"v{SCHEMA_VERSION}-{digest.hexdigest()[:16]}"
+
+
+def snapshot_path(csv_path, snapshot_dir=SNAPSHOT_DIR, version=None):
+    """Directory holding the snapshot for the current contents of csv_path,
+    or for the given fingerprint of it"""
+    if version is None:
+        version = fingerprint(csv_path)
+    return Path(snapshot_dir) / f"{Path(csv_path).stem}-{version}"
+
+
+def load_snapshot(csv_path, snapshot_dir=SNAPSHOT_DIR):
+    """Return the snapshotted frames, mapped read-only, or None if there is
+    no valid snapshot"""
+    target = snapshot_path(csv_path, snapshot_dir)
+    if not target.is_dir():
+        return None
+    try:
+        return tuple(columns.map_frame(target / name) for name in FRAMES)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_snapshot(csv_path, frames, snapshot_dir=SNAPSHOT_DIR):
+    """Write frames for csv_path and drop snapshots of older CSV contents"""
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    target = snapshot_path(csv_path, snapshot_dir)
+
+    # Write into a scratch directory and rename, so concurrent workers never
+    # see a half-written snapshot.
+    scratch = Path(tempfile.mkdtemp(dir=snapshot_dir, prefix=".tmp-"))
+    try:
+        for name, frame in zip(FRAMES, frames):
+            columns.write_frame(frame, scratch / name)
+        os.rename(scratch, target)
+    except OSError:
+        # Another worker published the same snapshot first
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not target.is_dir():
+            raise
+
+    prefix = f"{Path(csv_path).stem}-"
+    for stale in snapshot_dir.glob(f"{prefix}*"):
+        if stale != target:
+            shutil.rmtree(stale, ignore_errors=True)
+    return target
+
+
+def load_indicators(csv_path, version, snapshot_dir=SNAPSHOT_DIR):
+    """Return the indicator frames of the given version of csv_path, mapped
+    read-only, or None if its snapshot has none"""
+    target = snapshot_path(csv_path, snapshot_dir, version) / INDICATORS
+    if not target.is_dir():
+        return None
+    try:
+        return tuple(columns.map_frame(target / name) for name in INDICATOR_FRAMES)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_indicators(csv_path, version, frames, snapshot_dir=SNAPSHOT_DIR):
+    """Add indicator frames to the snapshot of the given version of
+    csv_path; raises OSError when that snapshot does not exist"""
+    target = snapshot_path(csv_path, snapshot_dir, version) / INDICATORS
+    scratch = Path(tempfile.mkdtemp(dir=snapshot_dir, prefix=".tmp-"))
+    try:
+        for name, frame in zip(INDICATOR_FRAMES, frames):
+            columns.write_frame(frame, scratch / name)
+        os.rename(scratch, target)
+    except OSError:
+        # Another worker added them first, or the snapshot is gone
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not target.is_dir():
+            raise
+    return target
+
+
+def load_or_build(csv_path=data.DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Map frames from the snapshot, rebuilding it from the CSV when stale"""
+    frames = load_snapshot(csv_path, snapshot_dir)
+    if frames is not None:
+        return frames
+
+    frames = ingest.ingest_csv(csv_path)
+    try:
+        save_snapshot(csv_path, frames, snapshot_dir)
+    except OSError:
+        # A read-only deploy only costs us the snapshot, and the sharing
+        return frames
+    # Serve the shared mapping rather than this worker's private copy
+    mapped = load_snapshot(csv_path, snapshot_dir)
+    return frames if mapped is None else mapped
@@ -0,0 +1,171 @@
+"""Growth statistics for every country over any window of years.
+
+The Country x Year matrix (interpolate.population_matrix) and the
+Continent x Year totals are laid out once per dataset version and series.
+A window's table is then one vectorized pass over the window's columns:
+each country's first and last value in the window, total change, compound
+annual growth rate (CAGR), doubling time, peak year and its share of its
+continent and of the world in its last year.
+
+Tables are written out in chunks of rows (CSV) or row groups (Parquet), so
+a download can be streamed without the whole file existing in memory.
+"""
+import io
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import WORLD
+from dashboard.interpolate import population_matrix
+
+CHUNK_ROWS = int(os.environ.get("DASHBOARD_STATS_CHUNK_ROWS", "1000"))
+# Where dashboard.api is served, if anywhere; the page links to its /stats
+# route, which streams the table rather than holding it in memory
+API_URL = os.environ.get("DASHBOARD_API_URL", "").rstrip("/")
+
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+@dataclass(frozen=True)
+class StatsMatrix:
+    years: np.ndarray
+    # Countries with World last
+    countries: np.ndarray
+    continents: np.ndarray
+    # Country x Year populations, NaN where missing
+    values: np.ndarray
+    # Row of each country's continent in continent_totals; -1 for World
+    continent_rows: np.ndarray
+    continent_totals: np.ndarray
+
+    def table(self, year_range=None):
+        """Statistics of every country (and World) with a value in the window"""
+        lo, hi = 0, len(self.years)
+        if year_range is not None:
+            lo = int(np.searchsorted(self.years, year_range[0], side="left"))
+            hi = int(np.searchsorted(self.years, year_range[1], side="right"))
+        window = self.values[:, lo:hi]
+        valid = ~np.isnan(window)
+        rows = np.flatnonzero(valid.any(axis=1)) if hi > lo else np.arange(0)
+        window, valid = window[rows], valid[rows]
+
+        if len(rows):
+            first = np.argmax(valid, axis=1)
+            last = window.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+            peak = np.argmax(np.where(valid, window, -np.inf), axis=1)
+        else:
+            first = last = peak = np.zeros(0, dtype=np.intp)
+        picks = np.arange(len(rows))
+        start, end = window[picks, first], window[picks, last]
+        start_year, end_year = self.years[lo + first], self.years[lo + last]
+        span = (end_year - start_year).astype("float64")
+
+        continent_rows = self.continent_rows[rows]
+        continent_total = np.where(
+            continent_rows >= 0,
+            self.continent_totals[np.maximum(continent_rows, 0), lo + last],
+            np.nan,
+        )
+        world_total = self.values[-1, lo + last]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            cagr = np.where((span > 0) & (start > 0), (end / start) ** (1 / span) - 1, np.nan)
+            doubling = np.where(cagr > 0, np.log(2) / np.log1p(cagr), np.nan)
+            change_pct = (end - start) / start * 100
+            continent_share = end / continent_total * 100
+            world_share = end / world_total * 100
+
+        def population(values):
+            return pd.array(values.round(), dtype="Int64")
+
+        return pd.DataFrame({
+            "Country": self.countries[rows],
+            "Continent": self.continents[rows],
+            "Start Year": start_year.astype("int16"),
+            "Start Population": population(start),
+            "End Year": end_year.astype("int16"),
+            "End Population": population(end),
+            "Total Change": population(end - start),
+            "Total Change %": change_pct,
+            "CAGR %": cagr * 100,
+            "Doubling Time (years)": doubling,
+            "Peak Year": self.years[lo + peak].astype("int16"),
+            "Peak Population": population(window[picks, peak]),
+            "% of Continent": continent_share,
+            "% of World": world_share,
+        })
+
+
+def build_stats(index):
+    """Statistics matrix over every country and World of a LongIndex"""
+    countries, continent_codes, years, values = population_matrix(index.frame, index.world)
+    continent_names = index.frame["Continent"].cat.categories
+    used, continent_rows = np.unique(continent_codes, return_inverse=True)
+    continent_totals = np.zeros((len(used), len(years)))
+    np.add.at(continent_totals, continent_rows, np.nan_to_num(values[:-1]))
+    return StatsMatrix(
+        years,
+        np.array(list(countries) + [WORLD], dtype=object),
+        np.append(continent_names[continent_codes].to_numpy(dtype=object), WORLD),
+        values,
+        np.append(continent_rows, -1),
+        continent_totals,
+    )
+
+
+def iter_csv(table, chunk_rows=CHUNK_ROWS):
+    """The table as CSV, in encoded chunks of chunk_rows rows"""
+    for start in range(0, max(len(table), 1), chunk_rows):
+        chunk = table.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write target that hands over what was written since the last take()"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        out = b"".join(self.parts)
+        self.parts.clear()
+        return out
+
+
+def iter_parquet(table, chunk_rows=CHUNK_ROWS):
+    """The table as a Parquet file, one row group of chunk_rows rows per
+    chunk, then the footer"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(table, preserve_index=False)
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for start in range(0, len(table), chunk_rows):
+            chunk = table.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.take()
+    yield sink.take()
+
+
+def iter_format(table, export_format, chunk_rows=CHUNK_ROWS):
+    """Chunks of the table in one of FORMATS"""
+    if export_format == "parquet":
+        return iter_parquet(table, chunk_rows)
+    return iter_csv(table, chunk_rows)
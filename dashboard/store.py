@@ -0,0 +1,445 @@
+"""Process-wide access to the dashboard dataset.
+
+Pages call these accessors directly instead of reading frames out of
+``st.session_state``, so every session shares one copy of the data and any
+page can be opened cold from its URL.
+
+A watcher thread polls the CSV every ``DASHBOARD_RELOAD_INTERVAL`` seconds
+(0 disables it). When the file changes, the new version is built off the
+script threads, incrementally where possible (see dashboard.reload), and
+published with a single reference swap. No session waits for the rebuild
+and none sees a half-updated dataset; each picks up the new version at the
+start of its next full run.
+
+The frames are memory-mapped from the snapshot (see dashboard.snapshot),
+so the worker processes on a host share one copy of them. The first worker
+to see a new CSV builds and publishes the new snapshot; the others map it
+instead of rebuilding.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from dashboard import (
+    data, groupings, indicators, interpolate, profiling, projection, reload, snapshot, stats
+)
+from dashboard.aggregates import build_cube
+from dashboard.index import LongIndex, build_index
+from dashboard.ranks import build_ranks
+from dashboard.similarity import build_similarity
+
+RELOAD_INTERVAL = float(os.environ.get("DASHBOARD_RELOAD_INTERVAL", "2"))
+
+_PIN_KEY = "_dataset_version"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Transformed frames for one version of the source CSV.
+
+    Instances are shared by every session in the process, so the frames must
+    be treated as read-only; copy before mutating.
+    """
+    version: str
+    df_long: pd.DataFrame
+    df_world: pd.DataFrame
+    index: LongIndex
+
+
+class Publisher:
+    """Holds the live Dataset and publishes new versions of it"""
+
+    def __init__(self, path, interval=RELOAD_INTERVAL):
+        self.path = path
+        version = snapshot.fingerprint(path)
+        with profiling.section("data.load_or_build"):
+            df_long, df_world = snapshot.load_or_build(path)
+            profiling.touch(df_long)
+        with profiling.section("data.build_index"):
+            index = build_index(df_long, df_world)
+        self.dataset = Dataset(version, df_long, df_world, index)
+        # Grouping name -> {group: [countries]}, None for Continent
+        self.groupings = groupings.load()
+        # The version before the last swap, for sessions still pinned to it
+        self._previous = None
+        # Per-version derived data: version -> cube, indicator store or
+        # metric names, (version, method) -> index, rank matrix, trajectory
+        # index, projection, population matrix or statistics matrix,
+        # (version, method, grouping) -> group aggregate, (version, metric)
+        # -> metric matrix
+        self._cubes = {}
+        self._annual = {}
+        self._ranks = {}
+        self._trajectories = {}
+        self._projections = {}
+        self._populations = {}
+        self._groups = {}
+        self._stats = {}
+        self._indicators = {}
+        self._catalogs = {}
+        self._metrics = {}
+        # Guards the caches above and the per-key build locks; held only
+        # to look up a lock or store a value, never during a build
+        self._derived_lock = threading.Lock()
+        # (version, cache name, key) -> lock held while that key is built
+        self._locks = {}
+        # Row hashes of the CSV behind self.dataset, taken on the first poll
+        self._source = None
+        if interval > 0:
+            threading.Thread(
+                target=self._watch, args=(interval,), name="dataset-reload", daemon=True
+            ).start()
+
+    def get(self, version=None):
+        """The dataset of the given version while it is still held, else the latest"""
+        previous = self._previous
+        if previous is not None and previous.version == version:
+            return previous
+        return self.dataset
+
+    def _derived(self, name, dataset, key, build, keep=None):
+        """getattr(self, name)[key] for dataset's version, built by build()
+        on first use.
+
+        Each key has a lock of its own, so a lookup that hits never waits
+        and a build only holds up the callers asking for the same key.
+        keep(value), when given, says whether a built value may be
+        memoized; values of versions no longer held are never memoized.
+        """
+        value = getattr(self, name).get(key)
+        if value is not None:
+            return value
+        with self._derived_lock:
+            lock = self._locks.setdefault((dataset.version, name, key), threading.Lock())
+        with lock:
+            value = getattr(self, name).get(key)
+            if value is None:
+                value = build()
+                if keep is None or keep(value):
+                    with self._derived_lock:
+                        if dataset.version in self._held():
+                            getattr(self, name)[key] = value
+            return value
+
+    def _held(self):
+        previous = self._previous
+        return (self.dataset.version,) if previous is None else (self.dataset.version, previous.version)
+
+    def cube(self, dataset):
+        """Per-year aggregates of dataset, built on first use"""
+        def build():
+            with profiling.section("data.build_cube"):
+                profiling.touch(dataset.df_long)
+                return build_cube(dataset.df_long, dataset.df_world)
+        return self._derived("_cubes", dataset, dataset.version, build)
+
+    def annual_index(self, dataset, method):
+        """Index over dataset interpolated to annual rows, built on first use"""
+        def build():
+            with profiling.section("data.interpolate"):
+                df_long, df_world = interpolate.annual_frames(dataset.df_long, dataset.df_world, method)
+                profiling.touch(df_long)
+                return build_index(df_long, df_world)
+        return self._derived("_annual", dataset, (dataset.version, method), build)
+
+    def _series_index(self, dataset, method):
+        return dataset.index if method is None else self.annual_index(dataset, method)
+
+    def ranks(self, dataset, method=None):
+        """Rank matrix over the census years, or over the annual series of
+        the given interpolate.METHODS entry, built on first use"""
+        def build():
+            index = self._series_index(dataset, method)
+            with profiling.section("data.build_ranks"):
+                profiling.touch(index.frame)
+                return build_ranks(index)
+        return self._derived("_ranks", dataset, (dataset.version, method), build)
+
+    def similarity(self, dataset, method=None):
+        """Trajectory index over the census years, or over the annual series
+        of the given interpolate.METHODS entry, built on first use"""
+        def build():
+            index = self._series_index(dataset, method)
+            with profiling.section("data.build_similarity"):
+                profiling.touch(index.frame)
+                return build_similarity(index)
+        return self._derived("_trajectories", dataset, (dataset.version, method), build)
+
+    def projection(self, dataset, model):
+        """projection.MODELS entry fitted to dataset's census years, built on
+        first use"""
+        def build():
+            with profiling.section("data.project"):
+                profiling.touch(dataset.df_long)
+                return projection.project(dataset.df_long, dataset.df_world, model)
+        return self._derived("_projections", dataset, (dataset.version, model), build)
+
+    def groups(self, dataset, grouping, method=None):
+        """Per-group totals of one of self.groupings over the census years,
+        or over the annual series of the given interpolate.METHODS entry.
+
+        The Country x Year matrix is laid out once per version and series;
+        each grouping then costs one sparse product against it.
+        """
+        if grouping not in self.groupings:
+            raise ValueError(f"unknown grouping {grouping!r}; expected one of {tuple(self.groupings)}")
+        key = (dataset.version, method)
+
+        def build_matrix():
+            index = self._series_index(dataset, method)
+            with profiling.section("data.build_population_matrix"):
+                profiling.touch(index.frame)
+                return groupings.build_matrix(index)
+
+        def build():
+            matrix = self._derived("_populations", dataset, key, build_matrix)
+            with profiling.section("data.aggregate_groups"):
+                member = groupings.membership(matrix, grouping, self.groupings[grouping])
+                return groupings.aggregate(matrix, member)
+        return self._derived("_groups", dataset, key + (grouping,), build)
+
+    def stats(self, dataset, method=None):
+        """Statistics matrix over the census years, or over the annual
+        series of the given interpolate.METHODS entry, built on first use"""
+        def build():
+            index = self._series_index(dataset, method)
+            with profiling.section("data.build_stats"):
+                profiling.touch(index.frame)
+                return stats.build_stats(index)
+        return self._derived("_stats", dataset, (dataset.version, method), build)
+
+    def indicators(self, dataset):
+        """Every "<year> <Metric>" column of dataset's CSV in one long
+        table, built on first use.
+
+        The table is read from the CSV in chunks and added to dataset's
+        snapshot, so the other workers map it instead of building their own.
+        """
+        def build():
+            with profiling.section("data.build_indicators"):
+                frames = snapshot.load_indicators(self.path, dataset.version)
+                if frames is not None:
+                    return indicators.from_frames(*frames)
+                table = indicators.ingest_indicators(self.path)
+                if snapshot.fingerprint(self.path) != dataset.version:
+                    return table
+                try:
+                    snapshot.save_indicators(self.path, dataset.version, indicators.to_frames(table))
+                except OSError:
+                    return table
+                # Serve the mapping the other workers share, not a private copy
+                frames = snapshot.load_indicators(self.path, dataset.version)
+                return table if frames is None else indicators.from_frames(*frames)
+        # The CSV may have changed since dataset was published; the watcher
+        # publishes its version next
+        return self._derived(
+            "_indicators", dataset, dataset.version, build,
+            keep=lambda table: snapshot.fingerprint(self.path) == dataset.version,
+        )
+
+    def metrics(self, dataset):
+        """Names of every metric of dataset's CSV, base then derived, read
+        from its header without building the indicator table"""
+        return self._derived(
+            "_catalogs", dataset, dataset.version, lambda: indicators.available_metrics(self.path),
+            keep=lambda names: snapshot.fingerprint(self.path) == dataset.version,
+        )
+
+    def metric(self, dataset, metric):
+        """Country x Year matrix of one of metrics(dataset), built on first
+        use; a derived metric is computed from the (also memoized) matrices
+        of its sources. Population comes from the census statistics matrix,
+        so asking for it never builds the indicator table."""
+        key = (dataset.version, metric)
+        if metric == data.POPULATION:
+            return self._derived(
+                "_metrics", dataset, key, lambda: indicators.population_metric(self.stats(dataset))
+            )
+        table = self.indicators(dataset)
+
+        def build():
+            matrices = [self.metric(dataset, source) for source in table.sources(metric)]
+            with profiling.section("data.build_metric"):
+                return table.derive(metric, matrices) if matrices else table.matrix(metric)
+        return self._derived(
+            "_metrics", dataset, key, build,
+            keep=lambda matrix: self._indicators.get(dataset.version) is table,
+        )
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Reloading %s failed", self.path)
+
+    def check(self):
+        """Publish a new dataset if the CSV changed since the last check"""
+        current = self.dataset
+        version = snapshot.fingerprint(self.path)
+        if version == current.version and self._source is not None:
+            return
+        if version != current.version:
+            # Another worker on the host may have published this version
+            # already; mapping its snapshot costs neither a parse nor a copy
+            frames = snapshot.load_snapshot(self.path)
+            if frames is not None:
+                dataset = Dataset(version, *frames, build_index(*frames))
+                self._publish(current, dataset, None, None)
+                return
+
+        df_original = data.load_data(self.path)
+        if snapshot.fingerprint(self.path) != version:
+            # Still being written; the next poll sees the finished file
+            return
+        if version == current.version:
+            self._source = reload.source_state(df_original)
+            return
+
+        result = None
+        if self._source is not None:
+            result = reload.refresh(
+                current.df_long, current.df_world, self._cubes.get(current.version),
+                self._source, df_original,
+            )
+        if result is None:
+            df_long, df_world = data.transform_data(df_original)
+            cube, source = None, reload.source_state(df_original)
+        else:
+            df_long, df_world, cube, source = result
+
+        try:
+            snapshot.save_snapshot(self.path, (df_long, df_world))
+        except OSError:
+            pass
+        else:
+            # Serve the mapping the other workers share, not a private copy
+            frames = snapshot.load_snapshot(self.path)
+            if frames is not None:
+                df_long, df_world = frames
+        dataset = Dataset(version, df_long, df_world, build_index(df_long, df_world))
+        self._publish(current, dataset, cube, source)
+
+    def _publish(self, current, dataset, cube, source):
+        """Swap dataset in for current, dropping derived data of older versions"""
+        version = dataset.version
+        with self._derived_lock:
+            self._cubes = {v: c for v, c in self._cubes.items() if v == current.version}
+            self._annual = {k: i for k, i in self._annual.items() if k[0] == current.version}
+            self._ranks = {k: r for k, r in self._ranks.items() if k[0] == current.version}
+            self._trajectories = {k: t for k, t in self._trajectories.items() if k[0] == current.version}
+            self._projections = {k: p for k, p in self._projections.items() if k[0] == current.version}
+            self._populations = {k: m for k, m in self._populations.items() if k[0] == current.version}
+            self._groups = {k: g for k, g in self._groups.items() if k[0] == current.version}
+            self._stats = {k: m for k, m in self._stats.items() if k[0] == current.version}
+            self._indicators = {v: i for v, i in self._indicators.items() if v == current.version}
+            self._catalogs = {v: n for v, n in self._catalogs.items() if v == current.version}
+            self._metrics = {k: m for k, m in self._metrics.items() if k[0] == current.version}
+            self._locks = {k: l for k, l in self._locks.items() if k[0] == current.version}
+            if cube is not None:
+                self._cubes[version] = cube
+            self._previous, self._source = current, source
+            self.dataset = dataset
+        logger.info("Published dataset %s (was %s)", version, current.version)
+
+
+@st.cache_resource(show_spinner="Loading population data...")
+def _publisher(path):
+    return Publisher(path)
+
+
+def refresh():
+    """Pin this session to the newest published dataset.
+
+    Pages call this once at the top of a full run, so every lookup in the
+    run (and in the fragment reruns that follow it) sees the same version.
+    """
+    st.session_state[_PIN_KEY] = _publisher(data.DATA_PATH).dataset.version
+
+
+def get_dataset():
+    """Return the shared Dataset this session is pinned to"""
+    return _publisher(data.DATA_PATH).get(st.session_state.get(_PIN_KEY))
+
+
+@st.cache_resource(max_entries=1)
+def _load_original(version):
+    with profiling.section("data.load_data"):
+        df_original = data.load_data()
+        profiling.touch(df_original)
+    return df_original
+
+
+def get_df_original():
+    """The untransformed wide CSV; loaded only when first asked for"""
+    return _load_original(get_dataset().version)
+
+
+def get_df_long():
+    return get_dataset().df_long
+
+
+def get_df_world():
+    return get_dataset().df_world
+
+
+def get_index(series=None):
+    """Index over the census rows, or over annual rows interpolated with
+    the given interpolate.METHODS entry"""
+    dataset = get_dataset()
+    if series is None:
+        return dataset.index
+    return _publisher(data.DATA_PATH).annual_index(dataset, series)
+
+
+def get_cube():
+    """Per-year aggregates for the session's dataset version"""
+    return _publisher(data.DATA_PATH).cube(get_dataset())
+
+
+def get_ranks(series=None):
+    """Year x Country rank matrix for the session's dataset version"""
+    return _publisher(data.DATA_PATH).ranks(get_dataset(), series)
+
+
+def get_similarity(series=None):
+    """Trajectory index for similar-country queries on the session's dataset"""
+    return _publisher(data.DATA_PATH).similarity(get_dataset(), series)
+
+
+def get_projection(model):
+    """Projection of every country with the given projection.MODELS entry"""
+    return _publisher(data.DATA_PATH).projection(get_dataset(), model)
+
+
+def get_groupings():
+    """Names of the groupings countries can be aggregated by"""
+    return list(_publisher(data.DATA_PATH).groupings)
+
+
+def get_groups(grouping, series=None):
+    """Per-group totals of a grouping for the session's dataset version"""
+    return _publisher(data.DATA_PATH).groups(get_dataset(), grouping, series)
+
+
+def get_stats(series=None):
+    """Statistics matrix of every country for the session's dataset version"""
+    return _publisher(data.DATA_PATH).stats(get_dataset(), series)
+
+
+def get_metrics():
+    """Names of every metric the session's dataset has, base then derived"""
+    return _publisher(data.DATA_PATH).metrics(get_dataset())
+
+
+def get_metric(metric):
+    """Country x Year matrix of a base or derived metric"""
+    return _publisher(data.DATA_PATH).metric(get_dataset(), metric)
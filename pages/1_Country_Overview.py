@@ -1,22 +1,32 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+from dashboard import (
+    charts, export, figures, interpolate, payload, profiling, projection, similarity, store
+)
 
 st.set_page_config(page_title="Country Overview", page_icon="🌍")
 
 st.title("🌍 Country Overview")
 st.markdown("Select a country to view detailed population statistics and trends")
 
-# Get data from session state
-df_long = st.session_state.df_long
-df_long_with_world = st.session_state.df_long_with_world
+profiling.start_run("Country Overview")
+store.refresh()
+
 template = st.session_state.get("template", "plotly")
 
 # Sidebar filters
 st.sidebar.header("🔎 Filter Options")
 
+# Census years, or annual series interpolated between them
+series_label = st.sidebar.selectbox("Series", list(interpolate.LABELS))
+series = interpolate.LABELS[series_label]
+
+# Get data from the shared data layer
+index = store.get_index(series)
+
 # Continent/Region filter
-continents = sorted(df_long['Continent'].unique())
+continents = sorted(index.continent_countries)
 selected_continent = st.sidebar.selectbox(
     "Filter by Continent (optional)",
     ["All Continents"] + continents
@@ -24,9 +34,9 @@ selected_continent = st.sidebar.selectbox(
 
 # Get countries based on continent selection
 if selected_continent == "All Continents":
-    countries = sorted(df_long_with_world["Country"].unique())
+    countries = index.countries
 else:
-    countries = sorted(df_long_with_world[df_long_with_world["Continent"] == selected_continent]["Country"].unique())
+    countries = index.continent_countries[selected_continent]
 
 # Single country selection
 default_index = countries.index("Kenya") if "Kenya" in countries else 0
@@ -37,8 +47,8 @@ selected_country = st.sidebar.selectbox(
 )
 
 # Year range slider
-year_min = int(df_long["Year"].min())
-year_max = int(df_long["Year"].max())
+year_min = index.years[0]
+year_max = index.years[-1]
 
 year_range = st.sidebar.slider(
     "Select Year Range",
@@ -47,133 +57,284 @@ year_range = st.sidebar.slider(
     (year_min, year_max)
 )
 
-# Export option
-export_format = st.sidebar.selectbox(
-    "📥 Export Chart Format",
-    ["PNG", "SVG", "HTML"]
-)
+# Projection past the last census year, overlaid on the trend chart
+projection_label = st.sidebar.selectbox("Projection", list(projection.LABELS))
+projection_model = projection.LABELS[projection_label]
 
-# Filter dataframe for primary country
-filtered_df = df_long[
-    (df_long["Country"] == selected_country) &
-    (df_long["Year"] >= year_range[0]) &
-    (df_long["Year"] <= year_range[1])
-].sort_values("Year")
+# Export controls rerun on their own, so picking a format or exporting does
+# not rebuild the charts above. Rendering happens on the export service's
+# worker pool; export_progress() polls the job only while it runs.
+@profiling.fragment("export")
+def export_chart(fig_line, selected_country, year_range, countries):
+    with profiling.section("export"):
+        service = export.get_export_service()
 
-if not filtered_df.empty:
-    # SECTION 1: METRICS
-    st.subheader(f"📊 {selected_country} Population Statistics")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    latest_population = filtered_df.iloc[-1]["Population"]
-    latest_year = int(filtered_df.iloc[-1]["Year"])
-    earliest_population = filtered_df.iloc[0]["Population"]
-    total_growth = ((latest_population - earliest_population) / earliest_population) * 100
-    
-    with col1:
-        st.metric(
-            label=f"Current Population ({latest_year})",
-            value=f"{int(latest_population):,}"
+        export_format = st.selectbox(
+            "📥 Export Chart Format",
+            list(export.FORMATS)
         )
-    
-    with col2:
-        st.metric(
-            label="Total Growth",
-            value=f"{total_growth:.2f}%"
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button(f"📥 Export {selected_country} Chart as {export_format}"):
+                item = export.ExportItem(f"{selected_country}_population", export_format, lambda: fig_line)
+                start_export(service.submit([item]))
+
+        with col2:
+            scope = selected_continent if selected_continent != "All Continents" else "all countries"
+            if st.button(f"📦 Export every chart for {scope} as {export_format}"):
+                items = export.country_items(index, countries, year_range, [export_format], template)
+                start_export(service.submit(items, f"{scope.replace(' ', '_')}_charts"))
+
+    export_status()
+
+
+def start_export(job):
+    # A job still running is dropped; its file goes when it is garbage collected
+    st.session_state.pop("export_result", None)
+    st.session_state.export_job = job
+
+
+def export_status():
+    if st.session_state.get("export_job") is not None:
+        export_progress()
+        return
+
+    result = st.session_state.get("export_result")
+    if result is None:
+        return
+    if result.errors:
+        st.warning(f"Export failed for {len(result.errors)} of {result.total} charts: {result.errors[0]}")
+    if result.data is not None:
+        st.download_button(
+            label=f"Download {result.file_name}",
+            data=result.data,
+            file_name=result.file_name,
+            mime=result.mime
         )
-    
-    with col3:
-        growth_rate = filtered_df.iloc[-1]["Growth_Rate"]
-        if pd.notna(growth_rate):
-            st.metric(
-                label="Recent Growth Rate",
-                value=f"{growth_rate:.2f}%"
+
+
+# Rendered only while a job runs, so the timer starts with the export and
+# stops at the rerun that shows its download
+@profiling.fragment("export_status", run_every=1)
+def export_progress():
+    job = st.session_state.export_job
+    if not job.finished:
+        st.progress(job.progress, text=f"Exporting {job.done}/{job.total} charts...")
+        return
+
+    st.session_state.export_result = job.collect()
+    del st.session_state.export_job
+    st.rerun()
+
+
+# The neighbour count and metric rerun only this section
+@profiling.fragment("similar")
+def similar_countries(selected_country, year_range):
+    with profiling.section("similar"):
+        st.subheader(f"🧭 Countries with Growth Paths Like {selected_country}")
+
+        col1, col2 = st.columns([2, 1])
+        with col2:
+            metric_label = st.radio("Compare by", list(similarity.LABELS), key="similar_metric")
+            k = st.slider("Countries", 1, 10, 5, key="similar_k")
+        metric = similarity.LABELS[metric_label]
+
+        trajectories = store.get_similarity(series)
+        neighbours = trajectories.nearest(selected_country, year_range, k, metric)
+        if neighbours.empty:
+            st.info("Not enough data in the selected years to compare trajectories.")
+            return
+
+        def build_similar():
+            import plotly.express as px
+
+            paths = trajectories.trajectories([selected_country, *neighbours["Country"]], year_range)
+            fig_similar = px.line(
+                paths,
+                x="Year",
+                y="Index",
+                color="Country",
+                title=f"Population Relative to {year_range[0]} (= 100)",
+                template=template
+            )
+            fig_similar.update_layout(height=400)
+            return fig_similar
+
+        with col1:
+            fig_similar = figures.cached_figure(
+                "overview_similar", (series, selected_country, year_range, k, metric),
+                build_similar, template
             )
-    
-    with col4:
-        population_change = latest_population - earliest_population
+            profiling.plotly_chart(fig_similar, use_container_width=True)
+        with col2:
+            profiling.dataframe(
+                neighbours[["Country", "Distance"]].round({"Distance": 4}),
+                use_container_width=True, hide_index=True
+            )
+
+
+# Picking a metric reruns only this section. Metrics come from the source's
+# own years; the Series option interpolates Population only
+@profiling.fragment("indicators")
+def indicator_section(selected_country, year_range):
+    with profiling.section("indicators"):
+        st.subheader(f"📐 Indicators: {selected_country}")
+
+        metric = st.selectbox("Metric", store.get_metrics(), key="overview_metric")
+        values = store.get_metric(metric).country(selected_country, year_range)
+        if values.empty:
+            st.info(f"No {metric} data for {selected_country} in the selected years.")
+            return
+
+        latest_value = values.iloc[-1][metric]
+        latest_year = int(values.iloc[-1]["Year"])
         st.metric(
-            label="Total Change",
-            value=f"{int(population_change):,}"
+            label=f"{metric} ({latest_year})",
+            value=f"{latest_value:,.0f}" if float(latest_value).is_integer() else f"{latest_value:,.2f}"
         )
-    
+
+        def build_indicator():
+            import plotly.express as px
+
+            fig_indicator = px.line(
+                values,
+                x="Year",
+                y=metric,
+                title=f"{metric}: {selected_country}",
+                markers=True,
+                template=template
+            )
+            fig_indicator.update_layout(height=400)
+            return fig_indicator
+
+        fig_indicator = figures.cached_figure(
+            "overview_indicator", (metric, selected_country, year_range), build_indicator, template
+        )
+        profiling.plotly_chart(fig_indicator, use_container_width=True)
+
+
+# Paging through the table reruns only this section
+@profiling.fragment("table")
+def data_table(filtered_df):
+    with profiling.section("table"):
+        st.subheader("📄 Population Data Table")
+
+        display_df = filtered_df[['Year', 'Population', 'Growth_Rate']]
+
+        # Only one page of years is sent per rerun, in the narrowest dtypes
+        pages = payload.table_pages(len(display_df))
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Table page (of {pages}, {payload.TABLE_PAGE_ROWS} years each)",
+                min_value=1,
+                max_value=pages,
+                value=1
+            )
+
+        table_df, saved = payload.trimmed_table(display_df, page)
+        profiling.saved(saved)
+
+        profiling.dataframe(table_df, use_container_width=True)
+
+
+# Filter dataframe for primary country
+filtered_df = index.country(selected_country, year_range)
+
+if not filtered_df.empty:
+    # SECTION 1: METRICS
+    with profiling.section("metrics"):
+        st.subheader(f"📊 {selected_country} Population Statistics")
+        profiling.touch(filtered_df)
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        latest_population = filtered_df.iloc[-1]["Population"]
+        latest_year = int(filtered_df.iloc[-1]["Year"])
+        earliest_population = filtered_df.iloc[0]["Population"]
+        total_growth = ((latest_population - earliest_population) / earliest_population) * 100
+
+        with col1:
+            st.metric(
+                label=f"Current Population ({latest_year})",
+                value=f"{int(latest_population):,}"
+            )
+
+        with col2:
+            st.metric(
+                label="Total Growth",
+                value=f"{total_growth:.2f}%"
+            )
+
+        with col3:
+            growth_rate = filtered_df.iloc[-1]["Growth_Rate"]
+            if pd.notna(growth_rate):
+                st.metric(
+                    label="Recent Growth Rate",
+                    value=f"{growth_rate:.2f}%"
+                )
+
+        with col4:
+            population_change = latest_population - earliest_population
+            st.metric(
+                label="Total Change",
+                value=f"{int(population_change):,}"
+            )
+
     # SECTION 2: POPULATION TREND CHART
-    st.subheader(f"📈 Population Trend: {selected_country}")
-    
-    fig_line = px.line(
-        filtered_df,
-        x="Year",
-        y="Population",
-        title=f"Population Growth Trend: {selected_country}",
-        markers=True,
-        template=template
-    )
-    
-    fig_line.update_layout(
-        hovermode='x unified',
-        height=400
-    )
-    
-    st.plotly_chart(fig_line, use_container_width=True)
-    
+    with profiling.section("trend"):
+        st.subheader(f"📈 Population Trend: {selected_country}")
+
+        # Projections continue the series, so they only show when the range
+        # runs to the last year
+        show_projection = projection_model is not None and year_range[1] == year_max
+
+        def build_trend():
+            fig_line = charts.country_trend(filtered_df, selected_country, template)
+            if show_projection:
+                projected = store.get_projection(projection_model).country(selected_country)
+                charts.add_projection(fig_line, projected, selected_country, fig_line.data[0].line.color)
+            return fig_line
+
+        fig_line = figures.cached_figure(
+            "overview_trend",
+            (series, selected_country, year_range, projection_model if show_projection else None),
+            build_trend,
+            template
+        )
+
+        profiling.plotly_chart(fig_line, use_container_width=True)
+
     # Export chart
-    if st.button(f"📥 Export {selected_country} Chart as {export_format}"):
-        try:
-            if export_format == "PNG":
-                img_bytes = fig_line.to_image(format="png")
-                st.download_button(
-                    label=f"Download PNG",
-                    data=img_bytes,
-                    file_name=f"{selected_country}_population.png",
-                    mime="image/png"
-                )
-            elif export_format == "SVG":
-                svg_bytes = fig_line.to_image(format="svg")
-                st.download_button(
-                    label=f"Download SVG",
-                    data=svg_bytes,
-                    file_name=f"{selected_country}_population.svg",
-                    mime="image/svg+xml"
-                )
-            elif export_format == "HTML":
-                html = fig_line.to_html()
-                st.download_button(
-                    label=f"Download HTML",
-                    data=html,
-                    file_name=f"{selected_country}_population.html",
-                    mime="text/html"
-                )
-        except Exception as e:
-            st.warning(f"Export failed: {str(e)}")
-    
+    export_chart(fig_line, selected_country, year_range, countries)
+
     # SECTION 3: GROWTH RATE CHART
-    st.subheader(f"📊 Population Growth Rate: {selected_country}")
-    
-    growth_data = filtered_df.dropna(subset=['Growth_Rate'])
-    
-    if not growth_data.empty:
-        fig_growth = px.bar(
-            growth_data,
-            x="Year",
-            y="Growth_Rate",
-            title=f"Annual Growth Rate: {selected_country}",
-            color="Growth_Rate",
-            color_continuous_scale="RdYlGn",
-            template=template
-        )
-        
-        fig_growth.update_layout(height=300)
-        st.plotly_chart(fig_growth, use_container_width=True)
-    
+    with profiling.section("growth"):
+        st.subheader(f"📊 Population Growth Rate: {selected_country}")
+
+        growth_data = filtered_df.dropna(subset=['Growth_Rate'])
+        profiling.touch(filtered_df)
+
+        if not growth_data.empty:
+            fig_growth = figures.cached_figure(
+                "overview_growth",
+                (series, selected_country, year_range),
+                lambda: charts.country_growth(growth_data, selected_country, template),
+                template
+            )
+            profiling.plotly_chart(fig_growth, use_container_width=True)
+
     # SECTION 4: DATA TABLE
-    st.subheader("📄 Population Data Table")
-    
-    display_df = filtered_df[['Year', 'Population', 'Growth_Rate']].copy()
-    display_df['Population'] = display_df['Population'].astype(int)
-    display_df['Growth_Rate'] = display_df['Growth_Rate'].round(2)
-    
-    st.dataframe(display_df, use_container_width=True)
-    
+    data_table(filtered_df)
+
+    # SECTION 5: SIMILAR COUNTRIES
+    similar_countries(selected_country, year_range)
+
+    # SECTION 6: OTHER INDICATORS
+    indicator_section(selected_country, year_range)
+
 else:
     st.warning("No data available for the selected filters.")
+
+profiling.end_run()
@@ -1,38 +1,192 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+# plotly.express is imported inside the figure builders, which only run on
+# a figure cache miss; a rerun served from the cache never needs it
+from dashboard import charts, compare, figures, interpolate, payload, profiling, projection, store
 
 st.set_page_config(page_title="Compare Countries", page_icon="🌐")
 
 st.title("🌐 Compare Countries")
 st.markdown("Compare population trends across multiple countries")
 
-# Get data from session state
-df_long_with_world = st.session_state.df_long_with_world
+profiling.start_run("Compare Countries")
+store.refresh()
+
 template = st.session_state.get("template", "plotly")
 
 # Sidebar filters
 st.sidebar.header("🔎 Comparison Options")
 
+# Census years, or annual series interpolated between them
+series_label = st.sidebar.selectbox("Series", list(interpolate.LABELS))
+series = interpolate.LABELS[series_label]
+
+# Countries, or the groups of one grouping (continents, trade blocs, ...)
+compare_label = st.sidebar.selectbox("Compare", ["Countries"] + store.get_groupings())
+grouping = None if compare_label == "Countries" else compare_label
+
+# Get data from the shared data layer; group totals answer the same
+# lookups as the country index, with each group in the Country column
+if grouping is None:
+    index = store.get_index(series)
+else:
+    index = store.get_groups(grouping, series)
+
 # Countries selection
-all_countries = sorted(df_long_with_world["Country"].unique())
+all_countries = index.countries
 
-# Default selection - Kenya and World
-default_countries = ["Kenya", "World"]
+# Default selection - Kenya and World, or the first two groups
+if grouping is None:
+    default_countries = [c for c in ["Kenya", "World"] if c in all_countries]
+else:
+    default_countries = all_countries[:2]
 default_indices = [i for i, c in enumerate(all_countries) if c in default_countries]
 
 selected_countries = st.sidebar.multiselect(
-    "Select Countries to Compare",
+    "Select Countries to Compare" if grouping is None else "Select Groups to Compare",
     all_countries,
     default=default_countries
 )
 
+
+# The ratio toggle reruns only this section
+@profiling.fragment("ratio")
+def kenya_world_ratio(selected_countries, year_range):
+    if not ("Kenya" in selected_countries and "World" in selected_countries):
+        return
+
+    show_kenya_world_ratio = st.checkbox(
+        "Show Kenya vs World Population Ratio",
+        value=False
+    )
+
+    if show_kenya_world_ratio:
+        with profiling.section("ratio"):
+            st.subheader("🌍 Kenya vs World: Population Ratio")
+
+            kenya_data = index.country("Kenya", year_range)
+            world_data = index.country("World", year_range)
+
+            # Merge and calculate ratio
+            ratio_data = pd.merge(
+                kenya_data[["Year", "Population"]].rename(columns={"Population": "Kenya_Population"}),
+                world_data[["Year", "Population"]].rename(columns={"Population": "World_Population"}),
+                on="Year"
+            )
+
+            ratio_data["Kenya_as_%_of_World"] = (
+                (ratio_data["Kenya_Population"] / ratio_data["World_Population"]) * 100
+            ).round(2)
+
+            def build_ratio():
+                import plotly.express as px
+
+                fig_ratio = px.line(
+                    ratio_data,
+                    x="Year",
+                    y="Kenya_as_%_of_World",
+                    title="Kenya's Population as Percentage of World Population",
+                    markers=True,
+                    template=template
+                )
+
+                fig_ratio.update_layout(height=350)
+                fig_ratio.update_yaxes(title_text="Percentage (%)")
+                return fig_ratio
+
+            fig_ratio = figures.cached_figure(
+                "compare_ratio", (series, year_range), build_ratio, template
+            )
+            profiling.plotly_chart(fig_ratio, use_container_width=True)
+
+            # Stats
+            col1, col2 = st.columns(2)
+            with col1:
+                max_ratio = ratio_data["Kenya_as_%_of_World"].max()
+                max_year = ratio_data.loc[ratio_data["Kenya_as_%_of_World"].idxmax(), "Year"]
+                st.metric("Highest Ratio", f"{max_ratio:.2f}% ({int(max_year)})")
+
+            with col2:
+                current_ratio = ratio_data["Kenya_as_%_of_World"].iloc[-1]
+                current_year = int(ratio_data["Year"].iloc[-1])
+                st.metric(f"Current Ratio ({current_year})", f"{current_ratio:.2f}%")
+
+
+# Turning the table page reruns only this section
+@profiling.fragment("table")
+def comparison_table(selected_countries, year_range):
+    with profiling.section("table"):
+        st.subheader("📄 Comparison Data Table")
+
+        # Only one page of countries is pivoted and sent per rerun
+        pages = compare.table_pages(selected_countries)
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Table page (of {pages}, {compare.TABLE_PAGE_SIZE} countries each)",
+                min_value=1,
+                max_value=pages,
+                value=1
+            )
+
+        table_df = compare.pivot_page(index, selected_countries, year_range, page)
+        profiling.touch(table_df)
+        # Populations in the narrowest integer type that holds them
+        table_df, saved = payload.trimmed_table(table_df, page_size=len(table_df))
+        profiling.saved(saved)
+
+        profiling.dataframe(table_df, use_container_width=True)
+
+
+# Picking a metric reruns only this section. Metrics are per country and
+# come from the source's own years
+@profiling.fragment("indicators")
+def indicator_comparison(selected_countries, year_range, high_cardinality):
+    with profiling.section("indicators"):
+        st.subheader("📐 Indicator Comparison")
+
+        metric = st.selectbox("Metric", store.get_metrics(), key="compare_metric")
+        values = store.get_metric(metric).countries_frame(selected_countries, year_range)
+        profiling.touch(values)
+        if values.empty:
+            st.info(f"No {metric} data for the selected countries and years.")
+            return
+
+        def build_indicator_comp():
+            import plotly.express as px
+
+            if high_cardinality:
+                return compare.webgl_figure(
+                    values, metric, f"{metric} Comparison", template, height=400
+                )
+
+            fig_indicator_comp = px.line(
+                values,
+                x="Year",
+                y=metric,
+                color="Country",
+                title=f"{metric} Comparison",
+                markers=True,
+                template=template
+            )
+
+            fig_indicator_comp.update_layout(height=400)
+            return fig_indicator_comp
+
+        fig_indicator_comp = figures.cached_figure(
+            "compare_indicator", (metric, tuple(selected_countries), year_range),
+            build_indicator_comp, template
+        )
+        profiling.plotly_chart(fig_indicator_comp, use_container_width=True)
+
+
 if not selected_countries:
     st.warning("Please select at least one country to compare.")
 else:
     # Year range filter
-    year_min = int(df_long_with_world["Year"].min())
-    year_max = int(df_long_with_world["Year"].max())
+    year_min = index.years[0]
+    year_max = index.years[-1]
     
     year_range = st.sidebar.slider(
         "Select Year Range",
@@ -40,128 +194,127 @@ else:
         year_max,
         (year_min, year_max)
     )
-    
-    # Kenya vs World toggle
-    show_kenya_world_ratio = st.sidebar.checkbox(
-        "Show Kenya vs World Population Ratio",
-        value=False
-    )
+
+    # Projection past the last census year, overlaid on the population chart;
+    # projections are fitted per country, so none for groups
+    projection_model = None
+    if grouping is None:
+        projection_label = st.sidebar.selectbox("Projection", list(projection.LABELS))
+        projection_model = projection.LABELS[projection_label]
     
     # Filter data
-    comparison_df = df_long_with_world[
-        (df_long_with_world["Country"].isin(selected_countries)) &
-        (df_long_with_world["Year"] >= year_range[0]) &
-        (df_long_with_world["Year"] <= year_range[1])
-    ].sort_values("Year")
+    comparison_df = index.countries_frame(selected_countries, year_range)
     
+    # Past a few dozen series SVG lines with markers overwhelm the browser;
+    # switch to downsampled WebGL traces
+    high_cardinality = len(selected_countries) > compare.HIGH_CARDINALITY
+    figure_key = (series, grouping, tuple(selected_countries), year_range)
+    # Projections continue the series, so they only show when the range runs
+    # to the last year; with many countries they are drawn without bands
+    show_projection = projection_model is not None and year_range[1] == year_max
+
     # SECTION 1: COMPARISON CHART
-    st.subheader(f"📈 Population Comparison: {', '.join(selected_countries)}")
-    
-    fig_comparison = px.line(
-        comparison_df,
-        x="Year",
-        y="Population",
-        color="Country",
-        title="Population Trends Comparison",
-        markers=True,
-        template=template
-    )
-    
-    fig_comparison.update_layout(
-        hovermode='x unified',
-        height=450
-    )
-    
-    st.plotly_chart(fig_comparison, use_container_width=True)
-    
-    # SECTION 2: GROWTH RATE COMPARISON
-    st.subheader("📊 Growth Rate Comparison")
-    
-    growth_comparison = comparison_df.dropna(subset=['Growth_Rate'])
-    
-    if not growth_comparison.empty:
-        fig_growth_comp = px.line(
-            growth_comparison,
-            x="Year",
-            y="Growth_Rate",
-            color="Country",
-            title="Annual Growth Rate Comparison",
-            markers=True,
-            template=template
+    with profiling.section("comparison"):
+        if high_cardinality:
+            st.subheader(f"📈 Population Comparison: {len(selected_countries)} countries")
+        else:
+            st.subheader(f"📈 Population Comparison: {', '.join(selected_countries)}")
+        profiling.touch(comparison_df)
+
+        def build_comparison():
+            import plotly.express as px
+
+            if high_cardinality:
+                return compare.webgl_figure(
+                    comparison_df, "Population", "Population Trends Comparison", template, height=450
+                )
+
+            fig_comparison = px.line(
+                comparison_df,
+                x="Year",
+                y="Population",
+                color="Country",
+                title="Population Trends Comparison",
+                markers=True,
+                template=template
+            )
+
+            fig_comparison.update_layout(
+                hovermode='x unified',
+                height=450
+            )
+            return fig_comparison
+
+        def build_projected_comparison():
+            fig_comparison = build_comparison()
+            projected = store.get_projection(projection_model)
+            colors = {trace.name: trace.line.color for trace in fig_comparison.data}
+            for country in selected_countries:
+                charts.add_projection(
+                    fig_comparison, projected.country(country), country,
+                    colors.get(country), band=not high_cardinality,
+                )
+            return fig_comparison
+
+        fig_comparison = figures.cached_figure(
+            "compare_population",
+            figure_key + (projection_model if show_projection else None,),
+            build_projected_comparison if show_projection else build_comparison,
+            template
         )
-        
-        fig_growth_comp.update_layout(height=350)
-        st.plotly_chart(fig_growth_comp, use_container_width=True)
-    
+
+        profiling.plotly_chart(fig_comparison, use_container_width=True)
+
+    # SECTION 2: GROWTH RATE COMPARISON
+    with profiling.section("growth"):
+        st.subheader("📊 Growth Rate Comparison")
+
+        growth_comparison = comparison_df.dropna(subset=['Growth_Rate'])
+        profiling.touch(comparison_df)
+
+        if not growth_comparison.empty:
+            def build_growth_comp():
+                import plotly.express as px
+
+                if high_cardinality:
+                    return compare.webgl_figure(
+                        growth_comparison, "Growth_Rate", "Annual Growth Rate Comparison", template, height=350
+                    )
+
+                fig_growth_comp = px.line(
+                    growth_comparison,
+                    x="Year",
+                    y="Growth_Rate",
+                    color="Country",
+                    title="Annual Growth Rate Comparison",
+                    markers=True,
+                    template=template
+                )
+
+                fig_growth_comp.update_layout(height=350)
+                return fig_growth_comp
+
+            fig_growth_comp = figures.cached_figure(
+                "compare_growth", figure_key, build_growth_comp, template
+            )
+            profiling.plotly_chart(fig_growth_comp, use_container_width=True)
+
     # SECTION 3: KENYA VS WORLD RATIO (Optional)
-    if show_kenya_world_ratio and "Kenya" in selected_countries and "World" in selected_countries:
-        st.subheader("🌍 Kenya vs World: Population Ratio")
-        
-        kenya_data = comparison_df[comparison_df["Country"] == "Kenya"].copy()
-        world_data = comparison_df[comparison_df["Country"] == "World"].copy()
-        
-        # Merge and calculate ratio
-        ratio_data = pd.merge(
-            kenya_data[["Year", "Population"]].rename(columns={"Population": "Kenya_Population"}),
-            world_data[["Year", "Population"]].rename(columns={"Population": "World_Population"}),
-            on="Year"
-        )
-        
-        ratio_data["Kenya_as_%_of_World"] = (
-            (ratio_data["Kenya_Population"] / ratio_data["World_Population"]) * 100
-        ).round(2)
-        
-        fig_ratio = px.line(
-            ratio_data,
-            x="Year",
-            y="Kenya_as_%_of_World",
-            title="Kenya's Population as Percentage of World Population",
-            markers=True,
-            template=template
-        )
-        
-        fig_ratio.update_layout(height=350)
-        fig_ratio.update_yaxes(title_text="Percentage (%)")
-        st.plotly_chart(fig_ratio, use_container_width=True)
-        
-        # Stats
-        col1, col2 = st.columns(2)
-        with col1:
-            max_ratio = ratio_data["Kenya_as_%_of_World"].max()
-            max_year = ratio_data.loc[ratio_data["Kenya_as_%_of_World"].idxmax(), "Year"]
-            st.metric("Highest Ratio", f"{max_ratio:.2f}% ({int(max_year)})")
-        
-        with col2:
-            current_ratio = ratio_data["Kenya_as_%_of_World"].iloc[-1]
-            current_year = int(ratio_data["Year"].iloc[-1])
-            st.metric(f"Current Ratio ({current_year})", f"{current_ratio:.2f}%")
-    
+    kenya_world_ratio(selected_countries, year_range)
+
     # SECTION 4: DATA TABLE
-    st.subheader("📄 Comparison Data Table")
-    
-    table_df = comparison_df.pivot_table(
-        index="Year",
-        columns="Country",
-        values="Population",
-        aggfunc="first"
-    ).astype(int)
-    
-    st.dataframe(table_df, use_container_width=True)
-    
+    comparison_table(selected_countries, year_range)
+
     # SECTION 5: STATISTICS SUMMARY
-    st.subheader("📊 Summary Statistics")
-    
-    summary_data = []
-    for country in selected_countries:
-        country_data = comparison_df[comparison_df["Country"] == country]
-        if not country_data.empty:
-            summary_data.append({
-                "Country": country,
-                "Latest Year": int(country_data["Year"].max()),
-                "Latest Population": int(country_data["Population"].max()),
-                "Earliest Population": int(country_data["Population"].min()),
-                "Growth": f"{((country_data['Population'].max() - country_data['Population'].min()) / country_data['Population'].min() * 100):.2f}%"
-            })
-    
-    summary_df = pd.DataFrame(summary_data)
-    st.dataframe(summary_df, use_container_width=True)
+    with profiling.section("summary"):
+        st.subheader("📊 Summary Statistics")
+
+        profiling.touch(comparison_df)
+        summary_df = compare.summary(comparison_df, selected_countries)
+        profiling.dataframe(summary_df, use_container_width=True)
+
+    # SECTION 6: OTHER INDICATORS (countries only)
+    if grouping is None:
+        indicator_comparison(selected_countries, year_range, high_cardinality)
+
+profiling.end_run()
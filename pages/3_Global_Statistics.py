@@ -1,188 +1,398 @@
+from urllib.parse import urlencode
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+# plotly.express is imported inside the figure builders, which only run on
+# a figure cache miss; a rerun served from the cache never needs it
+from dashboard import figures, interpolate, payload, profiling, ranks, stats, store
+from dashboard.data import POPULATION
 
 st.set_page_config(page_title="Global Statistics", page_icon="🗺️")
 
 st.title("🗺️ Global Statistics")
 st.markdown("Explore global population statistics, rankings, and continental data")
 
-# Get data from session state
-df_long_with_world = st.session_state.df_long_with_world
+profiling.start_run("Global Statistics")
+store.refresh()
+
+# Get data from the shared data layer
+index = store.get_index()
+cube = store.get_cube()
 template = st.session_state.get("template", "plotly")
 
-# Sidebar filters
-st.sidebar.header("🔎 Filter Options")
-
-# Year selection
-year_min = int(df_long_with_world["Year"].min())
-year_max = int(df_long_with_world["Year"].max())
-
-selected_year = st.sidebar.slider(
-    "Select Year",
-    year_min,
-    year_max,
-    year_max
-)
-
-# Get data for selected year
-year_data = df_long_with_world[df_long_with_world["Year"] == selected_year].copy()
-
-# SECTION 1: TOP 10 COUNTRIES BAR CHART
-st.subheader(f"🏆 Top 10 Most Populous Countries ({selected_year})")
-
-top_10 = year_data[year_data["Country"] != "World"].nlargest(10, "Population")
-
-fig_top10 = px.barh(
-    top_10.sort_values("Population"),
-    y="Country",
-    x="Population",
-    title=f"Top 10 Most Populous Countries in {selected_year}",
-    color="Population",
-    color_continuous_scale="Viridis",
-    template=template
-)
-
-fig_top10.update_layout(
-    height=400,
-    showlegend=False
-)
-
-st.plotly_chart(fig_top10, use_container_width=True)
-
-# SECTION 2: CONTINENTAL STATISTICS
-st.subheader(f"🌍 Population by Continent ({selected_year})")
-
-continental_data = year_data[year_data["Country"] != "World"].groupby("Continent")["Population"].sum().reset_index()
-continental_data = continental_data.sort_values("Population", ascending=False)
-
-col1, col2 = st.columns(2)
-
-with col1:
-    fig_bar = px.bar(
-        continental_data,
-        x="Continent",
-        y="Population",
-        title=f"Total Population by Continent",
-        color="Population",
-        color_continuous_scale="Blues",
-        template=template
+# Continents, or any other grouping of countries, for the group sections
+st.sidebar.header("🔎 Options")
+grouping = st.sidebar.selectbox("Group by", store.get_groupings())
+groups = store.get_groups(grouping)
+
+
+# Sections that depend on the selected year live in one fragment, so moving
+# the slider reruns and re-sends only them
+@profiling.fragment("year")
+def year_sections():
+    # Year selection
+    year_min = index.years[0]
+    year_max = index.years[-1]
+
+    selected_year = st.slider(
+        "Select Year",
+        year_min,
+        year_max,
+        year_max
     )
-    
-    fig_bar.update_layout(height=400)
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-with col2:
-    fig_pie = px.pie(
-        continental_data,
-        values="Population",
-        names="Continent",
-        title=f"Population Distribution by Continent",
-        template=template
+
+    # Population, or any other metric of the source, for the top 10
+    metric = st.selectbox("Rank by", store.get_metrics(), key="global_metric")
+
+    # SECTION 1: TOP 10 COUNTRIES BAR CHART
+    with profiling.section("top_10"):
+        if metric == POPULATION:
+            heading = "Top 10 Most Populous Countries"
+            top_10 = cube.top_by_population(selected_year)
+        else:
+            heading = f"Top 10 Countries by {metric}"
+            top_10 = store.get_metric(metric).top(selected_year)
+        st.subheader(f"🏆 {heading} ({selected_year})")
+
+        def build_top10():
+            import plotly.express as px
+
+            fig_top10 = px.bar(
+                top_10.sort_values(metric),
+                y="Country",
+                x=metric,
+                orientation="h",
+                title=f"{heading} in {selected_year}",
+                color=metric,
+                color_continuous_scale="Viridis",
+                template=template
+            )
+
+            fig_top10.update_layout(
+                height=400,
+                showlegend=False
+            )
+            return fig_top10
+
+        if top_10.empty:
+            st.info(f"No {metric} data in {selected_year}.")
+        else:
+            fig_top10 = figures.cached_figure(
+                "global_top10", (metric, selected_year), build_top10, template
+            )
+
+            profiling.plotly_chart(fig_top10, use_container_width=True)
+
+    # SECTION 2: STATISTICS BY GROUP (continents unless another grouping is picked)
+    with profiling.section("continents"):
+        st.subheader(f"🌍 Population by {grouping} ({selected_year})")
+
+        group_data = groups.year(selected_year)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            def build_bar():
+                import plotly.express as px
+
+                fig_bar = px.bar(
+                    group_data,
+                    x="Group",
+                    y="Population",
+                    title=f"Total Population by {grouping}",
+                    color="Population",
+                    color_continuous_scale="Blues",
+                    labels={"Group": grouping},
+                    template=template
+                )
+
+                fig_bar.update_layout(height=400)
+                return fig_bar
+
+            fig_bar = figures.cached_figure(
+                "global_continent_bar", (grouping, selected_year), build_bar, template
+            )
+            profiling.plotly_chart(fig_bar, use_container_width=True)
+
+        with col2:
+            def build_pie():
+                import plotly.express as px
+
+                fig_pie = px.pie(
+                    group_data,
+                    values="Population",
+                    names="Group",
+                    title=f"Population Distribution by {grouping}",
+                    template=template
+                )
+
+                fig_pie.update_layout(height=400)
+                return fig_pie
+
+            def build_share():
+                import plotly.express as px
+
+                fig_share = px.bar(
+                    group_data,
+                    x="Group",
+                    y="Share",
+                    title=f"Share of World Population by {grouping}",
+                    labels={"Group": grouping, "Share": "% of World"},
+                    template=template
+                )
+
+                fig_share.update_layout(height=400)
+                return fig_share
+
+            # Overlapping groups do not add up to a whole, so no pie for them
+            fig_pie = figures.cached_figure(
+                "global_continent_pie", (grouping, selected_year),
+                build_pie if groups.partition else build_share, template
+            )
+            profiling.plotly_chart(fig_pie, use_container_width=True)
+
+    # SECTION 3: GROUP STATISTICS TABLE
+    with profiling.section("continent_table"):
+        st.subheader(f"📊 {grouping} Statistics ({selected_year})")
+
+        stats_df = pd.DataFrame({
+            grouping: group_data["Group"],
+            "Total Population": group_data["Population"],
+            "% of World": group_data["Share"].map("{:.2f}%".format),
+            "Countries": group_data["Countries"]
+        })
+        profiling.dataframe(stats_df, use_container_width=True)
+
+    # SECTION 4: TOP GROWING COUNTRIES
+    with profiling.section("top_growth"):
+        st.subheader(f"📈 Fastest Growing Countries ({selected_year})")
+
+        growth_data = cube.top_by_growth(selected_year)
+
+        if not growth_data.empty:
+            def build_growth():
+                import plotly.express as px
+
+                fig_growth = px.bar(
+                    growth_data.sort_values("Growth_Rate"),
+                    y="Country",
+                    x="Growth_Rate",
+                    orientation="h",
+                    title=f"Top 10 Fastest Growing Countries ({selected_year})",
+                    color="Growth_Rate",
+                    color_continuous_scale="Reds",
+                    template=template
+                )
+
+                fig_growth.update_layout(height=400)
+                return fig_growth
+
+            fig_growth = figures.cached_figure(
+                "global_top_growth", (selected_year,), build_growth, template
+            )
+            profiling.plotly_chart(fig_growth, use_container_width=True)
+
+    # SECTION 5: GLOBAL SUMMARY METRICS
+    with profiling.section("summary"):
+        st.subheader("🌐 Global Summary")
+
+        col1, col2, col3, col4 = st.columns(4)
+        summary = cube.summary(selected_year)
+
+        if summary is not None:
+            with col1:
+                world_pop = summary["World_Population"]
+                if pd.notna(world_pop):
+                    st.metric("World Population", f"{int(world_pop):,}")
+
+            with col2:
+                st.metric("Countries/Territories", int(summary["Countries"]))
+
+            with col3:
+                st.metric("Continents", int(summary["Continents"]))
+
+            with col4:
+                avg_growth = summary["Avg_Growth_Rate"]
+                if pd.notna(avg_growth):
+                    st.metric("Avg. Growth Rate", f"{avg_growth:.2f}%")
+
+
+year_sections()
+
+# Sections below do not depend on the selected year and only run on a full
+# rerun (first load or theme change)
+
+# SECTION 6: GLOBAL TRENDS
+with profiling.section("world_trend"):
+    st.subheader("📈 Global Population Growth Trends")
+
+    years_to_plot = index.country("World")
+
+    def build_global():
+        import plotly.express as px
+
+        fig_global = px.line(
+            years_to_plot,
+            x="Year",
+            y="Population",
+            title="World Population Growth Over Time",
+            markers=True,
+            template=template
+        )
+
+        fig_global.update_layout(height=400)
+        return fig_global
+
+    fig_global = figures.cached_figure(
+        "global_world_trend", (), build_global, template
     )
-    
-    fig_pie.update_layout(height=400)
-    st.plotly_chart(fig_pie, use_container_width=True)
-
-# SECTION 3: CONTINENTAL STATISTICS TABLE
-st.subheader(f"📊 Continental Statistics ({selected_year})")
-
-continental_stats = []
-total_world_pop = year_data[year_data["Country"] != "World"]["Population"].sum()
-
-for continent in continental_data["Continent"]:
-    continent_pop = continental_data[continental_data["Continent"] == continent]["Population"].values[0]
-    percentage = (continent_pop / total_world_pop) * 100
-    countries_count = year_data[(year_data["Continent"] == continent) & (year_data["Country"] != "World")].shape[0]
-    
-    continental_stats.append({
-        "Continent": continent,
-        "Total Population": int(continent_pop),
-        "% of World": f"{percentage:.2f}%",
-        "Countries": countries_count
-    })
-
-stats_df = pd.DataFrame(continental_stats)
-st.dataframe(stats_df, use_container_width=True)
-
-# SECTION 4: GLOBAL TRENDS
-st.subheader("📈 Global Population Growth Trends")
-
-years_to_plot = df_long_with_world[df_long_with_world["Country"] == "World"].sort_values("Year")
-
-fig_global = px.line(
-    years_to_plot,
-    x="Year",
-    y="Population",
-    title="World Population Growth Over Time",
-    markers=True,
-    template=template
-)
-
-fig_global.update_layout(height=400)
-st.plotly_chart(fig_global, use_container_width=True)
-
-# SECTION 5: TOP GROWING COUNTRIES
-st.subheader(f"📈 Fastest Growing Countries ({selected_year})")
-
-growth_data = year_data[year_data["Country"] != "World"].copy()
-growth_data = growth_data.dropna(subset=["Growth_Rate"])
-growth_data = growth_data.sort_values("Growth_Rate", ascending=False).head(10)
-
-if not growth_data.empty:
-    fig_growth = px.barh(
-        growth_data.sort_values("Growth_Rate"),
-        y="Country",
-        x="Growth_Rate",
-        title=f"Top 10 Fastest Growing Countries ({selected_year})",
-        color="Growth_Rate",
-        color_continuous_scale="Reds",
-        template=template
+    profiling.plotly_chart(fig_global, use_container_width=True)
+
+# SECTION 7: GROUP GROWTH TRENDS
+with profiling.section("continent_trends"):
+    st.subheader(f"📊 {grouping} Growth Trends Over Time")
+
+    # Population by group for each year, from the shared group totals
+    group_trends = groups.frame()
+
+    def build_group_trends():
+        import plotly.express as px
+
+        fig_group_trends = px.line(
+            group_trends,
+            x="Year",
+            y="Population",
+            color="Country",
+            title=f"Population Growth by {grouping} Over Time",
+            markers=True,
+            labels={"Country": grouping},
+            template=template
+        )
+
+        fig_group_trends.update_layout(height=400)
+        return fig_group_trends
+
+    fig_group_trends = figures.cached_figure(
+        "global_continent_trends", (grouping,), build_group_trends, template
     )
-    
-    fig_growth.update_layout(height=400)
-    st.plotly_chart(fig_growth, use_container_width=True)
-
-# SECTION 6: GLOBAL SUMMARY METRICS
-st.subheader("🌐 Global Summary")
-
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    world_pop = year_data[year_data["Country"] == "World"]["Population"].values
-    if len(world_pop) > 0:
-        st.metric("World Population", f"{int(world_pop[0]):,}")
-
-with col2:
-    countries_count = year_data[year_data["Country"] != "World"].shape[0]
-    st.metric("Countries/Territories", countries_count)
-
-with col3:
-    continents_count = year_data[year_data["Country"] != "World"]["Continent"].nunique()
-    st.metric("Continents", continents_count)
-
-with col4:
-    avg_growth = year_data[year_data["Country"] != "World"]["Growth_Rate"].mean()
-    if pd.notna(avg_growth):
-        st.metric("Avg. Growth Rate", f"{avg_growth:.2f}%")
-
-# SECTION 7: CONTINENTAL GROWTH TRENDS
-st.subheader("📊 Continental Growth Trends Over Time")
-
-# Calculate population by continent for each year
-continental_trends = df_long_with_world[df_long_with_world["Country"] != "World"].groupby(
-    ["Year", "Continent"]
-)["Population"].sum().reset_index()
-
-fig_continental_trends = px.line(
-    continental_trends,
-    x="Year",
-    y="Population",
-    color="Continent",
-    title="Population Growth by Continent Over Time",
-    markers=True,
-    template=template
-)
-
-fig_continental_trends.update_layout(height=400)
-st.plotly_chart(fig_continental_trends, use_container_width=True)
+    profiling.plotly_chart(fig_group_trends, use_container_width=True)
+
+
+# Ranking views have their own controls and rerun on their own
+@profiling.fragment("ranking")
+def ranking_sections():
+    # SECTION 8: POPULATION RANKING RACE
+    with profiling.section("ranking_race"):
+        st.subheader("🏁 Population Ranking Over Time")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            frames_label = st.selectbox("Frames", list(interpolate.LABELS), key="race_frames")
+        with col2:
+            race_size = st.slider("Countries shown", 5, 20, ranks.RACE_SIZE, key="race_size")
+        series = interpolate.LABELS[frames_label]
+        rank_matrix = store.get_ranks(series)
+
+        fig_race = figures.cached_figure(
+            "global_ranking_race", (series, race_size),
+            lambda: ranks.race_figure(rank_matrix, template, race_size), template
+        )
+        profiling.plotly_chart(fig_race, use_container_width=True)
+
+    # SECTION 9: RANK CLIMBERS AND FALLERS
+    with profiling.section("rank_movers"):
+        st.subheader("🔀 Biggest Rank Changes")
+
+        census = store.get_ranks()
+        years = [int(year) for year in census.years]
+        start, end = st.select_slider(
+            "Between", years, value=(years[0], years[-1]), key="movers_years"
+        )
+        climbers, fallers = census.movers(start, end)
+        profiling.touch(census.rank.size)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**Climbers**")
+            profiling.dataframe(climbers, use_container_width=True, hide_index=True)
+        with col2:
+            st.markdown("**Fallers**")
+            profiling.dataframe(fallers, use_container_width=True, hide_index=True)
+
+
+ranking_sections()
+
+
+# The every-country table has its own window and pages and reruns on its own
+@profiling.fragment("stats")
+def stats_section():
+    # SECTION 10: STATISTICS FOR EVERY COUNTRY
+    with profiling.section("stats_table"):
+        st.subheader("📋 Statistics for Every Country")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            series_label = st.selectbox("Series", list(interpolate.LABELS), key="stats_series")
+        series = interpolate.LABELS[series_label]
+        matrix = store.get_stats(series)
+        years = [int(year) for year in matrix.years]
+        with col2:
+            year_range = st.select_slider(
+                "Window", years, value=(years[0], years[-1]), key="stats_years"
+            )
+
+        # One vectorized pass over the cached Country x Year matrix
+        table = matrix.table(year_range)
+        profiling.touch(matrix.values.size)
+
+        pages = payload.table_pages(len(table))
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Table page (of {pages}, {payload.TABLE_PAGE_ROWS} countries each)",
+                min_value=1,
+                max_value=pages,
+                value=1,
+                key="stats_page"
+            )
+
+        table_df, saved = payload.trimmed_table(table, page)
+        profiling.saved(saved)
+        profiling.dataframe(table_df, use_container_width=True, hide_index=True)
+
+        name = f"population_stats_{year_range[0]}_{year_range[1]}"
+        columns = st.columns(len(stats.FORMATS))
+        if stats.API_URL:
+            # The API streams the file a block of rows at a time, so this
+            # process never holds it whole
+            query = {"from": year_range[0], "to": year_range[1]}
+            if series:
+                query["series"] = series
+            for column, (export_format, (extension, _)) in zip(columns, stats.FORMATS.items()):
+                with column:
+                    st.link_button(
+                        f"Download {extension.upper()}",
+                        f"{stats.API_URL}/stats?{urlencode({**query, 'format': export_format})}",
+                    )
+        else:
+            # The files are only written when a button is clicked, but then
+            # whole, in memory
+            for column, (export_format, (extension, mime)) in zip(columns, stats.FORMATS.items()):
+                with column:
+                    st.download_button(
+                        f"Download {extension.upper()}",
+                        lambda export_format=export_format: b"".join(stats.iter_format(table, export_format)),
+                        file_name=f"{name}.{extension}",
+                        mime=mime,
+                        on_click="ignore",
+                        key=f"stats_download_{export_format}"
+                    )
+            st.caption(
+                "The file is built in memory when you click. "
+                "Set DASHBOARD_API_URL to download it streamed from the API instead."
+            )
+
+stats_section()
+
+profiling.end_run()